@@ -0,0 +1,93 @@
+import importlib
+import os
+import time
+from typing import Dict, List, Any, Optional
+import anyio.to_thread
+from sqlalchemy.engine import make_url
+from .database import get_async_session, DATABASE_URL, ASYNC_DRIVERS
+from .db_storage import (
+    DatabaseStorage, results_query, results_batch_query, alerts_query,
+    result_dict, alert_dict, merge_results,
+)
+from .logger import vms_logger
+
+# Async read path for the API; falls back to DatabaseStorage on worker threads
+# when disabled or when the async driver is not installed
+ASYNC_DB_CONFIG = {
+    "enabled": os.getenv("VMS_ASYNC_DB", "1") == "1",
+}
+
+def async_driver_available() -> bool:
+    driver = ASYNC_DRIVERS.get(make_url(DATABASE_URL).get_backend_name())
+    if driver is None:
+        return False
+    try:
+        importlib.import_module(driver)
+        return True
+    except ImportError:
+        return False
+
+class AsyncDatabaseStorage:
+    """Async reads of results and alerts for the API endpoints.
+
+    Shares the ring-buffer cache and query statements with the sync
+    DatabaseStorage, which still owns the write path. Queries run on the
+    asyncio engine, so a request waiting on the database holds no threadpool
+    thread.
+    """
+
+    def __init__(self, storage: DatabaseStorage, enabled: Optional[bool] = None) -> None:
+        self.storage = storage
+        if enabled is None:
+            enabled = ASYNC_DB_CONFIG["enabled"]
+        self.native = enabled and async_driver_available()
+        if enabled and not self.native:
+            vms_logger.main_logger.warning("⚠️ Async database driver not installed; API reads use worker threads")
+        self.queries = 0
+
+    async def _in_thread(self, fn, *args):
+        # Same worker-thread pool FastAPI uses for sync endpoints
+        return await anyio.to_thread.run_sync(fn, *args)
+
+    async def get_results(self, stream_id: str, limit: int = 100) -> List[dict]:
+        if not self.native:
+            return await self._in_thread(self.storage.get_results, stream_id, limit)
+        recent = self.storage.recent
+        cached: List[dict] = []
+        if recent is not None:
+            cached, complete = recent.recent_results(stream_id, limit)
+            if complete:
+                return cached
+        async with get_async_session() as db:
+            rows = [result_dict(r) for r in await db.execute(results_query(stream_id, limit))]
+        self.queries += 1
+        return merge_results(rows, cached, limit)
+
+    async def get_results_batch(self, stream_ids: List[str], limit: int = 10,
+                                since: Optional[Dict[str, float]] = None) -> Dict[str, List[dict]]:
+        if not self.native:
+            return await self._in_thread(self.storage.get_results_batch, stream_ids, limit, since)
+        batch, cached = self.storage.cached_results_batch(stream_ids, limit, since)
+        if not cached:
+            return batch
+        start_time = time.time()
+        queried: Dict[str, List[dict]] = {}
+        async with get_async_session() as db:
+            for r in await db.execute(results_batch_query(list(cached), limit, since)):
+                queried.setdefault(r.stream_id, []).append(result_dict(r))
+        self.queries += 1
+        vms_logger.log_database_operation("select", "stream_results", sum(len(v) for v in queried.values()), time.time() - start_time)
+        for stream_id, rows in cached.items():
+            batch[stream_id] = merge_results(queried.get(stream_id, []), rows, limit)
+        return batch
+
+    async def get_alerts(self, resolved: Optional[bool] = None) -> List[dict]:
+        if not self.native:
+            return await self._in_thread(self.storage.get_alerts, resolved)
+        async with get_async_session() as db:
+            alerts = (await db.execute(alerts_query(resolved))).scalars().all()
+        self.queries += 1
+        return [alert_dict(a) for a in alerts]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"native": self.native, "queries": self.queries}
@@ -0,0 +1,320 @@
+import time
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from .logger import vms_logger
+from .profiling import StageWindows
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+CapturedFrame = Tuple[np.ndarray, float]
+
+class FrameQueue:
+    """Bounded hand-off between a capture thread and a processing loop"""
+
+    def __init__(self, maxsize: int = 2, policy: str = DROP_OLDEST) -> None:
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self._frames: Deque[CapturedFrame] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.frames_offered = 0
+        self.frames_put = 0
+        self.frames_dropped = 0
+
+    def put(self, frame: np.ndarray, captured_at: float) -> bool:
+        """Offer a frame; when the queue is full the drop policy decides what survives"""
+        with self._cond:
+            if self._closed:
+                return False
+            self.frames_offered += 1
+            if len(self._frames) >= self.maxsize:
+                self.frames_dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return False
+                self._frames.popleft()
+            self._frames.append((frame, captured_at))
+            self.frames_put += 1
+            self._cond.notify_all()
+            return True
+
+    def wait_for_space(self) -> bool:
+        """Block until a put would not drop; returns False once the queue is closed"""
+        with self._cond:
+            while len(self._frames) >= self.maxsize and not self._closed:
+                self._cond.wait(0.5)
+            return not self._closed
+
+    def get(self, timeout: float = 0.5) -> Optional[CapturedFrame]:
+        with self._cond:
+            if not self._frames and not self._closed:
+                self._cond.wait(timeout)
+            if not self._frames:
+                return None
+            item = self._frames.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._frames)
+
+def is_live_source(source: str) -> bool:
+    """Webcams and network streams produce frames whether or not we keep up"""
+    return source.isdigit() or source.lower().startswith(("rtsp://", "rtmp://", "http://", "https://", "udp://"))
+
+def open_capture(source: str) -> cv2.VideoCapture:
+    # Handle different source types
+    if source.isdigit():
+        # Webcam source (0, 1, 2, etc.)
+        cap = cv2.VideoCapture(int(source))
+        # Set webcam properties for better compatibility on macOS
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        cap.set(cv2.CAP_PROP_FPS, 30)
+    else:
+        # File or RTSP source
+        cap = cv2.VideoCapture(source)
+    return cap
+
+def skip_to_next_sample(cap: cv2.VideoCapture, native_fps: float, sample_fps: float) -> Tuple[bool, int]:
+    """Advance a file past the frames between samples without decoding them.
+
+    Returns whether the next sample is ready to decode and how many frames were skipped.
+    """
+    if native_fps <= sample_fps:
+        return True, 0
+    step = int(round(native_fps / sample_fps))
+    for skipped in range(step - 1):
+        if not cap.grab():
+            return False, skipped
+    return True, step - 1
+
+class SourceReader(threading.Thread):
+    """Decodes one source and hands every frame to all subscribed FrameQueues.
+
+    Live sources are read continuously so the decoder buffer never backs up and
+    each subscriber's drop policy decides which frames survive. Subscribers get
+    the same ndarray by reference and must treat it as read-only. Files and the
+    synthetic fallback are read on demand: the next frame is only decoded once
+    every subscriber has room for it. For files, frames between samples at the
+    target rate are skipped with grab() so they are never decoded.
+    """
+
+    def __init__(self, key: str, source: str, sample_fps: float = 5.0) -> None:
+        super().__init__(name=f"capture-{key}", daemon=True)
+        self.key = key
+        self.source = source
+        self.sample_fps = sample_fps
+        self.live = is_live_source(source)
+        self.synthetic = False
+        self.frames_captured = 0
+        self.frames_skipped = 0
+        # Decode timings, shared by every stream on this source
+        self.stages = StageWindows()
+        self._subscribers: Dict[str, FrameQueue] = {}
+        self._models: Dict[str, list] = {}
+        # Requested rate per subscriber; the reader samples at the fastest
+        self._rates: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def subscribe(self, stream_id: str, frames: FrameQueue, models: list, sample_fps: Optional[float] = None) -> None:
+        with self._lock:
+            self._subscribers[stream_id] = frames
+            self._models[stream_id] = models
+            self._rates[stream_id] = sample_fps or self.sample_fps
+            self.sample_fps = max(self._rates.values())
+
+    def set_sample_rate(self, stream_id: str, fps: float) -> None:
+        """Follow a subscriber's new frame rate, e.g. after the governor changed it"""
+        with self._lock:
+            if stream_id in self._rates:
+                self._rates[stream_id] = fps
+                self.sample_fps = max(self._rates.values())
+
+    def unsubscribe(self, stream_id: str) -> int:
+        """Remove a subscriber; returns how many remain"""
+        with self._lock:
+            frames = self._subscribers.pop(stream_id, None)
+            self._models.pop(stream_id, None)
+            self._rates.pop(stream_id, None)
+            if self._rates:
+                self.sample_fps = max(self._rates.values())
+            remaining = len(self._subscribers)
+        if frames is not None:
+            frames.close()
+        return remaining
+
+    def subscriber_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for frames in subscribers:
+            frames.close()
+
+    def run(self) -> None:
+        cap = open_capture(self.source)
+        if not cap.isOpened():
+            with self._lock:
+                models = dict(self._models)
+            for stream_id, stream_models in models.items():
+                vms_logger.log_stream_error(stream_id, f"Failed to open video source: {self.source}", self.source)
+                # Fallback to synthetic frames for demo
+                vms_logger.log_stream_start(stream_id, "synthetic_fallback", stream_models)
+            self.synthetic = True
+            self.live = False
+            try:
+                while not self._stop_event.is_set():
+                    if not self._wait_for_subscribers():
+                        break
+                    frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+                    self._offer(frame)
+            finally:
+                cap.release()
+            return
+
+        for stream_id in self.subscriber_ids():
+            vms_logger.log_stream_success(stream_id, self.source)
+        native_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        try:
+            while not self._stop_event.is_set():
+                if not self.live:
+                    if not self._wait_for_subscribers():
+                        break
+                    with self.stages.span("grab"):
+                        sampled = self._skip_to_next_sample(cap, native_fps)
+                    if not sampled:
+                        # For video files, loop back to start
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                decode_start = time.perf_counter()
+                ret, frame = cap.read()
+                self.stages.record("decode", time.perf_counter() - decode_start)
+                if not ret:
+                    if self.source.isdigit():
+                        # For webcam, continue trying
+                        self._log_error("Failed to read from webcam, retrying...")
+                        time.sleep(0.1)
+                        continue
+                    elif self.live:
+                        self._log_error("Failed to read from stream, retrying...")
+                        time.sleep(0.1)
+                        continue
+                    else:
+                        # For video files, loop back to start
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                self._offer(frame)
+        except Exception as e:
+            self._log_error(f"Capture error: {str(e)}")
+        finally:
+            cap.release()
+
+    def _log_error(self, error: str) -> None:
+        for stream_id in self.subscriber_ids():
+            vms_logger.log_stream_error(stream_id, error, self.source)
+
+    def _wait_for_subscribers(self) -> bool:
+        """On-demand sources: wait until every subscriber can take another frame"""
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        if not subscribers:
+            return not self._stop_event.wait(0.1)
+        for frames in subscribers:
+            frames.wait_for_space()
+        return not self._stop_event.is_set()
+
+    def _skip_to_next_sample(self, cap: cv2.VideoCapture, native_fps: float) -> bool:
+        sampled, skipped = skip_to_next_sample(cap, native_fps, self.sample_fps)
+        self.frames_skipped += skipped
+        return sampled
+
+    def _offer(self, frame: np.ndarray) -> None:
+        self.frames_captured += 1
+        captured_at = time.time()
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for frames in subscribers:
+            frames.put(frame, captured_at)
+
+class PolledSource:
+    """Reads a file or the synthetic fallback on demand in the caller's thread.
+
+    Used by pooled streams, which decode their next frame only when it is due
+    instead of keeping a capture thread per stream. The source is opened on
+    the first read, and frames between samples are skipped with grab() as in
+    SourceReader. Live sources are not polled: they must be drained
+    continuously and keep a SourceReader.
+    """
+
+    def __init__(self, stream_id: str, source: str, models: list, sample_fps: float = 5.0) -> None:
+        self.stream_id = stream_id
+        self.source = source
+        self.models = models
+        self.sample_fps = sample_fps
+        self.live = False
+        self.synthetic = False
+        self.frames_captured = 0
+        self.frames_skipped = 0
+        self.stages = StageWindows()
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._native_fps = 0.0
+
+    def subscriber_ids(self) -> List[str]:
+        return [self.stream_id]
+
+    def set_sample_rate(self, stream_id: str, fps: float) -> None:
+        self.sample_fps = fps
+
+    def _open(self) -> None:
+        self._cap = open_capture(self.source)
+        if not self._cap.isOpened():
+            vms_logger.log_stream_error(self.stream_id, f"Failed to open video source: {self.source}", self.source)
+            # Fallback to synthetic frames for demo
+            vms_logger.log_stream_start(self.stream_id, "synthetic_fallback", self.models)
+            self.synthetic = True
+            return
+        vms_logger.log_stream_success(self.stream_id, self.source)
+        self._native_fps = self._cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    def read(self) -> Optional[CapturedFrame]:
+        """Next sampled frame, or None when the file ended and was rewound"""
+        if self._cap is None:
+            self._open()
+        if self.synthetic:
+            frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+        else:
+            with self.stages.span("grab"):
+                sampled, skipped = skip_to_next_sample(self._cap, self._native_fps, self.sample_fps)
+            self.frames_skipped += skipped
+            ret = False
+            if sampled:
+                decode_start = time.perf_counter()
+                ret, frame = self._cap.read()
+                self.stages.record("decode", time.perf_counter() - decode_start)
+            if not ret:
+                # For video files, loop back to start
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                return None
+        self.frames_captured += 1
+        return frame, time.time()
+
+    def close(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
@@ -0,0 +1,318 @@
+import json
+import math
+import os
+import random
+import socket
+import threading
+import time
+from typing import Dict, List, Any, Optional
+from sqlalchemy import select, update, delete, or_, func
+from .database import get_db_session, get_write_session, Stream, ClusterNode
+from .stream_manager import StreamManager
+from .logger import vms_logger
+
+# Multi-node mode: stream ownership is leased through the streams table so
+# several backend processes can share the work of one database
+CLUSTER_CONFIG = {
+    "enabled": os.getenv("VMS_CLUSTER", "0") == "1",
+    "node_id": os.getenv("VMS_NODE_ID", f"{socket.gethostname()}-{os.getpid()}"),
+    "capacity": int(os.getenv("VMS_NODE_CAPACITY", "10")),
+    "lease_ttl": float(os.getenv("VMS_LEASE_TTL", "15")),
+    "heartbeat_interval": float(os.getenv("VMS_HEARTBEAT_INTERVAL", "5")),
+}
+
+# Start options persisted with a stream and replayed by whichever node claims it
+STREAM_OPTIONS = ("queue_size", "drop_policy", "motion_threshold", "motion_refresh_interval",
+                  "fps", "min_fps", "priority")
+
+class StreamCoordinator:
+    """Runs this node's share of the active streams in the streams table.
+
+    Every heartbeat the node renews the leases it holds, stops streams that
+    were stopped or taken over elsewhere, gives streams back when it holds
+    more than its fair share of the live nodes, and claims unowned or expired
+    streams up to that share and its capacity. Claims are a conditional
+    UPDATE, so two nodes racing for a stream cannot both win. A watchdog
+    thread stops the node's streams once a heartbeat interval is all that is
+    left of its last renewed lease, so they are stopped before another node
+    can claim them even while a heartbeat hangs on the database. Leases
+    compare wall clocks, so VMS_LEASE_TTL must be well above the clock skew
+    between nodes.
+    """
+
+    def __init__(self, stream_mgr: StreamManager, node_id: str, capacity: int,
+                 lease_ttl: float = 15.0, heartbeat_interval: float = 5.0) -> None:
+        self.stream_mgr = stream_mgr
+        self.node_id = node_id
+        self.capacity = capacity
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.started_at = time.time()
+        self.last_renewal: Optional[float] = None
+        self.claimed = 0
+        self.released = 0
+        self.lost = 0
+        # Serializes local start/stop between the heartbeat thread and API calls
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    @property
+    def stop_after(self) -> float:
+        """Seconds after the last renewal at which local streams are stopped"""
+        return max(self.lease_ttl - self.heartbeat_interval, self.lease_ttl / 2)
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="cluster-coordinator", daemon=True)
+        self._thread.start()
+        self._watchdog = threading.Thread(target=self._watch_leases, name="cluster-lease-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        """Leave the cluster: stop local streams and free their leases for other nodes"""
+        self._stop_event.set()
+        self._wakeup.set()
+        for thread in (self._thread, self._watchdog):
+            if thread is not None:
+                thread.join(timeout=10.0)
+        with self._lock:
+            owned = list(self.stream_mgr.workers)
+            self.stream_mgr.stop_all()
+        try:
+            with get_write_session() as db:
+                if owned:
+                    db.execute(update(Stream).where(Stream.owner_node == self.node_id)
+                               .values(owner_node=None, lease_expires=None))
+                db.execute(delete(ClusterNode).where(ClusterNode.node_id == self.node_id))
+        except Exception as e:
+            vms_logger.log_database_error("cluster_leave", str(e), "streams")
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                vms_logger.log_database_error("cluster_heartbeat", str(e), "streams")
+            # Jitter keeps nodes started together from contending on every tick
+            self._wakeup.wait(self.heartbeat_interval * random.uniform(0.8, 1.2))
+            self._wakeup.clear()
+
+    def tick(self) -> None:
+        """One heartbeat: renew, reconcile, rebalance, claim"""
+        now = time.time()
+        expires = now + self.lease_ttl
+        with get_write_session() as db:
+            node = db.get(ClusterNode, self.node_id)
+            if node is None:
+                db.add(ClusterNode(node_id=self.node_id, capacity=self.capacity,
+                                   heartbeat_at=now, started_at=self.started_at))
+            else:
+                node.heartbeat_at = now
+                node.capacity = self.capacity
+            db.execute(update(Stream).where(Stream.owner_node == self.node_id, Stream.status == "active")
+                       .values(lease_expires=expires))
+        self.last_renewal = now
+        with self._lock:
+            # Read under the lock so a stream submitted meanwhile is not mistaken for a lost one
+            with get_db_session() as db:
+                owned = set(db.execute(select(Stream.stream_id).where(
+                    Stream.owner_node == self.node_id, Stream.status == "active")).scalars())
+                active = db.execute(select(Stream.stream_id).where(Stream.status == "active")).scalars().all()
+                live_nodes = db.execute(select(ClusterNode.node_id).where(
+                    ClusterNode.heartbeat_at >= now - self.lease_ttl)).scalars().all()
+            # Stopped through another node, or claimed by another node after our lease lapsed
+            for stream_id in list(self.stream_mgr.workers):
+                if stream_id not in owned:
+                    self.stream_mgr.stop_stream(stream_id)
+                    self.lost += 1
+                    vms_logger.log_stream_stop(stream_id, f"lease_lost_by_{self.node_id}")
+            # Workers that died are handed back rather than left holding a lease
+            for stream_id in list(owned):
+                worker = self.stream_mgr.workers.get(stream_id)
+                if worker is not None and not worker.is_alive():
+                    self.stream_mgr.stop_stream(stream_id)
+                    self._release([stream_id])
+                    owned.discard(stream_id)
+            share = min(self.capacity, math.ceil(len(active) / max(1, len(live_nodes))))
+            if len(owned) > share:
+                extra = sorted(owned)[share:]
+                for stream_id in extra:
+                    self.stream_mgr.stop_stream(stream_id)
+                self._release(extra)
+                owned.difference_update(extra)
+            # Leased to us but not running here (e.g. after a restart with the same node id)
+            for stream_id in owned - set(self.stream_mgr.workers):
+                self._start_local(stream_id)
+            if len(owned) < share and not self.stream_mgr.at_capacity():
+                self._claim(share - len(owned), now, expires)
+
+    def _watch_leases(self) -> None:
+        # Independent of the heartbeat thread, which may be stuck in a database call
+        while not self._stop_event.is_set():
+            if self.last_renewal is None:
+                wait = self.heartbeat_interval
+            else:
+                wait = self.last_renewal + self.stop_after - time.time()
+                if wait <= 0:
+                    self._expire_if_stale()
+                    wait = self.heartbeat_interval
+            self._stop_event.wait(wait)
+
+    def _is_stale(self) -> bool:
+        return self.last_renewal is not None and time.time() - self.last_renewal >= self.stop_after
+
+    def _expire_if_stale(self) -> None:
+        """Stop everything before our leases can be taken over"""
+        if not self._is_stale() or not self.stream_mgr.workers:
+            return
+        # Not under self._lock, which a hung heartbeat may hold; a renewal
+        # that lands meanwhile ends the sweep. Results are not waited for:
+        # the database is most likely what is failing.
+        stopped = 0
+        for stream_id in list(self.stream_mgr.workers):
+            if not self._is_stale():
+                break
+            if self.stream_mgr.stop_stream(stream_id, flush_timeout=0.0):
+                stopped += 1
+        self.lost += stopped
+        vms_logger.main_logger.warning(
+            f"⚠️ Node '{self.node_id}' could not renew its leases; stopped {stopped} local streams")
+
+    def _claim(self, count: int, now: float, expires: float) -> int:
+        with get_db_session() as db:
+            candidates = db.execute(select(Stream.id, Stream.stream_id).where(
+                Stream.status == "active",
+                or_(Stream.owner_node.is_(None), Stream.lease_expires < now),
+            )).fetchall()
+        random.shuffle(candidates)
+        claimed = 0
+        for row in candidates:
+            if claimed >= count:
+                break
+            with get_write_session() as db:
+                won = db.execute(update(Stream).where(
+                    Stream.id == row.id,
+                    Stream.status == "active",
+                    or_(Stream.owner_node.is_(None), Stream.lease_expires < now),
+                ).values(owner_node=self.node_id, lease_expires=expires)).rowcount == 1
+            if won and self._start_local(row.stream_id):
+                claimed += 1
+                self.claimed += 1
+        return claimed
+
+    def _release(self, stream_ids: List[str]) -> None:
+        if not stream_ids:
+            return
+        with get_write_session() as db:
+            db.execute(update(Stream).where(Stream.stream_id.in_(stream_ids), Stream.owner_node == self.node_id)
+                       .values(owner_node=None, lease_expires=None))
+        self.released += len(stream_ids)
+
+    def _start_local(self, stream_id: str) -> bool:
+        with get_db_session() as db:
+            stream = db.execute(select(Stream).where(Stream.stream_id == stream_id)).scalar_one_or_none()
+            if stream is None:
+                return False
+            source, models = stream.source, json.loads(stream.models)
+            options = json.loads(stream.options) if stream.options else {}
+        started = self.stream_mgr.start_stream(stream_id, source, models,
+                                               **{k: v for k, v in options.items() if k in STREAM_OPTIONS})
+        if started:
+            vms_logger.log_stream_start(stream_id, source, models)
+        return started
+
+    def submit(self, stream_id: str) -> Optional[str]:
+        """Place a stream saved as active: run it here if there is room, else leave it for
+        another node. Returns the owning node, or None while unplaced"""
+        now = time.time()
+        with self._lock:
+            if len(self.stream_mgr.workers) < self.capacity and not self.stream_mgr.at_capacity():
+                self._claim_one(stream_id, now)
+        self._wakeup.set()
+        return self.owner(stream_id)
+
+    def _claim_one(self, stream_id: str, now: float) -> None:
+        with get_write_session() as db:
+            won = db.execute(update(Stream).where(
+                Stream.stream_id == stream_id,
+                Stream.status == "active",
+                or_(Stream.owner_node.is_(None), Stream.lease_expires < now),
+            ).values(owner_node=self.node_id, lease_expires=now + self.lease_ttl)).rowcount == 1
+        if won and self._start_local(stream_id):
+            self.claimed += 1
+
+    def withdraw(self, stream_id: str) -> bool:
+        """Stop a stream cluster-wide; its owner stops it here or on its next heartbeat"""
+        with get_write_session() as db:
+            found = db.execute(update(Stream).where(Stream.stream_id == stream_id, Stream.status == "active")
+                               .values(status="stopped", owner_node=None, lease_expires=None)).rowcount == 1
+        with self._lock:
+            self.stream_mgr.stop_stream(stream_id)
+        return found
+
+    def active_streams(self) -> List[str]:
+        """Ids of every active stream in the cluster, wherever it runs"""
+        with get_db_session() as db:
+            return list(db.execute(select(Stream.stream_id).where(
+                Stream.status == "active").order_by(Stream.stream_id)).scalars())
+
+    def owner(self, stream_id: str) -> Optional[str]:
+        with get_db_session() as db:
+            return db.execute(select(Stream.owner_node).where(
+                Stream.stream_id == stream_id, Stream.lease_expires >= time.time())).scalar_one_or_none()
+
+    def placement(self) -> List[dict]:
+        """Every active stream with its owner; streams running here include local stats"""
+        now = time.time()
+        local = {s["stream_id"]: s for s in self.stream_mgr.status()}
+        with get_db_session() as db:
+            streams = db.execute(select(Stream).where(Stream.status == "active")).scalars().all()
+            placed = []
+            for s in streams:
+                leased = s.owner_node is not None and s.lease_expires is not None and s.lease_expires >= now
+                entry = local.get(s.stream_id) or {
+                    "stream_id": s.stream_id,
+                    "source": s.source,
+                    "models": json.loads(s.models),
+                    "running": leased,
+                }
+                placed.append({**entry, "node": s.owner_node if leased else None,
+                               "lease_expires": s.lease_expires if leased else None})
+        return placed
+
+    def nodes(self) -> List[dict]:
+        now = time.time()
+        with get_db_session() as db:
+            counts = dict(db.execute(select(Stream.owner_node, func.count()).where(
+                Stream.status == "active", Stream.lease_expires >= now).group_by(Stream.owner_node)).fetchall())
+            return [{
+                "node_id": n.node_id,
+                "capacity": n.capacity,
+                "streams": counts.get(n.node_id, 0),
+                "alive": n.heartbeat_at >= now - self.lease_ttl,
+                "heartbeat_age": round(now - n.heartbeat_at, 1),
+            } for n in db.execute(select(ClusterNode).order_by(ClusterNode.node_id)).scalars()]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "capacity": self.capacity,
+            "running": len(self.stream_mgr.workers),
+            "claimed": self.claimed,
+            "released": self.released,
+            "lost": self.lost,
+            "last_renewal_age": round(time.time() - self.last_renewal, 1) if self.last_renewal else None,
+        }
+
+def create_coordinator(stream_mgr: StreamManager) -> Optional[StreamCoordinator]:
+    if not CLUSTER_CONFIG["enabled"]:
+        return None
+    return StreamCoordinator(
+        stream_mgr,
+        CLUSTER_CONFIG["node_id"],
+        CLUSTER_CONFIG["capacity"],
+        lease_ttl=CLUSTER_CONFIG["lease_ttl"],
+        heartbeat_interval=CLUSTER_CONFIG["heartbeat_interval"],
+    )
@@ -0,0 +1,307 @@
+import json
+import operator
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import quote, unquote
+import numpy as np
+from sqlalchemy import select, distinct, cast, func, Integer
+from .database import get_db_session, get_engine, StreamResult
+from .result_codec import decode_row
+from .db_storage import WRITE_BEHIND_CONFIG
+from .logger import vms_logger
+
+DAY = 86400
+
+def _late_write_window() -> float:
+    """How long after its timestamp a result can still reach stream_results"""
+    # A flush interval plus every retry backoff (capped at the buffer's 30 s),
+    # and a minute for the frame's own processing, which starts at its timestamp
+    backoffs = sum(min(30.0, WRITE_BEHIND_CONFIG["retry_backoff"] * 2 ** i)
+                   for i in range(WRITE_BEHIND_CONFIG["max_retries"]))
+    return WRITE_BEHIND_CONFIG["flush_interval"] + backoffs + 60.0
+
+# Per-day columnar export of stream_results for offline analytics; opt-in,
+# with no default directory since it copies all history to local disk
+COLUMNAR_ARCHIVE_CONFIG = {
+    "enabled": os.getenv("VMS_COLUMNAR_ARCHIVE", "0") == "1",
+    "dir": os.getenv("VMS_COLUMNAR_ARCHIVE_DIR", ""),
+    # A day is exported only this many seconds after it ends; 0 = the write-behind late-write window
+    "settle": float(os.getenv("VMS_COLUMNAR_ARCHIVE_SETTLE", "0")) or _late_write_window(),
+}
+
+OPERATORS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt,
+    "<=": operator.le, "==": operator.eq, "!=": operator.ne,
+}
+
+# (field, operator, value)
+Condition = Tuple[str, str, Any]
+
+def parse_conditions(expr: str) -> List[Condition]:
+    """Parse "defect_score>0.7,defect_type==major" into conditions"""
+    conditions = []
+    for part in filter(None, (p.strip() for p in expr.split(","))):
+        for op in (">=", "<=", "==", "!=", ">", "<"):
+            field, found, value = part.partition(op)
+            if found:
+                try:
+                    parsed: Any = float(value)
+                except ValueError:
+                    parsed = value.strip()
+                conditions.append((field.strip(), op, parsed))
+                break
+        else:
+            raise ValueError(f"Invalid condition: {part}")
+    return conditions
+
+def _day_key(day: int) -> str:
+    return datetime.fromtimestamp(day * DAY, tz=timezone.utc).strftime("%Y%m%d")
+
+class ColumnarArchive:
+    """Per-stream, per-day, per-model column files for historical results.
+
+    Layout is <root>/<stream>/<YYYYMMDD>/<model>/ with one .npy file per column:
+    float64 for timestamps and numeric summary fields, int16 category codes for
+    string fields (vocabulary in meta.json, -1 when absent). Nested payloads such
+    as detections are not archived. Reads memory-map the columns, so queries
+    only page in the columns and days they touch. <root>/archived_through
+    records the first day not yet fully archived, so each export only scans
+    the rows from that day on. A day is exported only once `settle` seconds
+    have passed since it ended, so results still buffered by write-behind
+    land before the day and the watermark are closed.
+    """
+
+    def __init__(self, root: str, settle: float = 0.0) -> None:
+        self.root = Path(root)
+        self.settle = settle
+        self.days_exported = 0
+        self.rows_exported = 0
+        self.last_export_duration = 0.0
+        self._watermark_path = self.root / "archived_through"
+        # Every day before this one is archived; None until the first full scan
+        self.archived_through: Optional[int] = self._read_watermark()
+
+    def _read_watermark(self) -> Optional[int]:
+        try:
+            return int(self._watermark_path.read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _write_watermark(self, day: int) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._watermark_path.with_suffix(".tmp")
+        tmp.write_text(str(day))
+        tmp.replace(self._watermark_path)
+        self.archived_through = day
+
+    def _stream_dir(self, stream_id: str) -> Path:
+        return self.root / quote(stream_id, safe="")
+
+    def streams(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(unquote(p.name) for p in self.root.iterdir() if p.is_dir())
+
+    def days(self, stream_id: str) -> List[str]:
+        stream_dir = self._stream_dir(stream_id)
+        if not stream_dir.exists():
+            return []
+        return sorted(p.name for p in stream_dir.iterdir() if p.is_dir() and not p.name.endswith(".tmp"))
+
+    def has_day(self, stream_id: str, day: int) -> bool:
+        return (self._stream_dir(stream_id) / _day_key(day)).is_dir()
+
+    # Export
+
+    def export_day(self, stream_id: str, day: int) -> int:
+        """Roll one UTC day of a stream's results into column files; returns rows written"""
+        columns: Dict[str, Dict[str, list]] = {}
+        counts: Dict[str, int] = {}
+        with get_db_session() as db:
+            query = select(
+                StreamResult.model_name, StreamResult.timestamp, StreamResult.result_data, StreamResult.result_blob
+            ).where(
+                StreamResult.stream_id == stream_id,
+                StreamResult.timestamp >= day * DAY,
+                StreamResult.timestamp < (day + 1) * DAY,
+            ).order_by(StreamResult.timestamp).execution_options(yield_per=10000)
+            for r in db.execute(query):
+                model_columns = columns.setdefault(r.model_name, {"timestamp": []})
+                n = counts.get(r.model_name, 0)
+                model_columns["timestamp"].append(r.timestamp)
+                for field, value in decode_row(r.result_data, r.result_blob).items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                        continue
+                    # Back-fill rows that predate this field with None
+                    model_columns.setdefault(field, [None] * n).append(value)
+                for values in model_columns.values():
+                    if len(values) == n:
+                        values.append(None)
+                counts[r.model_name] = n + 1
+        day_dir = self._stream_dir(stream_id) / _day_key(day)
+        tmp_dir = day_dir.with_name(day_dir.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        for model_name, model_columns in columns.items():
+            self._write_model(tmp_dir / quote(model_name, safe=""), model_columns)
+        # Swap the finished day in; readers only ever see complete days
+        shutil.rmtree(day_dir, ignore_errors=True)
+        os.replace(tmp_dir, day_dir)
+        return sum(counts.values())
+
+    def _write_model(self, model_dir: Path, model_columns: Dict[str, list]) -> None:
+        model_dir.mkdir()
+        meta: Dict[str, Any] = {"rows": len(model_columns["timestamp"]), "fields": {}, "categories": {}}
+        for field, values in model_columns.items():
+            if all(v is None or isinstance(v, str) for v in values):
+                vocabulary = sorted({v for v in values if v is not None})
+                index = {v: i for i, v in enumerate(vocabulary)}
+                array = np.array([index.get(v, -1) for v in values], dtype=np.int16)
+                meta["fields"][field] = "category"
+                meta["categories"][field] = vocabulary
+            elif all(v is None or isinstance(v, (int, float)) for v in values):
+                array = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+                meta["fields"][field] = "float"
+            else:
+                continue
+            np.save(model_dir / f"{field}.npy", array)
+        (model_dir / "meta.json").write_text(json.dumps(meta))
+
+    def _pending_days(self, before: float) -> List[Tuple[str, int]]:
+        """(stream_id, day) pairs in stream_results that end before `before` and are not archived"""
+        conditions = [StreamResult.timestamp < before]
+        if self.archived_through is not None:
+            # Days before the watermark are done; only newer rows need a look
+            conditions.append(StreamResult.timestamp >= self.archived_through * DAY)
+        with get_db_session() as db:
+            # SQLite's CAST truncates; MySQL's rounds, so it needs FLOOR
+            if get_engine().dialect.name == "sqlite":
+                day_expr = cast(StreamResult.timestamp / DAY, Integer)
+            else:
+                day_expr = func.floor(StreamResult.timestamp / DAY)
+            pairs = db.execute(
+                select(distinct(StreamResult.stream_id), day_expr).where(*conditions)
+            ).fetchall()
+        last_day = int(before // DAY)
+        return sorted((s, int(d)) for s, d in pairs if d < last_day and not self.has_day(s, int(d)))
+
+    def export_pending(self, before: Optional[float] = None) -> int:
+        """Archive every complete day before `before` not archived yet.
+
+        By default that is the start of the UTC day `settle` seconds ago.
+        """
+        before = before if before is not None else ((time.time() - self.settle) // DAY) * DAY
+        start_time = time.time()
+        exported = 0
+        for stream_id, day in self._pending_days(before):
+            rows = self.export_day(stream_id, day)
+            self.days_exported += 1
+            self.rows_exported += rows
+            exported += 1
+            vms_logger.log_database_operation("archive", "stream_results", rows)
+        last_day = int(before // DAY)
+        if self.archived_through is None or last_day > self.archived_through:
+            self._write_watermark(last_day)
+        self.last_export_duration = time.time() - start_time
+        return exported
+
+    # Query
+
+    def _load_model(self, model_dir: Path) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        meta = json.loads((model_dir / "meta.json").read_text())
+        columns = {field: np.load(model_dir / f"{field}.npy", mmap_mode="r") for field in meta["fields"]}
+        return meta, columns
+
+    def _mask(self, meta: Dict[str, Any], columns: Dict[str, np.ndarray],
+              conditions: List[Condition]) -> Optional[np.ndarray]:
+        mask = np.ones(meta["rows"], dtype=bool)
+        for field, op, value in conditions:
+            if field not in columns:
+                return None
+            compare = OPERATORS[op]
+            if meta["fields"][field] == "category":
+                if op not in ("==", "!="):
+                    raise ValueError(f"{field} is categorical; only == and != are supported")
+                vocabulary = meta["categories"][field]
+                code = vocabulary.index(value) if value in vocabulary else -2
+                mask &= compare(columns[field], code)
+            else:
+                mask &= compare(columns[field], float(value))
+        return mask
+
+    def query(self, stream_id: str, model_name: str, start: float, end: float,
+              conditions: Optional[List[Condition]] = None, fields: Optional[List[str]] = None,
+              limit: Optional[int] = 1000) -> Dict[str, Any]:
+        """Archived rows of one model in [start, end) matching every condition, oldest first"""
+        conditions = conditions or []
+        for _, op, _ in conditions:
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown operator: {op}")
+        first, last = _day_key(int(start // DAY)), _day_key(int((end - 1e-6) // DAY))
+        scanned = 0
+        matched = 0
+        rows: List[Dict[str, Any]] = []
+        query_start = time.time()
+        for day in self.days(stream_id):
+            if not first <= day <= last:
+                continue
+            model_dir = self._stream_dir(stream_id) / day / quote(model_name, safe="")
+            if not (model_dir / "meta.json").exists():
+                continue
+            meta, columns = self._load_model(model_dir)
+            scanned += meta["rows"]
+            timestamps = columns["timestamp"]
+            mask = self._mask(meta, columns, conditions)
+            if mask is None:
+                continue
+            mask &= (timestamps >= start) & (timestamps < end)
+            indices = np.flatnonzero(mask)
+            matched += len(indices)
+            if limit is not None:
+                indices = indices[:max(0, limit - len(rows))]
+            if len(indices) == 0:
+                continue
+            selected = {field: np.asarray(columns[field][indices])
+                        for field in (fields or list(meta["fields"])) if field in columns}
+            selected.setdefault("timestamp", np.asarray(timestamps[indices]))
+            for i in range(len(indices)):
+                row = {}
+                for field, values in selected.items():
+                    value = values[i].item()
+                    if meta["fields"][field] == "category":
+                        value = meta["categories"][field][value] if value >= 0 else None
+                    elif value != value:  # NaN: field absent on this row
+                        value = None
+                    row[field] = value
+                rows.append(row)
+        return {
+            "stream_id": stream_id,
+            "model": model_name,
+            "scanned": scanned,
+            "matched": matched,
+            "rows": rows,
+            "query_time": round(time.time() - query_start, 4),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "root": str(self.root),
+            "days_exported": self.days_exported,
+            "rows_exported": self.rows_exported,
+            "last_export_duration": round(self.last_export_duration, 3),
+            "archived_through": self.archived_through,
+            "settle": self.settle,
+        }
+
+def create_archive() -> Optional[ColumnarArchive]:
+    """Build the archive from COLUMNAR_ARCHIVE_CONFIG, or None when it is disabled"""
+    if not COLUMNAR_ARCHIVE_CONFIG["enabled"]:
+        return None
+    if not COLUMNAR_ARCHIVE_CONFIG["dir"]:
+        vms_logger.main_logger.warning("⚠️ VMS_COLUMNAR_ARCHIVE=1 needs VMS_COLUMNAR_ARCHIVE_DIR; archive disabled")
+        return None
+    return ColumnarArchive(COLUMNAR_ARCHIVE_CONFIG["dir"], settle=COLUMNAR_ARCHIVE_CONFIG["settle"])
@@ -1,43 +1,205 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, Boolean
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, Text, Float, Double, Boolean, LargeBinary, UniqueConstraint, Index, text, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.sql import func
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Database configuration
+# Database configuration; VMS_DB_ENGINE selects "mysql" or the embedded "sqlite" backend
 DATABASE_CONFIG = {
-    "username": "admin",
-    "password": "satyam2000", 
-    "database": "road_vision_ai",
-    "host": "roadvisionai.cmre84si2720.us-east-1.rds.amazonaws.com",
-    "dialect": "mysql",
-    "port": 3306
+    "engine": os.getenv("VMS_DB_ENGINE", "mysql"),
+    "username": os.getenv("VMS_DB_USER", "admin"),
+    "password": os.getenv("VMS_DB_PASSWORD", "satyam2000"),
+    "database": os.getenv("VMS_DB_NAME", "road_vision_ai"),
+    "host": os.getenv("VMS_DB_HOST", "roadvisionai.cmre84si2720.us-east-1.rds.amazonaws.com"),
+    "port": int(os.getenv("VMS_DB_PORT", "3306")),
+    "sqlite_path": os.getenv("VMS_SQLITE_PATH", "road_vision_ai.db"),
 }
 
-# MySQL connection only - no fallback
-DATABASE_URL = f"mysql+pymysql://{DATABASE_CONFIG['username']}:{DATABASE_CONFIG['password']}@{DATABASE_CONFIG['host']}:{DATABASE_CONFIG['port']}/{DATABASE_CONFIG['database']}?charset=utf8mb4"
-
-try:
-    engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True)
-    # Test connection
-    with engine.connect() as conn:
-        from sqlalchemy import text
-        conn.execute(text("SELECT 1"))
-    print("✅ Connected to MySQL database on localhost")
-    DB_TYPE = "mysql"
-except Exception as e:
-    print(f"❌ MySQL connection failed: {e}")
-    print("💡 Please ensure MySQL is running on localhost:3306 with credentials root/satyam2000")
-    print("💡 Create database: CREATE DATABASE road_vision_ai;")
-    raise Exception(f"MySQL connection required but failed: {e}")
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connection pool. Sized for many stream threads plus API handlers; the
+# default (5 + 10 overflow) starves under load.
+POOL_CONFIG = {
+    "pool_size": int(os.getenv("VMS_DB_POOL_SIZE", "20")),
+    "max_overflow": int(os.getenv("VMS_DB_MAX_OVERFLOW", "30")),
+    "pool_recycle": int(os.getenv("VMS_DB_POOL_RECYCLE", "1800")),
+    "pool_timeout": float(os.getenv("VMS_DB_POOL_TIMEOUT", "30")),
+}
+
+# Applied to every SQLite connection: WAL lets readers run alongside the writer,
+# synchronous=NORMAL is durable across application crashes in WAL mode
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("VMS_SQLITE_BUSY_TIMEOUT", "5000")),
+    "cache_size": -int(os.getenv("VMS_SQLITE_CACHE_KB", "65536")),
+    "mmap_size": int(os.getenv("VMS_SQLITE_MMAP_BYTES", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+    "wal_autocheckpoint": 1000,
+}
+
+DB_TYPE = DATABASE_CONFIG["engine"]
+
+def _database_url() -> str:
+    if os.getenv("VMS_DATABASE_URL"):
+        return os.environ["VMS_DATABASE_URL"]
+    if DB_TYPE == "sqlite":
+        return f"sqlite:///{DATABASE_CONFIG['sqlite_path']}"
+    if DB_TYPE == "mysql":
+        return (f"mysql+pymysql://{DATABASE_CONFIG['username']}:{DATABASE_CONFIG['password']}"
+                f"@{DATABASE_CONFIG['host']}:{DATABASE_CONFIG['port']}/{DATABASE_CONFIG['database']}?charset=utf8mb4")
+    raise ValueError(f"Unknown VMS_DB_ENGINE: {DB_TYPE}")
+
+DATABASE_URL = _database_url()
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def build_engine(url: str):
+    if url.startswith("sqlite"):
+        sqlite_engine = create_engine(
+            url, echo=False,
+            connect_args={"check_same_thread": False, "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+            **POOL_CONFIG,
+        )
+        event.listen(sqlite_engine, "connect", _apply_sqlite_pragmas)
+        return sqlite_engine
+    return create_engine(url, echo=False, pool_pre_ping=True, **POOL_CONFIG)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    """The shared engine, created on first use so importing this module never connects"""
+    global _engine, writer_gate
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                built = build_engine(DATABASE_URL)
+                writer_gate = WriterGate() if built.dialect.name == "sqlite" else None
+                _engine = built
+    return _engine
+
+# Async drivers used by the asyncio engine for each sync dialect
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+
+_async_engine = None
+
+def get_async_engine():
+    """Asyncio engine on the same database, for the async API read path (created on first use)"""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                url = make_url(DATABASE_URL)
+                backend = url.get_backend_name()
+                url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+                if backend == "sqlite":
+                    # aiosqlite defaults to NullPool, i.e. a new connection and thread per session
+                    built = create_async_engine(
+                        url, echo=False, poolclass=AsyncAdaptedQueuePool,
+                        connect_args={"timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000}, **POOL_CONFIG
+                    )
+                    event.listen(built.sync_engine, "connect", _apply_sqlite_pragmas)
+                else:
+                    built = create_async_engine(url, echo=False, pool_pre_ping=True, **POOL_CONFIG)
+                _async_engine = built
+    return _async_engine
+
+AsyncSessionLocal = async_sessionmaker(expire_on_commit=False)
+
+@asynccontextmanager
+async def get_async_session():
+    """Async counterpart of get_db_session()"""
+    session = AsyncSessionLocal(bind=get_async_engine())
+    try:
+        yield session
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        raise e
+    finally:
+        await session.close()
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+def check_connection() -> None:
+    """Fail fast with setup hints when the configured database is unreachable"""
+    engine = get_engine()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        print(f"✅ Connected to {engine.dialect.name} database")
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        if engine.dialect.name == "mysql":
+            print("💡 Check VMS_DB_HOST/VMS_DB_USER/VMS_DB_PASSWORD and that the database exists:")
+            print("💡 CREATE DATABASE road_vision_ai;")
+            print("💡 Or run locally with VMS_DB_ENGINE=sqlite")
+        raise Exception(f"Database connection required but failed: {e}")
+
+class WriterGate:
+    """FIFO single-writer queue for SQLite.
+
+    SQLite allows one writer at a time; concurrent writers otherwise spin on
+    busy_timeout and can fail with "database is locked". Write sessions take a
+    ticket and run strictly one after another, while readers are never gated.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self.writes = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @contextmanager
+    def turn(self):
+        start_time = time.perf_counter()
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while self._serving != ticket:
+                self._cond.wait()
+        wait = time.perf_counter() - start_time
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._serving += 1
+                self.writes += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queued_writers": self._next_ticket - self._serving,
+                "writes": self.writes,
+                "avg_wait": round(self.total_wait / self.writes, 6) if self.writes else 0.0,
+                "max_wait": round(self.max_wait, 6),
+            }
+
+writer_gate: Optional[WriterGate] = None
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
 class Stream(Base):
@@ -48,21 +210,43 @@ class Stream(Base):
     source = Column(String(500), nullable=False)
     models = Column(Text, nullable=False)  # JSON string of model names
     status = Column(String(50), default="active")
+    # JSON of the start request's pipeline options, so any node can run the stream
+    options = Column(Text, nullable=True)
+    # Cluster mode: node currently running the stream and when its lease runs out (epoch seconds)
+    owner_node = Column(String(255), nullable=True, index=True)
+    lease_expires = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class ClusterNode(Base):
+    __tablename__ = "cluster_nodes"
+    
+    node_id = Column(String(255), primary_key=True)
+    capacity = Column(Integer, nullable=False)
+    heartbeat_at = Column(Float, nullable=False)
+    started_at = Column(Float, nullable=False)
+
 class StreamResult(Base):
     __tablename__ = "stream_results"
+    __table_args__ = (
+        # Serves WHERE stream_id=? ORDER BY timestamp DESC without a filesort
+        Index("idx_stream_ts", "stream_id", "timestamp"),
+        Index("idx_timestamp", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    stream_id = Column(String(255), index=True, nullable=False)
+    stream_id = Column(String(255), nullable=False)
     model_name = Column(String(255), nullable=False)
     timestamp = Column(Float, nullable=False)
-    result_data = Column(Text, nullable=False)  # JSON string of results
+    result_data = Column(Text, nullable=False)  # JSON string of results; '' when result_blob is set
+    result_blob = Column(LargeBinary, nullable=True)  # result_codec encoding of the summary
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        Index("idx_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     stream_id = Column(String(255), index=True, nullable=False)
@@ -73,14 +257,147 @@ class Alert(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     resolved_at = Column(DateTime(timezone=True), nullable=True)
 
+class MetricRollup(Base):
+    __tablename__ = "metric_rollups"
+    __table_args__ = (
+        UniqueConstraint("stream_id", "model_name", "field", "resolution", "bucket_start", name="uq_metric_rollup_bucket"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    stream_id = Column(String(255), nullable=False)
+    model_name = Column(String(255), nullable=False)
+    field = Column(String(100), nullable=False)
+    resolution = Column(String(10), nullable=False)  # "minute" or "hour"
+    bucket_start = Column(Double, nullable=False)  # epoch seconds
+    count = Column(Integer, nullable=False, default=0)
+    min_value = Column(Double, nullable=False)
+    max_value = Column(Double, nullable=False)
+    sum_value = Column(Double, nullable=False)
+    sketch = Column(Text, nullable=False)  # JSON-encoded QuantileSketch
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 def create_tables():
     """Create all database tables"""
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
+    ensure_columns()
+    ensure_indexes()
+
+def ensure_columns():
+    """Add nullable columns declared on the models that are missing from existing tables"""
+    engine = get_engine()
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with get_engine().begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type} NULL"))
+
+# Single-column indexes from older schemas, now leading prefixes of (or
+# duplicates of) the indexes declared on the models; they only slow inserts
+REDUNDANT_INDEXES = {
+    "stream_results": ("ix_stream_results_stream_id", "ix_stream_results_timestamp"),
+}
+
+def ensure_indexes():
+    """Add indexes declared on the models that are missing from existing tables, drop redundant ones"""
+    engine = get_engine()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+        redundant = REDUNDANT_INDEXES.get(table.name, ())
+        if not redundant:
+            continue
+        for existing in inspect(engine).get_indexes(table.name):
+            if existing["name"] in redundant:
+                Index(existing["name"], *(table.c[c] for c in existing["column_names"])).drop(bind=engine)
+
+# Time partitioning of stream_results (MySQL only). Partitions are daily
+# ranges over UNIX_TIMESTAMP(created_at), named pYYYYMMDD, plus a pmax catch-all.
+# Row retention cuts on `timestamp` instead: MySQL cannot partition on a FLOAT
+# column. created_at is the insert time, never earlier than the frame's
+# timestamp, so a partition past the cutoff only holds expired rows; rows
+# inserted late enough to land in a newer partition are deleted row by row.
+PARTITION_PREFIX = "p"
+
+def _partition_name(day: datetime) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+def _day_bound(day: datetime) -> int:
+    """Exclusive upper bound of a day's partition, in epoch seconds"""
+    return int((day + timedelta(days=1)).timestamp())
+
+def partitioning_supported() -> bool:
+    return get_engine().dialect.name == "mysql"
+
+def result_partitions() -> List[Tuple[str, Optional[int]]]:
+    """(name, exclusive upper bound) of each stream_results partition, oldest first"""
+    if not partitioning_supported():
+        return []
+    with get_engine().connect() as conn:
+        rows = conn.execute(text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'stream_results' AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        )).fetchall()
+    return [(name, None if desc == "MAXVALUE" else int(desc)) for name, desc in rows]
+
+def partition_stream_results(days_ahead: int = 3) -> None:
+    """Convert stream_results to the daily-partitioned layout (one-off, rewrites the table)"""
+    if not partitioning_supported():
+        raise RuntimeError("Time partitioning requires MySQL")
+    if result_partitions():
+        return
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = [today + timedelta(days=i) for i in range(days_ahead + 1)]
+    parts = ", ".join(f"PARTITION {_partition_name(d)} VALUES LESS THAN ({_day_bound(d)})" for d in days)
+    with get_engine().begin() as conn:
+        # Every unique key must contain the partitioning column
+        conn.execute(text("ALTER TABLE stream_results MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"))
+        conn.execute(text("ALTER TABLE stream_results DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"))
+        conn.execute(text(
+            f"ALTER TABLE stream_results PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) "
+            f"({parts}, PARTITION {PARTITION_PREFIX}max VALUES LESS THAN MAXVALUE)"
+        ))
+
+def ensure_result_partitions(days_ahead: int = 3) -> List[str]:
+    """Split pmax so partitions exist for the next days_ahead days; returns the names added"""
+    partitions = result_partitions()
+    if not partitions:
+        return []
+    bounds = [b for _, b in partitions if b is not None]
+    last_bound = max(bounds) if bounds else None
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    added = []
+    for i in range(days_ahead + 1):
+        day = today + timedelta(days=i)
+        if last_bound is not None and _day_bound(day) <= last_bound:
+            continue
+        added.append(f"PARTITION {_partition_name(day)} VALUES LESS THAN ({_day_bound(day)})")
+    if added:
+        with get_engine().begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE stream_results REORGANIZE PARTITION {PARTITION_PREFIX}max INTO "
+                f"({', '.join(added)}, PARTITION {PARTITION_PREFIX}max VALUES LESS THAN MAXVALUE)"
+            ))
+    return [a.split()[1] for a in added]
+
+def expired_result_partitions(cutoff: float) -> List[str]:
+    """Partitions whose rows are all older than cutoff (epoch seconds)"""
+    return [name for name, bound in result_partitions() if bound is not None and bound <= cutoff]
+
+def drop_result_partition(name: str) -> None:
+    if not name.startswith(PARTITION_PREFIX) or not name[len(PARTITION_PREFIX):].isdigit():
+        raise ValueError(f"Not a daily partition: {name}")
+    with get_engine().begin() as conn:
+        conn.execute(text(f"ALTER TABLE stream_results DROP PARTITION {name}"))
 
 @contextmanager
 def get_db_session():
     """Context manager for database sessions"""
-    session = SessionLocal()
+    session = SessionLocal(bind=get_engine())
     try:
         yield session
         session.commit()
@@ -90,9 +407,36 @@ def get_db_session():
     finally:
         session.close()
 
+@contextmanager
+def get_write_session():
+    """Session for writes; on SQLite, writers queue for the single write lock"""
+    get_engine()
+    if writer_gate is None:
+        with get_db_session() as session:
+            yield session
+        return
+    with writer_gate.turn():
+        with get_db_session() as session:
+            yield session
+
+def engine_stats() -> Dict[str, Any]:
+    engine = get_engine()
+    stats: Dict[str, Any] = {"engine": engine.dialect.name}
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        stats.update({
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "checked_in": pool.checkedin(),
+        })
+    if writer_gate is not None:
+        stats["writer"] = writer_gate.stats()
+    return stats
+
 def get_db():
     """Dependency for FastAPI to get database session"""
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
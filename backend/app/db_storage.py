@@ -1,49 +1,259 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import json
+import os
 import time
+from sqlalchemy import insert, select, func, and_, or_
 from sqlalchemy.orm import Session
-from .database import get_db_session, Stream, StreamResult, Alert
+from .database import get_db_session, get_write_session, Stream, StreamResult, Alert
 from .logger import vms_logger
+from .write_behind import WriteBehindBuffer
+from .metrics import DB_WRITE_SECONDS, DB_ROWS_WRITTEN, DB_WRITE_ERRORS, RESULT_PERSIST_SECONDS
+from .storage import InMemoryStorage
+from .rollups import RollupAggregator
+from .result_codec import encode_summary, decode_row
 from datetime import datetime
 
+# Write-behind result persistence: results are queued and bulk inserted
+WRITE_BEHIND_CONFIG = {
+    "enabled": os.getenv("VMS_WRITE_BEHIND", "1") == "1",
+    "max_queue": int(os.getenv("VMS_WRITE_BEHIND_MAX_QUEUE", "20000")),
+    "batch_size": int(os.getenv("VMS_WRITE_BEHIND_BATCH_SIZE", "500")),
+    "flush_interval": float(os.getenv("VMS_WRITE_BEHIND_FLUSH_INTERVAL", "1.0")),
+    # A failed bulk insert is retried with doubling backoff before its rows are dropped
+    "max_retries": int(os.getenv("VMS_WRITE_BEHIND_MAX_RETRIES", "5")),
+    "retry_backoff": float(os.getenv("VMS_WRITE_BEHIND_RETRY_BACKOFF", "0.5")),
+    # How long stopping a stream waits for a batch that is backing off
+    "stop_flush_timeout": float(os.getenv("VMS_WRITE_BEHIND_STOP_FLUSH_TIMEOUT", "5.0")),
+}
+
+# Per-stream, per-model ring buffer serving recent-result reads
+RESULT_CACHE_CONFIG = {
+    "enabled": os.getenv("VMS_RESULT_CACHE", "1") == "1",
+    "per_model_capacity": int(os.getenv("VMS_RESULT_CACHE_PER_MODEL", "200")),
+}
+
+# Incremental per-minute/per-hour rollups of numeric result fields
+ROLLUP_CONFIG = {
+    "enabled": os.getenv("VMS_ROLLUPS", "1") == "1",
+    "flush_interval": float(os.getenv("VMS_ROLLUP_FLUSH_INTERVAL", "10.0")),
+}
+
+# Result summary storage: "binary" packs known models with result_codec, "json" keeps text
+RESULT_CODEC_CONFIG = {
+    "format": os.getenv("VMS_RESULT_FORMAT", "binary"),
+}
+
+# Statements and row conversion shared by DatabaseStorage and AsyncDatabaseStorage
+
+RESULT_COLUMNS = (StreamResult.stream_id, StreamResult.model_name, StreamResult.timestamp,
+                  StreamResult.result_data, StreamResult.result_blob)
+
+def results_query(stream_id: str, limit: int):
+    return select(*RESULT_COLUMNS).where(
+        StreamResult.stream_id == stream_id
+    ).order_by(StreamResult.timestamp.desc()).limit(limit)
+
+def results_batch_query(stream_ids: List[str], limit: int, since: Optional[Dict[str, float]]):
+    """Top `limit` rows per stream in one query using ROW_NUMBER() over each stream,
+    only rows newer than the stream's entry in `since` when it has one"""
+    rank = func.row_number().over(
+        partition_by=StreamResult.stream_id,
+        order_by=StreamResult.timestamp.desc(),
+    ).label("rank")
+    bounded = [s for s in stream_ids if since and s in since]
+    unbounded = [s for s in stream_ids if not since or s not in since]
+    clauses = [and_(StreamResult.stream_id == s, StreamResult.timestamp > since[s]) for s in bounded]
+    if unbounded:
+        clauses.append(StreamResult.stream_id.in_(unbounded))
+    inner = select(*RESULT_COLUMNS, rank).where(or_(*clauses))
+    ranked = inner.subquery()
+    return select(ranked).where(ranked.c.rank <= limit).order_by(ranked.c.stream_id, ranked.c.timestamp.desc())
+
+def alerts_query(resolved: Optional[bool] = None):
+    query = select(Alert)
+    if resolved is not None:
+        query = query.where(Alert.resolved == resolved)
+    return query.order_by(Alert.created_at.desc()).limit(100)
+
+def result_dict(r) -> dict:
+    return {
+        "stream_id": r.stream_id,
+        "model": r.model_name,
+        "timestamp": r.timestamp,
+        "summary": decode_row(r.result_data, r.result_blob)
+    }
+
+def alert_dict(a: Alert) -> dict:
+    return {
+        "id": a.id,
+        "stream_id": a.stream_id,
+        "type": a.alert_type,
+        "message": a.message,
+        "severity": a.severity,
+        "resolved": a.resolved,
+        "created_at": a.created_at.isoformat() if a.created_at else None
+    }
+
+def merge_results(queried: List[dict], cached: List[dict], limit: int) -> List[dict]:
+    """Union of database and buffered rows, deduplicated on (model, timestamp), newest first"""
+    rows = {(r["model"], r["timestamp"]): r for r in queried}
+    for r in cached:
+        rows.setdefault((r["model"], r["timestamp"]), r)
+    return sorted(rows.values(), key=lambda r: r["timestamp"], reverse=True)[:limit]
+
 class DatabaseStorage:
-    def __init__(self):
-        pass
+    def __init__(self, write_behind: Optional[bool] = None):
+        if write_behind is None:
+            write_behind = WRITE_BEHIND_CONFIG["enabled"]
+        self.result_buffer: Optional[WriteBehindBuffer] = None
+        if write_behind:
+            self.result_buffer = WriteBehindBuffer(
+                self._insert_results,
+                "stream_results",
+                max_queue=WRITE_BEHIND_CONFIG["max_queue"],
+                batch_size=WRITE_BEHIND_CONFIG["batch_size"],
+                flush_interval=WRITE_BEHIND_CONFIG["flush_interval"],
+                max_retries=WRITE_BEHIND_CONFIG["max_retries"],
+                retry_backoff=WRITE_BEHIND_CONFIG["retry_backoff"],
+            )
+        self.recent: Optional[InMemoryStorage] = None
+        if RESULT_CACHE_CONFIG["enabled"]:
+            self.recent = InMemoryStorage(per_model_capacity=RESULT_CACHE_CONFIG["per_model_capacity"])
+        self.rollups: Optional[RollupAggregator] = None
+        if ROLLUP_CONFIG["enabled"]:
+            self.rollups = RollupAggregator(flush_interval=ROLLUP_CONFIG["flush_interval"])
+
+    def _result_row(self, stream_id: str, result: dict) -> dict:
+        model_name = result.get('model', 'unknown')
+        summary = result.get('summary', {})
+        row = {
+            "stream_id": stream_id,
+            "model_name": model_name,
+            "timestamp": result.get('timestamp', datetime.now().timestamp()),
+            "result_data": "",
+            "result_blob": None,
+        }
+        if RESULT_CODEC_CONFIG["format"] == "binary":
+            row["result_blob"] = encode_summary(model_name, summary)
+        else:
+            row["result_data"] = json.dumps(summary)
+        return row
+
+    def _insert_results(self, rows: List[dict]) -> None:
+        """Multi-row insert of prepared stream_results rows"""
+        with get_write_session() as db:
+            db.execute(insert(StreamResult), rows)
 
     def add_result(self, stream_id: str, result: dict) -> None:
         """Store AI model result in database"""
+        if self.recent is not None:
+            self.recent.add_result(stream_id, result)
+        if self.rollups is not None:
+            self.rollups.add(stream_id, result.get('model', 'unknown'),
+                             result.get('timestamp', datetime.now().timestamp()), result.get('summary', {}))
+        if self.result_buffer is not None:
+            self.result_buffer.put(self._result_row(stream_id, result))
+            return
         start_time = time.time()
         try:
-            with get_db_session() as db:
-                db_result = StreamResult(
-                    stream_id=stream_id,
-                    model_name=result.get('model', 'unknown'),
-                    timestamp=result.get('timestamp', datetime.now().timestamp()),
-                    result_data=json.dumps(result.get('summary', {}))
-                )
-                db.add(db_result)
-                execution_time = time.time() - start_time
-                vms_logger.log_database_operation("insert", "stream_results", 1, execution_time)
+            row = self._result_row(stream_id, result)
+            with get_write_session() as db:
+                db.add(StreamResult(**row))
+            committed = time.time()
+            execution_time = committed - start_time
+            DB_WRITE_SECONDS.observe(execution_time, "stream_results")
+            DB_ROWS_WRITTEN.inc("stream_results")
+            RESULT_PERSIST_SECONDS.observe(committed - row["timestamp"], "stream_results")
+            vms_logger.log_database_operation("insert", "stream_results", 1, execution_time)
         except Exception as e:
+            DB_WRITE_ERRORS.inc("stream_results")
             vms_logger.log_database_error("insert", str(e), "stream_results")
 
+    def flush_results(self, timeout: float = 0.0) -> bool:
+        """Write any buffered results to the database; False if some are still pending or were dropped"""
+        if self.result_buffer is None:
+            return True
+        return self.result_buffer.flush(timeout)
+
+    def close(self) -> None:
+        """Flush buffered results and stop the background flusher"""
+        if self.result_buffer is not None:
+            self.result_buffer.close()
+        if self.rollups is not None:
+            self.rollups.close()
+
+    def write_behind_metrics(self) -> Optional[Dict[str, Any]]:
+        if self.result_buffer is None:
+            return None
+        return self.result_buffer.metrics()
+
+    def result_cache_metrics(self) -> Optional[Dict[str, Any]]:
+        if self.recent is None:
+            return None
+        return self.recent.stats()
+
     def get_results(self, stream_id: str, limit: int = 100) -> List[dict]:
         """Get recent results for a stream"""
+        if self.recent is None:
+            return self._query_results(stream_id, limit)
+        cached, complete = self.recent.recent_results(stream_id, limit)
+        if complete:
+            return cached
+        # History beyond the buffer; merge in case buffered rows are not flushed yet
+        return merge_results(self._query_results(stream_id, limit), cached, limit)
+
+    def cached_results_batch(self, stream_ids: List[str], limit: int,
+                             since: Optional[Dict[str, float]]) -> Tuple[Dict[str, List[dict]], Dict[str, List[dict]]]:
+        """Split a batch read into streams answered from the ring buffers and partial
+        buffered rows for the streams that still need a database query"""
+        batch: Dict[str, List[dict]] = {}
+        cached: Dict[str, List[dict]] = {}
+        for stream_id in stream_ids:
+            if self.recent is None:
+                cached[stream_id] = []
+                continue
+            rows, complete = self.recent.recent_results(stream_id, limit)
+            if since and stream_id in since:
+                rows = [r for r in rows if r["timestamp"] > since[stream_id]]
+            if complete:
+                batch[stream_id] = rows
+            else:
+                cached[stream_id] = rows
+        return batch, cached
+
+    def get_results_batch(self, stream_ids: List[str], limit: int = 10,
+                          since: Optional[Dict[str, float]] = None) -> Dict[str, List[dict]]:
+        """Latest results for many streams, newest first, optionally only those newer than
+        each stream's timestamp in since.
+
+        Streams the ring buffers can answer completely are served from memory; the
+        rest are fetched together with one windowed query.
+        """
+        batch, cached = self.cached_results_batch(stream_ids, limit, since)
+        if cached:
+            queried = self._query_results_batch(list(cached), limit, since)
+            for stream_id, rows in cached.items():
+                batch[stream_id] = merge_results(queried.get(stream_id, []), rows, limit)
+        return batch
+
+    def _query_results(self, stream_id: str, limit: int) -> List[dict]:
         with get_db_session() as db:
-            results = db.query(StreamResult).filter(
-                StreamResult.stream_id == stream_id
-            ).order_by(StreamResult.timestamp.desc()).limit(limit).all()
-            
-            return [{
-                "stream_id": r.stream_id,
-                "model": r.model_name,
-                "timestamp": r.timestamp,
-                "summary": json.loads(r.result_data)
-            } for r in results]
+            return [result_dict(r) for r in db.execute(results_query(stream_id, limit))]
+
+    def _query_results_batch(self, stream_ids: List[str], limit: int,
+                             since: Optional[Dict[str, float]]) -> Dict[str, List[dict]]:
+        start_time = time.time()
+        results: Dict[str, List[dict]] = {}
+        with get_db_session() as db:
+            for r in db.execute(results_batch_query(stream_ids, limit, since)):
+                results.setdefault(r.stream_id, []).append(result_dict(r))
+        vms_logger.log_database_operation("select", "stream_results", sum(len(v) for v in results.values()), time.time() - start_time)
+        return results
 
     def add_alert(self, alert: dict) -> None:
         """Store alert in database"""
-        with get_db_session() as db:
+        start_time = time.time()
+        with get_write_session() as db:
             db_alert = Alert(
                 stream_id=alert.get('stream_id', ''),
                 alert_type=alert.get('type', 'general'),
@@ -51,36 +261,26 @@ class DatabaseStorage:
                 severity=alert.get('severity', 'medium')
             )
             db.add(db_alert)
+        DB_WRITE_SECONDS.observe(time.time() - start_time, "alerts")
+        DB_ROWS_WRITTEN.inc("alerts")
 
     def get_alerts(self, resolved: Optional[bool] = None) -> List[dict]:
         """Get alerts from database"""
         with get_db_session() as db:
-            query = db.query(Alert)
-            if resolved is not None:
-                query = query.filter(Alert.resolved == resolved)
-            
-            alerts = query.order_by(Alert.created_at.desc()).limit(100).all()
-            
-            return [{
-                "id": a.id,
-                "stream_id": a.stream_id,
-                "type": a.alert_type,
-                "message": a.message,
-                "severity": a.severity,
-                "resolved": a.resolved,
-                "created_at": a.created_at.isoformat() if a.created_at else None
-            } for a in alerts]
-
-    def save_stream_config(self, stream_id: str, source: str, models: List[str]) -> None:
+            return [alert_dict(a) for a in db.execute(alerts_query(resolved)).scalars()]
+
+    def save_stream_config(self, stream_id: str, source: str, models: List[str],
+                           options: Optional[Dict[str, Any]] = None) -> None:
         """Save stream configuration to database"""
         start_time = time.time()
         try:
-            with get_db_session() as db:
+            with get_write_session() as db:
                 # Check if stream exists
                 existing = db.query(Stream).filter(Stream.stream_id == stream_id).first()
                 if existing:
                     existing.source = source
                     existing.models = json.dumps(models)
+                    existing.options = json.dumps(options) if options is not None else None
                     existing.status = "active"
                     operation = "update"
                 else:
@@ -88,6 +288,7 @@ class DatabaseStorage:
                         stream_id=stream_id,
                         source=source,
                         models=json.dumps(models),
+                        options=json.dumps(options) if options is not None else None,
                         status="active"
                     )
                     db.add(db_stream)
@@ -100,7 +301,7 @@ class DatabaseStorage:
 
     def update_stream_status(self, stream_id: str, status: str) -> None:
         """Update stream status"""
-        with get_db_session() as db:
+        with get_write_session() as db:
             stream = db.query(Stream).filter(Stream.stream_id == stream_id).first()
             if stream:
                 stream.status = status
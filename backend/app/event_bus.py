@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Set
+
+COALESCE = "coalesce"
+DROP = "drop"
+
+class Subscription:
+    """One push client: an event filter plus a bounded pending buffer.
+
+    Events are offered from stream worker threads and drained by the client's
+    asyncio task. A client that falls behind never blocks publishers: with the
+    "drop" policy the oldest pending events are discarded, with "coalesce"
+    only the newest pending event per (type, stream, model) is kept.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, streams: Optional[Set[str]] = None,
+                 models: Optional[Set[str]] = None, policy: str = COALESCE, max_pending: int = 256) -> None:
+        if policy not in (COALESCE, DROP):
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.loop = loop
+        self.streams = streams
+        self.models = models
+        self.policy = policy
+        self.max_pending = max_pending
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._pending: "OrderedDict[Any, dict]" = OrderedDict()
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+        self._notified = False
+
+    def matches(self, event: dict) -> bool:
+        if self.streams and event.get("stream_id") not in self.streams:
+            return False
+        if self.models and event.get("model") is not None and event["model"] not in self.models:
+            return False
+        return True
+
+    def offer(self, event: dict) -> None:
+        with self._lock:
+            if self.policy == COALESCE and event.get("type") == "result":
+                key = ("result", event.get("stream_id"), event.get("model"))
+                if key in self._pending:
+                    del self._pending[key]
+                    self.coalesced += 1
+            else:
+                # Alerts are never coalesced; every one is a distinct event
+                self._seq += 1
+                key = self._seq
+            self._pending[key] = event
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            notify = not self._notified
+            self._notified = True
+        if notify:
+            try:
+                self.loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # Client's event loop already closed; it is about to unsubscribe
+                pass
+
+    async def next_batch(self, timeout: float) -> List[dict]:
+        """Wait for pending events; returns an empty list on timeout"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        with self._lock:
+            batch = list(self._pending.values())
+            self._pending.clear()
+            self._notified = False
+            self.delivered += len(batch)
+        return batch
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "streams": sorted(self.streams) if self.streams else None,
+                "models": sorted(self.models) if self.models else None,
+                "policy": self.policy,
+                "pending": len(self._pending),
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+            }
+
+class EventBus:
+    """Fans out result and alert events from stream workers to push subscribers"""
+
+    def __init__(self) -> None:
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, subscription: Subscription) -> Subscription:
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def publish(self, event: dict) -> None:
+        # Copy-on-write list: publishers iterate without taking the lock
+        subscriptions = self._subscriptions
+        self.published += 1
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    def stats(self) -> Dict[str, Any]:
+        subscriptions = self._subscriptions
+        return {
+            "published": self.published,
+            "subscribers": [s.stats() for s in subscriptions],
+        }
@@ -0,0 +1,65 @@
+import threading
+from typing import Callable, Dict, List, Any
+import cv2
+import numpy as np
+
+def _small(views: "FrameViews") -> np.ndarray:
+    frame = views.frame
+    h, w = frame.shape[:2]
+    return cv2.resize(frame, (max(1, w // 4), max(1, h // 4)), interpolation=cv2.INTER_AREA)
+
+def _to_gray(frame: np.ndarray) -> np.ndarray:
+    if frame.ndim == 3 and frame.shape[2] == 3:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return frame
+
+def _channel_means(views: "FrameViews") -> np.ndarray:
+    frame = views.frame
+    channels = frame.shape[2] if frame.ndim == 3 else 1
+    return frame.reshape(-1, channels).mean(axis=0)
+
+# Derived inputs models can ask for by name; builders may use other views
+VIEW_BUILDERS: Dict[str, Callable[["FrameViews"], Any]] = {
+    "small": _small,
+    "gray": lambda views: _to_gray(views.frame),
+    "small_gray": lambda views: _to_gray(views.get("small")),
+    "channel_means": _channel_means,
+    "mean": lambda views: float(views.get("channel_means").mean()),
+}
+
+class FrameViews:
+    """Per-frame cache of derived inputs shared by every model run on the frame.
+
+    Each view is computed at most once, even when several models ask for it
+    from different threads at the same time.
+    """
+
+    def __init__(self, frame: np.ndarray) -> None:
+        self.frame = frame
+        self._cache: Dict[str, Any] = {}
+        self._locks = {name: threading.Lock() for name in VIEW_BUILDERS}
+        self._stats_lock = threading.Lock()
+        self.computed: List[str] = []
+        self.hits = 0
+
+    def get(self, name: str) -> Any:
+        if name in self._cache:
+            with self._stats_lock:
+                self.hits += 1
+            return self._cache[name]
+        builder = VIEW_BUILDERS.get(name)
+        if builder is None:
+            raise KeyError(f"Unknown frame view: {name}")
+        with self._locks[name]:
+            if name not in self._cache:
+                self._cache[name] = builder(self)
+                with self._stats_lock:
+                    self.computed.append(name)
+                return self._cache[name]
+        with self._stats_lock:
+            self.hits += 1
+        return self._cache[name]
+
+    def for_model(self, names: List[str]) -> Dict[str, Any]:
+        """Resolve the views a model declared at registration"""
+        return {name: self.get(name) for name in names}
@@ -0,0 +1,123 @@
+import os
+import time
+from typing import Callable, Dict, List, Any
+
+# Per-stream frame-rate control under CPU pressure, plus admission of new streams
+GOVERNOR_CONFIG = {
+    "enabled": os.getenv("VMS_FPS_GOVERNOR", "1") == "1",
+    "interval": float(os.getenv("VMS_GOVERNOR_INTERVAL", "2.0")),
+    # CPU use of the process and its inference workers as a fraction of all cores:
+    # above high streams slow down, below low they speed up
+    "cpu_high": float(os.getenv("VMS_GOVERNOR_CPU_HIGH", "0.85")),
+    "cpu_low": float(os.getenv("VMS_GOVERNOR_CPU_LOW", "0.60")),
+    "decrease": float(os.getenv("VMS_GOVERNOR_DECREASE", "0.75")),
+    "increase": float(os.getenv("VMS_GOVERNOR_INCREASE", "1.25")),
+    # Hard cap on running streams per node, 0 = only the CPU check applies
+    "max_streams": int(os.getenv("VMS_MAX_STREAMS", "0")),
+    # What start_stream does at capacity: "queue" starts it when headroom returns, "reject" refuses it
+    "admission": os.getenv("VMS_ADMISSION", "queue"),
+}
+
+# A stream whose frames take longer than this share of its period cannot keep up on its own
+MAX_DUTY_CYCLE = 0.9
+
+class FpsGovernor:
+    """Moves each stream's frame rate between its min_fps and max_fps.
+
+    Every tick measures CPU use across all cores through cpu_clock, which
+    must include any worker processes doing the inference. Under
+    pressure (CPU above cpu_high, or pacer over-runs since the last tick) the
+    lowest-priority tier that can still slow down is scaled by `decrease`.
+    With headroom (CPU below cpu_low and no over-runs) the highest-priority
+    tier below its maximum is scaled by `increase`. One tier moves per tick, so
+    high-priority streams give up rate last and get it back first. A stream
+    whose own frames take most of its period is capped at the rate it can
+    sustain, whatever the CPU. The node is saturated when it is under pressure
+    and every stream is already at its minimum.
+    """
+
+    def __init__(self, cpu_high: float = 0.85, cpu_low: float = 0.60,
+                 decrease: float = 0.75, increase: float = 1.25, max_streams: int = 0,
+                 cpu_clock: Callable[[], float] = time.process_time) -> None:
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.decrease = decrease
+        self.increase = increase
+        self.max_streams = max_streams
+        self.cpu_clock = cpu_clock
+        self.cpu_count = os.cpu_count() or 1
+        self.cpu = 0.0
+        self.pressure = False
+        self.saturated = False
+        self.decreases = 0
+        self.increases = 0
+        self._last_wall = time.monotonic()
+        self._last_cpu = cpu_clock()
+        self._overruns: Dict[str, int] = {}
+
+    def sample_cpu(self) -> float:
+        """CPU time over wall time since the last sample, as a fraction of all cores"""
+        wall, cpu = time.monotonic(), self.cpu_clock()
+        elapsed = wall - self._last_wall
+        if elapsed > 0:
+            self.cpu = (cpu - self._last_cpu) / elapsed / self.cpu_count
+        self._last_wall, self._last_cpu = wall, cpu
+        return self.cpu
+
+    def adjust(self, workers: List[Any]) -> None:
+        """Re-plan the frame rate of every worker; called once per tick"""
+        cpu = self.sample_cpu()
+        overran = False
+        for w in workers:
+            previous = self._overruns.get(w.stream_id, w.pacer.overruns)
+            overran |= w.pacer.overruns > previous
+            self._overruns[w.stream_id] = w.pacer.overruns
+        self._overruns = {w.stream_id: self._overruns[w.stream_id] for w in workers}
+        for w in workers:
+            frame_time = w.stages.mean("frame")
+            if frame_time and frame_time * w.pacer.fps > MAX_DUTY_CYCLE:
+                w.set_fps(max(w.min_fps, min(w.pacer.fps, MAX_DUTY_CYCLE / frame_time)))
+        self.pressure = cpu > self.cpu_high or overran
+        if self.pressure:
+            tier = self._tier(workers, lambda w: w.pacer.fps > w.min_fps, lowest=True)
+            for w in tier:
+                w.set_fps(max(w.min_fps, w.pacer.fps * self.decrease))
+            self.decreases += len(tier)
+            self.saturated = not tier
+        else:
+            self.saturated = False
+            if cpu < self.cpu_low:
+                tier = self._tier(workers, lambda w: w.pacer.fps < w.max_fps, lowest=False)
+                for w in tier:
+                    w.set_fps(min(w.max_fps, w.pacer.fps * self.increase))
+                self.increases += len(tier)
+
+    def _tier(self, workers: List[Any], eligible, lowest: bool) -> List[Any]:
+        """Eligible workers sharing the lowest (or highest) priority among the eligible"""
+        candidates = [w for w in workers if eligible(w)]
+        if not candidates:
+            return []
+        pick = min if lowest else max
+        priority = pick(w.priority for w in candidates)
+        return [w for w in candidates if w.priority == priority]
+
+    def at_capacity(self, running: int) -> bool:
+        if self.max_streams and running >= self.max_streams:
+            return True
+        return self.saturated
+
+    def has_headroom(self, running: int) -> bool:
+        """Room to admit a queued stream"""
+        if self.max_streams and running >= self.max_streams:
+            return False
+        return not self.pressure and self.cpu < self.cpu_low
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cpu": round(self.cpu, 3),
+            "pressure": self.pressure,
+            "saturated": self.saturated,
+            "decreases": self.decreases,
+            "increases": self.increases,
+            "max_streams": self.max_streams,
+        }
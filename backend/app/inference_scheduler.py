@@ -0,0 +1,154 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Any, Tuple
+import numpy as np
+from .logger import vms_logger
+from .metrics import MODEL_INFERENCE_SECONDS
+
+FakeResult = Dict[str, Any]
+BatchModelFn = Callable[[np.ndarray], List[FakeResult]]
+
+class _InferenceRequest:
+    __slots__ = ("frame", "future")
+
+    def __init__(self, frame: np.ndarray) -> None:
+        self.frame = frame
+        self.future: "Future[FakeResult]" = Future()
+
+class InferenceScheduler:
+    """Runs each model on batches of frames collected from all active streams.
+
+    Every model gets its own queue and dispatcher thread. A dispatcher takes the
+    first waiting frame, keeps collecting until it has max_batch_size frames or
+    max_wait seconds have passed, stacks frames of the same shape into one
+    NumPy array and calls the model's batched callable once. Results are handed
+    back to the submitting StreamWorker through a Future. A request never
+    waits forever: a bad batch result or shutdown fails its future, and
+    callers give up after result_timeout seconds.
+    """
+
+    def __init__(self, batch_registry: Dict[str, BatchModelFn], max_batch_size: int = 8, max_wait: float = 0.01,
+                 result_timeout: float = 30.0) -> None:
+        self.batch_registry = batch_registry
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.result_timeout = result_timeout
+        self._queues: Dict[str, "queue.Queue[_InferenceRequest]"] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def submit(self, model_name: str, frame: np.ndarray) -> "Future[FakeResult]":
+        request = _InferenceRequest(frame)
+        if self._stop_event.is_set():
+            request.future.set_exception(RuntimeError("Inference scheduler is shut down"))
+            return request.future
+        self._queue_for(model_name).put(request)
+        return request.future
+
+    def run(self, frame: np.ndarray, models: List[str]) -> Dict[str, FakeResult]:
+        """Submit one frame to every model and wait for all of its results"""
+        futures = {name: self.submit(name, frame) for name in models if name in self.batch_registry}
+        return {name: future.result(timeout=self.result_timeout) for name, future in futures.items()}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                name: {
+                    "batches": s["batches"],
+                    "frames": s["frames"],
+                    "avg_batch_size": round(s["frames"] / s["batches"], 2) if s["batches"] else 0.0,
+                    "avg_batch_time": round(s["batch_time"] / s["batches"], 4) if s["batches"] else 0.0,
+                    "queue_depth": self._queues[name].qsize(),
+                } for name, s in self._stats.items()
+            }
+
+    def shutdown(self) -> None:
+        self._stop_event.set()
+        for thread in list(self._threads.values()):
+            thread.join(timeout=1.0)
+        # Fail what the dispatchers left behind so no stream waits on it
+        error = RuntimeError("Inference scheduler is shut down")
+        with self._lock:
+            queues = list(self._queues.values())
+        for q in queues:
+            while True:
+                try:
+                    request = q.get_nowait()
+                except queue.Empty:
+                    break
+                if not request.future.done():
+                    request.future.set_exception(error)
+
+    def _queue_for(self, model_name: str) -> "queue.Queue[_InferenceRequest]":
+        q = self._queues.get(model_name)
+        if q is not None:
+            return q
+        with self._lock:
+            if model_name not in self._queues:
+                self._queues[model_name] = queue.Queue()
+                self._stats[model_name] = {"batches": 0, "frames": 0, "batch_time": 0.0}
+                thread = threading.Thread(target=self._dispatch, args=(model_name,), name=f"batch-{model_name}", daemon=True)
+                self._threads[model_name] = thread
+                thread.start()
+            return self._queues[model_name]
+
+    def _collect(self, q: "queue.Queue[_InferenceRequest]") -> List[_InferenceRequest]:
+        try:
+            batch = [q.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self, model_name: str) -> None:
+        q = self._queues[model_name]
+        batch_fn = self.batch_registry[model_name]
+        while not self._stop_event.is_set():
+            batch = self._collect(q)
+            if not batch:
+                continue
+            # Only frames of the same shape and dtype can be stacked together
+            groups: Dict[Tuple, List[_InferenceRequest]] = {}
+            for request in batch:
+                groups.setdefault((request.frame.shape, request.frame.dtype.str), []).append(request)
+            for requests in groups.values():
+                self._run_batch(model_name, batch_fn, requests)
+
+    def _run_batch(self, model_name: str, batch_fn: BatchModelFn, requests: List[_InferenceRequest]) -> None:
+        start_time = time.time()
+        try:
+            results = batch_fn(np.stack([r.frame for r in requests]))
+        except Exception as e:
+            vms_logger.log_model_error(model_name, f"batched inference failed: {e}")
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        batch_time = time.time() - start_time
+        if len(results) != len(requests):
+            error = RuntimeError(f"batched {model_name} returned {len(results)} results for {len(requests)} frames")
+            vms_logger.log_model_error(model_name, str(error))
+            for request in requests:
+                request.future.set_exception(error)
+            return
+        # Each frame is charged an equal share of the batch
+        share = batch_time / len(requests)
+        for request, result in zip(requests, results):
+            MODEL_INFERENCE_SECONDS.observe(share, model_name)
+            request.future.set_result(result)
+        with self._lock:
+            stats = self._stats[model_name]
+            stats["batches"] += 1
+            stats["frames"] += len(requests)
+            stats["batch_time"] += batch_time
@@ -1,49 +1,165 @@
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+# Log records are queued by the calling thread and written by one background
+# listener, so stream threads never wait on disk or console I/O
+LOGGING_CONFIG = {
+    "level": os.getenv("VMS_LOG_LEVEL", "INFO"),
+    "dir": os.getenv("VMS_LOG_DIR", "logs"),
+    "json": os.getenv("VMS_LOG_JSON", "0") == "1",
+    "queue_size": int(os.getenv("VMS_LOG_QUEUE_SIZE", "10000")),
+    # At most rate_burst messages per key (e.g. one stream's repeated error) per rate_window seconds
+    "rate_window": float(os.getenv("VMS_LOG_RATE_WINDOW", "10")),
+    "rate_burst": int(os.getenv("VMS_LOG_RATE_BURST", "3")),
+}
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records are dropped and counted when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Same-process queue: hand the record over unformatted and let the
+        # listener thread do the message and traceback formatting
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, including structured fields passed as extra={"fields": ...}"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class RateLimiter:
+    """Per-key token window: allows `burst` events per `window` seconds and counts the rest"""
+
+    def __init__(self, window: float, burst: int) -> None:
+        self.window = window
+        self.burst = burst
+        self._windows: Dict[Any, Tuple[float, int, int]] = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def allow(self, key: Any, now: Optional[float] = None) -> Tuple[bool, int]:
+        """Whether to emit, and how many events for this key were suppressed since the last emit"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - start >= self.window:
+                start, count = now, 0
+            if count < self.burst:
+                self._windows[key] = (start, count + 1, 0)
+                return True, suppressed
+            self._windows[key] = (start, count, suppressed + 1)
+            self.suppressed += 1
+            if len(self._windows) > 10000:
+                # Forget idle keys so unique error strings cannot grow this without bound
+                self._windows = {k: v for k, v in self._windows.items() if now - v[0] < self.window}
+            return False, 0
 
 class VMSLogger:
     """Centralized logging system for Video Management System"""
     
-    def __init__(self, log_level: str = "INFO"):
-        self.log_level = getattr(logging, log_level.upper())
-        self.setup_logging()
-    
-    def setup_logging(self):
-        """Configure logging with multiple handlers"""
-        # Create logs directory
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
-        
-        # Configure root logger
-        logging.basicConfig(
-            level=self.log_level,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler(sys.stdout),
-                logging.FileHandler(log_dir / "vms.log"),
-                logging.FileHandler(log_dir / "vms_error.log", mode='a')
-            ]
-        )
-        
-        # Create specialized loggers
+    def __init__(self, log_level: Optional[str] = None):
+        self.log_level = getattr(logging, (log_level or LOGGING_CONFIG["level"]).upper())
+        self.configured = False
+        # Loggers exist from import; handlers and log files are only created by setup_logging()
         self.main_logger = logging.getLogger("VMS.Main")
         self.stream_logger = logging.getLogger("VMS.Stream")
         self.model_logger = logging.getLogger("VMS.Model")
         self.db_logger = logging.getLogger("VMS.Database")
         self.api_logger = logging.getLogger("VMS.API")
+        self.rate_limiter = RateLimiter(LOGGING_CONFIG["rate_window"], LOGGING_CONFIG["rate_burst"])
+        self.queue_handler: Optional[DroppingQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+    
+    def setup_logging(self):
+        """Route all records through a bounded queue to console and file handlers (idempotent)"""
+        if self.configured:
+            return
+        self.configured = True
+        log_dir = Path(LOGGING_CONFIG["dir"])
+        log_dir.mkdir(exist_ok=True)
         
-        # Set error handler to only log errors
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handlers = [
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler(log_dir / "vms.log"),
+        ]
+        # Errors go to their own file exactly once
         error_handler = logging.FileHandler(log_dir / "vms_error.log")
         error_handler.setLevel(logging.ERROR)
-        error_formatter = logging.Formatter('%(asctime)s - %(name)s - ERROR - %(message)s')
-        error_handler.setFormatter(error_formatter)
+        handlers.append(error_handler)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        if LOGGING_CONFIG["json"]:
+            json_handler = logging.FileHandler(log_dir / "vms.jsonl")
+            json_handler.setFormatter(JsonLinesFormatter())
+            handlers.append(json_handler)
         
-        for logger in [self.main_logger, self.stream_logger, self.model_logger, self.db_logger, self.api_logger]:
-            logger.addHandler(error_handler)
+        self.queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOGGING_CONFIG["queue_size"]))
+        root = logging.getLogger()
+        root.setLevel(self.log_level)
+        root.addHandler(self.queue_handler)
+        self.listener = logging.handlers.QueueListener(self.queue_handler.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+    
+    def shutdown(self):
+        """Write out queued records and stop the background writer"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        if self.queue_handler is not None:
+            logging.getLogger().removeHandler(self.queue_handler)
+        self.configured = False
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "level": logging.getLevelName(self.log_level),
+            "queued": self.queue_handler.queue.qsize() if self.queue_handler else 0,
+            "dropped": self.queue_handler.dropped if self.queue_handler else 0,
+            "suppressed": self.rate_limiter.suppressed,
+            "json": LOGGING_CONFIG["json"],
+        }
+    
+    def _limited(self, logger: logging.Logger, level: int, key: Any, msg: str, **fields):
+        """Log unless this key is over its rate limit; notes how many repeats were skipped"""
+        if not logger.isEnabledFor(level):
+            return
+        allowed, suppressed = self.rate_limiter.allow(key)
+        if not allowed:
+            return
+        if suppressed:
+            msg += f" [{suppressed} similar messages suppressed]"
+            fields["suppressed"] = suppressed
+        logger.log(level, msg, extra={"fields": fields})
     
     def log_system_startup(self, db_type: str, models: list):
         """Log system initialization"""
@@ -62,11 +178,12 @@ class VMSLogger:
         self.stream_logger.info(f"🛑 Stopping stream '{stream_id}' - Reason: {reason}")
     
     def log_stream_error(self, stream_id: str, error: str, source: str = None):
-        """Log stream errors"""
+        """Log stream errors, rate limited per stream and error"""
         msg = f"❌ Stream '{stream_id}' error: {error}"
         if source:
             msg += f" (source: {source})"
-        self.stream_logger.error(msg)
+        self._limited(self.stream_logger, logging.ERROR, ("stream", stream_id, error), msg,
+                      stream_id=stream_id, error=error, source=source)
     
     def log_stream_success(self, stream_id: str, source: str):
         """Log successful stream connection"""
@@ -74,29 +191,51 @@ class VMSLogger:
     
     def log_frame_processing(self, stream_id: str, frame_count: int, models_used: list, processing_time: float):
         """Log frame processing metrics"""
-        self.stream_logger.debug(f"📹 Stream '{stream_id}' - Frame {frame_count} processed in {processing_time:.3f}s using {len(models_used)} models")
+        if self.stream_logger.isEnabledFor(logging.DEBUG):
+            self.stream_logger.debug(
+                "📹 Stream '%s' - Frame %d processed in %.3fs using %d models",
+                stream_id, frame_count, processing_time, len(models_used),
+                extra={"fields": {"stream_id": stream_id, "frame": frame_count, "processing_time": processing_time}},
+            )
     
     def log_model_inference(self, stream_id: str, model_name: str, processing_time: float, result_summary: Dict[str, Any]):
         """Log AI model inference results"""
-        self.model_logger.debug(f"🧠 Model '{model_name}' on stream '{stream_id}' - {processing_time:.3f}s - {json.dumps(result_summary, default=str)}")
+        # Called per model per frame: skip the JSON encoding unless DEBUG is on
+        if self.model_logger.isEnabledFor(logging.DEBUG):
+            self.model_logger.debug(
+                "🧠 Model '%s' on stream '%s' - %.3fs - %s",
+                model_name, stream_id, processing_time, json.dumps(result_summary, default=str),
+                extra={"fields": {"stream_id": stream_id, "model": model_name, "processing_time": processing_time}},
+            )
+    
+    def log_model_error(self, model_name: str, error: str):
+        """Log AI model failures, rate limited per model and error"""
+        self._limited(self.model_logger, logging.ERROR, ("model", model_name, error),
+                      f"❌ Model '{model_name}' error: {error}", model=model_name, error=error)
     
-    def log_model_performance(self, model_name: str, avg_time: float, total_inferences: int):
-        """Log model performance metrics"""
-        self.model_logger.info(f"📊 Model '{model_name}' performance - Avg: {avg_time:.3f}s, Total inferences: {total_inferences}")
+    def log_model_performance(self, model_name: str, avg_time: float, total_inferences: int, stream_id: str = None):
+        """Log model performance metrics, for one stream when stream_id is given"""
+        scope = f" on stream '{stream_id}'" if stream_id else ""
+        self.model_logger.info(f"📊 Model '{model_name}' performance{scope} - Avg: {avg_time:.3f}s, Total inferences: {total_inferences}")
     
     def log_database_operation(self, operation: str, table: str, record_count: int = 1, execution_time: float = None):
         """Log database operations"""
+        if not self.db_logger.isEnabledFor(logging.DEBUG):
+            return
         msg = f"💾 DB {operation.upper()} - Table: {table}, Records: {record_count}"
         if execution_time:
             msg += f", Time: {execution_time:.3f}s"
-        self.db_logger.debug(msg)
+        self.db_logger.debug(msg, extra={"fields": {
+            "operation": operation, "table": table, "records": record_count, "execution_time": execution_time,
+        }})
     
     def log_database_error(self, operation: str, error: str, table: str = None):
-        """Log database errors"""
+        """Log database errors, rate limited per operation and error"""
         msg = f"❌ DB Error during {operation}: {error}"
         if table:
             msg += f" (table: {table})"
-        self.db_logger.error(msg)
+        self._limited(self.db_logger, logging.ERROR, ("db", operation, error), msg,
+                      operation=operation, error=error, table=table)
     
     def log_api_request(self, method: str, endpoint: str, client_ip: str = None):
         """Log API requests"""
@@ -113,11 +252,15 @@ class VMSLogger:
         self.main_logger.info(msg)
     
     def log_alert_generated(self, stream_id: str, alert_type: str, severity: str, message: str):
-        """Log alert generation"""
-        self.main_logger.warning(f"🚨 ALERT [{severity.upper()}] - Stream '{stream_id}' - {alert_type}: {message}")
+        """Log alert generation, rate limited per stream and alert type"""
+        self._limited(self.main_logger, logging.WARNING, ("alert", stream_id, alert_type),
+                      f"🚨 ALERT [{severity.upper()}] - Stream '{stream_id}' - {alert_type}: {message}",
+                      stream_id=stream_id, alert_type=alert_type, severity=severity)
     
     def log_concurrent_processing(self, stream_id: str, concurrent_count: int, queue_size: int = None):
         """Log concurrent processing status"""
+        if not self.stream_logger.isEnabledFor(logging.DEBUG):
+            return
         msg = f"⚡ Stream '{stream_id}' - Concurrent processes: {concurrent_count}"
         if queue_size is not None:
             msg += f", Queue size: {queue_size}"
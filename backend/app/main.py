@@ -1,14 +1,119 @@
+import time
+import threading
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional
 from .schemas import StartStreamRequest, StopStreamRequest
 from .model_manager import ModelManager
 from .stream_manager import StreamManager
 from .db_storage import DatabaseStorage
-from .database import create_tables, DB_TYPE
+from .async_storage import AsyncDatabaseStorage
+from .database import create_tables, check_connection, engine_stats, dispose_async_engine, DB_TYPE
+from .event_bus import Subscription
+from .retention import RetentionPruner, create_pruner
+from .columnar_archive import ColumnarArchive, create_archive, parse_conditions
 from .logger import vms_logger
-import time
+from .metrics import metrics
+from .profiling import SamplingProfiler, PROFILING_CONFIG
+from .cluster import StreamCoordinator, create_coordinator
+from .governor import GOVERNOR_CONFIG
+import asyncio
+import json
+import os
+
+# Importing this module must stay cheap: no connections, threads, files or models
+STARTUP_CONFIG = {
+    "import_budget": float(os.getenv("VMS_IMPORT_BUDGET", "2.0")),
+}
+
+# Created by the lifespan handler
+model_mgr: Optional[ModelManager] = None
+storage: Optional[DatabaseStorage] = None
+async_storage: Optional[AsyncDatabaseStorage] = None
+stream_mgr: Optional[StreamManager] = None
+archive: Optional[ColumnarArchive] = None
+pruner: Optional[RetentionPruner] = None
+# Set in cluster mode (VMS_CLUSTER=1); streams are then placed through leases
+coordinator: Optional[StreamCoordinator] = None
+# At most one sampling profile runs at a time
+active_profiler: Optional[SamplingProfiler] = None
+
+startup_phases: Dict[str, float] = {}
+
+@contextmanager
+def _phase(name: str):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phases[name] = round(time.perf_counter() - start_time, 4)
+
+def _collect_logging_metrics():
+    stats = vms_logger.stats()
+    yield "vms_log_queue_depth", {}, stats["queued"]
+    yield "vms_log_records_dropped_total", {}, stats["dropped"]
+    yield "vms_log_records_suppressed_total", {}, stats["suppressed"]
+
+def startup() -> None:
+    global model_mgr, storage, async_storage, stream_mgr, archive, pruner, coordinator
+    with _phase("logging"):
+        vms_logger.setup_logging()
+        metrics.add_collector(_collect_logging_metrics)
+    if import_time > STARTUP_CONFIG["import_budget"]:
+        vms_logger.main_logger.warning(
+            f"⏱️ Importing app.main took {import_time:.2f}s (budget {STARTUP_CONFIG['import_budget']:.2f}s)"
+        )
+    with _phase("database"):
+        check_connection()
+        create_tables()
+    with _phase("models"):
+        model_mgr = ModelManager()
+        model_mgr.load()
+    with _phase("storage"):
+        storage = DatabaseStorage()
+        async_storage = AsyncDatabaseStorage(storage)
+        stream_mgr = StreamManager(model_mgr, storage)
+    with _phase("cluster"):
+        coordinator = create_coordinator(stream_mgr)
+        if coordinator:
+            coordinator.start()
+    with _phase("retention"):
+        archive = create_archive()
+        pruner = create_pruner(archive)
+        if pruner:
+            pruner.start()
+    # Log system startup
+    vms_logger.log_system_startup(DB_TYPE, model_mgr.available_models())
 
-app = FastAPI(title="VMS Backend")
+def shutdown() -> None:
+    if coordinator:
+        # Hands this node's streams back before they are stopped below
+        coordinator.stop()
+    if stream_mgr:
+        stream_mgr.stop_all()
+    if model_mgr:
+        model_mgr.shutdown()
+    if storage:
+        storage.close()
+    if pruner:
+        pruner.stop()
+    # Last, so shutdown messages above are written out
+    vms_logger.shutdown()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup()
+    try:
+        yield
+    finally:
+        shutdown()
+        await dispose_async_engine()
+
+app = FastAPI(title="VMS Backend", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -17,19 +122,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database tables
-create_tables()
-
-model_mgr = ModelManager()
-storage = DatabaseStorage()
-stream_mgr = StreamManager(model_mgr, storage)
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "models": model_mgr.available_models(),
+        "database": engine_stats(),
+        "async_reads": async_storage.stats(),
+        "write_behind": storage.write_behind_metrics(),
+        "result_cache": storage.result_cache_metrics(),
+        "rollups": storage.rollups.stats() if storage.rollups else None,
+        "retention": pruner.stats() if pruner else None,
+        "archive": archive.stats() if archive else None,
+        "logging": vms_logger.stats(),
+        "cluster": coordinator.stats() if coordinator else None,
+        "governor": {**stream_mgr.governor.stats(), "queued": len(stream_mgr.pending)} if stream_mgr.governor else None,
+        "stream_pool": stream_mgr.pool.stats() if stream_mgr.pool else None,
+        "startup": {
+            "import_time": round(import_time, 4),
+            "import_budget": STARTUP_CONFIG["import_budget"],
+            "phases": startup_phases,
+            "total": round(import_time + sum(startup_phases.values()), 4),
+        },
+        "inference_mode": model_mgr.mode,
+        "batching": model_mgr.scheduler_stats(),
+        "process_pool": model_mgr.executor_stats(),
+    }
 
-# Log system startup
-vms_logger.log_system_startup(DB_TYPE, model_mgr.available_models())
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition of the in-process metrics registry"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-@app.get("/health")
-def health():
-    return {"status": "ok", "models": model_mgr.available_models()}
+@app.get("/models")
+def list_models():
+    return {"models": model_mgr.model_info(), "views": model_mgr.view_stats()}
 
 @app.post("/streams/start")
 def start_stream(req: StartStreamRequest, request: Request):
@@ -37,19 +164,49 @@ def start_stream(req: StartStreamRequest, request: Request):
     vms_logger.log_api_request("POST", "/streams/start", client_ip)
     vms_logger.log_stream_start(req.config.stream_id, req.config.source, req.config.models)
     
-    started = stream_mgr.start_stream(req.config.stream_id, req.config.source, req.config.models)
+    if coordinator:
+        return _submit_stream(req)
+    options = _stream_options(req)
+    queued = stream_mgr.at_capacity()
+    if queued and GOVERNOR_CONFIG["admission"] == "reject":
+        vms_logger.log_stream_error(req.config.stream_id, "Node at capacity", req.config.source)
+        raise HTTPException(status_code=503, detail="Node at capacity")
+    if queued:
+        # Started by the governor once there is CPU headroom
+        started = stream_mgr.queue_stream(req.config.stream_id, req.config.source, req.config.models, **options)
+    else:
+        started = stream_mgr.start_stream(req.config.stream_id, req.config.source, req.config.models, **options)
     if not started:
         vms_logger.log_stream_error(req.config.stream_id, "Stream already running", req.config.source)
         raise HTTPException(status_code=400, detail="Stream already running")
     
     # Save stream configuration to database
-    storage.save_stream_config(req.config.stream_id, req.config.source, req.config.models)
+    storage.save_stream_config(req.config.stream_id, req.config.source, req.config.models, options)
     
     # Log scaling metrics
-    active_streams = len(stream_mgr.workers)
-    vms_logger.log_scaling_metrics(active_streams, active_streams)
+    vms_logger.log_scaling_metrics(len(stream_mgr.workers), threading.active_count())
     
-    return {"ok": True}
+    return {"ok": True, "queued": queued}
+
+def _stream_options(req: StartStreamRequest) -> dict:
+    return {
+        "queue_size": req.config.queue_size,
+        "drop_policy": req.config.drop_policy,
+        "motion_threshold": req.config.motion_threshold,
+        "motion_refresh_interval": req.config.motion_refresh_interval,
+        "fps": req.config.fps,
+        "min_fps": req.config.min_fps,
+        "priority": req.config.priority,
+    }
+
+def _submit_stream(req: StartStreamRequest):
+    """Cluster mode: persist the stream as active and let the lease holder run it"""
+    if coordinator.owner(req.config.stream_id):
+        vms_logger.log_stream_error(req.config.stream_id, "Stream already running", req.config.source)
+        raise HTTPException(status_code=400, detail="Stream already running")
+    storage.save_stream_config(req.config.stream_id, req.config.source, req.config.models, _stream_options(req))
+    # None until a node with spare capacity claims it on its next heartbeat
+    return {"ok": True, "node": coordinator.submit(req.config.stream_id)}
 
 @app.post("/streams/stop")
 def stop_stream(req: StopStreamRequest, request: Request):
@@ -57,6 +214,12 @@ def stop_stream(req: StopStreamRequest, request: Request):
     vms_logger.log_api_request("POST", "/streams/stop", client_ip)
     vms_logger.log_stream_stop(req.stream_id, "user_request")
     
+    if coordinator:
+        if not coordinator.withdraw(req.stream_id):
+            vms_logger.log_stream_error(req.stream_id, "Stream not found or already stopped")
+            raise HTTPException(status_code=404, detail="Stream not found")
+        return {"ok": True}
+    worker = stream_mgr.workers.get(req.stream_id)
     stopped = stream_mgr.stop_stream(req.stream_id)
     if not stopped:
         vms_logger.log_stream_error(req.stream_id, "Stream not found or already stopped")
@@ -65,24 +228,189 @@ def stop_stream(req: StopStreamRequest, request: Request):
     # Update stream status in database
     storage.update_stream_status(req.stream_id, "stopped")
     
+    # A queued stream never ran, so there is no worker to report on
+    for model_name, (count, total) in (worker.model_times.items() if worker else []):
+        vms_logger.log_model_performance(model_name, total / count, count, stream_id=req.stream_id)
+    
     # Log updated scaling metrics
-    active_streams = len(stream_mgr.workers)
-    vms_logger.log_scaling_metrics(active_streams, active_streams)
+    vms_logger.log_scaling_metrics(len(stream_mgr.workers), threading.active_count())
     
     return {"ok": True}
 
 @app.get("/streams")
-def list_streams():
+async def list_streams():
+    if coordinator:
+        # Cluster-wide placement comes from the streams table
+        placement, nodes = await asyncio.gather(
+            asyncio.to_thread(coordinator.placement), asyncio.to_thread(coordinator.nodes))
+        return {"streams": placement, "nodes": nodes}
     return {"streams": stream_mgr.status()}
 
+@app.post("/admin/profile")
+async def profile(seconds: float = 5.0, interval: float = 0.005,
+                  threads: str = "stream-,capture-,model-fanout,batch-", format: str = "json"):
+    """Sample worker thread stacks for `seconds` and return the aggregated profile.
+
+    format=collapsed returns flamegraph.pl / speedscope input; threads is a
+    comma-separated list of thread name prefixes (empty for every thread).
+    """
+    global active_profiler
+    if not PROFILING_CONFIG["profiler_enabled"]:
+        raise HTTPException(status_code=403, detail="Profiler disabled (VMS_PROFILER=0)")
+    if format not in ("json", "collapsed"):
+        raise HTTPException(status_code=400, detail="format must be json or collapsed")
+    if not 0 < seconds <= PROFILING_CONFIG["profiler_max_seconds"]:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILING_CONFIG['profiler_max_seconds']}]")
+    if active_profiler is not None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    profiler = SamplingProfiler(interval, list(_split_param(threads) or []))
+    active_profiler = profiler
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        # Also stops sampling if the client disconnects mid-profile
+        result = await asyncio.to_thread(profiler.stop)
+        active_profiler = None
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return result
+
+@app.get("/sources")
+def list_sources():
+    return {"sources": stream_mgr.sources.stats()}
+
+@app.get("/rollups/{stream_id}")
+def get_rollups(stream_id: str, model: str, field: Optional[str] = None, resolution: str = "minute",
+                start: Optional[float] = None, end: Optional[float] = None, quantiles: str = "0.5,0.9,0.99"):
+    """Per-minute or per-hour count/min/max/mean and quantiles of a model's numeric fields"""
+    if storage.rollups is None:
+        raise HTTPException(status_code=404, detail="Rollups are disabled")
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - 24 * 3600
+    try:
+        qs = [float(q) for q in quantiles.split(",") if q.strip()]
+        series = storage.rollups.query(stream_id, model, resolution, start, end, field=field, quantiles=qs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"stream_id": stream_id, "model": model, "resolution": resolution, "start": start, "end": end, "series": series}
+
+@app.get("/archive/{stream_id}")
+def query_archive(stream_id: str, model: str, where: str = "", fields: Optional[str] = None,
+                  start: Optional[float] = None, end: Optional[float] = None, limit: int = 1000):
+    """Scan archived days of a model's results, e.g. ?model=defect_analysis&where=defect_score>0.7"""
+    if archive is None:
+        raise HTTPException(status_code=404, detail="Columnar archive is disabled")
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - 30 * 24 * 3600
+    columns = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        return archive.query(stream_id, model, start, end, parse_conditions(where),
+                             fields=columns or None, limit=max(1, min(limit, 100000)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/archive/export")
+def export_archive():
+    """Roll every complete day not yet archived into column files"""
+    if archive is None:
+        raise HTTPException(status_code=404, detail="Columnar archive is disabled")
+    days = archive.export_pending()
+    return {"days_exported": days, "streams": archive.streams()}
+
+@app.get("/results")
+async def get_results_batch(stream_ids: str = "active", limit: int = 10, since: Optional[str] = None):
+    """Latest results for several streams (comma-separated ids, or "active") in one call.
+
+    The response's cursor maps each stream to the newest timestamp returned for
+    it. Passed back as `since` (JSON), each stream only returns rows newer than
+    its own entry, so a slow stream's late rows are not skipped because a
+    faster stream has moved on. A bare number as `since` applies to every stream.
+    """
+    if stream_ids == "active":
+        # In cluster mode other nodes' streams are read from the database
+        ids = await asyncio.to_thread(coordinator.active_streams) if coordinator else list(stream_mgr.workers.keys())
+    else:
+        ids = sorted(_split_param(stream_ids) or [])
+    limit = max(1, min(limit, 1000))
+    try:
+        cursor = _parse_cursor(since, ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results = await async_storage.get_results_batch(ids, limit, cursor or None)
+    # Streams with nothing new keep their entry
+    for stream_id, rows in results.items():
+        if rows:
+            cursor[stream_id] = max(r["timestamp"] for r in rows)
+    return {"results": results, "cursor": cursor}
+
+def _parse_cursor(since: Optional[str], stream_ids: List[str]) -> Dict[str, float]:
+    """Per-stream lower bounds from a `since` cursor, limited to the requested streams"""
+    if since is None:
+        return {}
+    try:
+        bound = float(since)
+        return {stream_id: bound for stream_id in stream_ids}
+    except ValueError:
+        pass
+    try:
+        parsed = json.loads(since)
+    except ValueError:
+        raise ValueError("since must be a number or a JSON object of stream timestamps")
+    if not isinstance(parsed, dict) or not all(isinstance(v, (int, float)) for v in parsed.values()):
+        raise ValueError("since must map stream ids to timestamps")
+    wanted = set(stream_ids)
+    return {stream_id: float(ts) for stream_id, ts in parsed.items() if stream_id in wanted}
+
 @app.get("/results/{stream_id}")
-def get_results(stream_id: str, limit: int = 20):
-    return {"results": storage.get_results(stream_id, limit)}
+async def get_results(stream_id: str, limit: int = 20):
+    return {"results": await async_storage.get_results(stream_id, limit)}
 
 @app.get("/alerts")
-def get_alerts():
-    return {"alerts": storage.get_alerts(resolved=False)}
+async def get_alerts():
+    return {"alerts": await async_storage.get_alerts(resolved=False)}
 
 @app.get("/alerts/all")
-def get_all_alerts():
-    return {"alerts": storage.get_alerts()}
+async def get_all_alerts():
+    return {"alerts": await async_storage.get_alerts()}
+
+def _split_param(value: Optional[str]):
+    return {v.strip() for v in value.split(",") if v.strip()} if value else None
+
+@app.get("/events")
+async def events(request: Request, streams: Optional[str] = None, models: Optional[str] = None,
+                 policy: str = "coalesce", max_pending: int = 256):
+    """Server-Sent Events push of new results and alerts, filtered by stream and model.
+
+    Events are published in-process, so in cluster mode a node only pushes the
+    streams it runs; subscribe to each node (see /streams for placement).
+    """
+    try:
+        subscription = Subscription(asyncio.get_running_loop(), _split_param(streams), _split_param(models),
+                                    policy=policy, max_pending=max(1, min(max_pending, 10000)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stream_mgr.events.subscribe(subscription)
+    vms_logger.log_api_request("GET", "/events", request.client.host if request.client else None)
+
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                batch = await subscription.next_batch(timeout=15.0)
+                if not batch:
+                    yield ": keepalive\n\n"
+                    continue
+                for event in batch:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            stream_mgr.events.unsubscribe(subscription)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/events/stats")
+def event_stats():
+    return stream_mgr.events.stats()
+
+import_time = time.perf_counter() - _import_started
@@ -0,0 +1,200 @@
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Label values in the order of the metric's label names
+LabelValues = Tuple[str, ...]
+# (metric name, labels, value) reported by a collector at scrape time
+Sample = Tuple[str, Dict[str, str], float]
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(dict(zip(self.label_names, k)))} {_format_value(v)}"
+                for k, v in sorted(values.items())]
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in the Prometheus layout"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def summary(self, *labels: str) -> Tuple[int, float]:
+        """(count, sum) for one label set"""
+        with self._lock:
+            series = self._series.get(labels)
+            return (series[2], series[1]) if series else (0, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """In-process metrics exposed in the Prometheus text format.
+
+    Counters and histograms are updated directly from stream, inference and
+    writer threads under a short per-metric lock. Values that already live on
+    other objects (queue depths, fps, frame counters) are read by collectors
+    only when /metrics is scraped, so they cost nothing on the hot path.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, object] = {}
+        # name -> (kind, help) for collector-reported families
+        self._families: Dict[str, Tuple[str, str]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def family(self, name: str, kind: str, help: str) -> None:
+        """Declare the type and help text of a metric reported by a collector"""
+        self._families[name] = (kind, help)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        collected: Dict[str, List[str]] = {}
+        for collector in collectors:
+            for name, labels, value in collector():
+                if value is None:
+                    continue
+                collected.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, samples in collected.items():
+            kind, help = self._families.get(name, ("gauge", name))
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+# Global registry and the metrics updated on the hot paths
+metrics = MetricsRegistry()
+
+MODEL_INFERENCE_SECONDS = metrics.histogram(
+    "vms_model_inference_seconds", "Wall time of one model on one frame", ["model"])
+FRAME_LATENCY_SECONDS = metrics.histogram(
+    "vms_frame_latency_seconds", "Capture to end of processing for one frame", ["stream_id"])
+FRAME_PROCESSING_SECONDS = metrics.histogram(
+    "vms_frame_processing_seconds", "Inference, storage and alert checks for one frame", ["stream_id"])
+DB_WRITE_SECONDS = metrics.histogram(
+    "vms_db_write_seconds", "Duration of one database write (a single row or a bulk batch)", ["table"])
+RESULT_PERSIST_SECONDS = metrics.histogram(
+    "vms_result_persist_seconds", "Frame processing start to result row committed", ["table"])
+DB_ROWS_WRITTEN = metrics.counter(
+    "vms_db_rows_written_total", "Rows written to the database", ["table"])
+DB_WRITE_ERRORS = metrics.counter(
+    "vms_db_write_errors_total", "Rows whose database write failed", ["table"])
+ALERTS_TOTAL = metrics.counter(
+    "vms_alerts_total", "Alerts generated", ["stream_id", "alert_type", "severity"])
+STREAM_POOL_LAG_SECONDS = metrics.histogram(
+    "vms_stream_pool_lag_seconds", "How late the stream pool started a task after its deadline")
+
+metrics.family("vms_stream_up", "gauge", "1 while the stream worker thread is alive")
+metrics.family("vms_capture_fps", "gauge", "Frames per second released to processing, last 30 frames")
+metrics.family("vms_stream_target_fps", "gauge", "Frame rate the governor currently allows the stream")
+metrics.family("vms_streams_queued", "gauge", "Streams waiting for capacity")
+metrics.family("vms_frames_captured_total", "counter", "Frames offered to the stream's frame queue")
+metrics.family("vms_frames_processed_total", "counter", "Frames the stream processed")
+metrics.family("vms_frame_errors_total", "counter", "Frames skipped because their processing raised")
+metrics.family("vms_frames_dropped_total", "counter", "Frames dropped by the stream's frame queue")
+metrics.family("vms_frame_queue_depth", "gauge", "Frames waiting in the stream's frame queue")
+metrics.family("vms_active_streams", "gauge", "Running stream workers")
+metrics.family("vms_stream_pool_scheduled", "gauge", "Entries in the stream pool's deadline heap, stopped streams included until due")
+metrics.family("vms_write_queue_depth", "gauge", "Rows waiting in the write-behind buffer")
+metrics.family("vms_write_queue_dropped_total", "counter", "Rows dropped because the write-behind buffer was full")
+metrics.family("vms_log_queue_depth", "gauge", "Log records waiting for the background writer")
+metrics.family("vms_log_records_dropped_total", "counter", "Log records dropped because the log queue was full")
+metrics.family("vms_log_records_suppressed_total", "counter", "Repeated log messages suppressed by rate limiting")
@@ -1,13 +1,113 @@
+import os
 import time
-from typing import Dict, Callable, Any, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Callable, Any, List, Optional, Tuple
 import numpy as np
+from .frame_views import FrameViews
+from .inference_scheduler import InferenceScheduler, BatchModelFn
+from .process_executor import ProcessModelExecutor
+from .metrics import MODEL_INFERENCE_SECONDS
 
 FakeResult = Dict[str, Any]
+# model_fn(frame), or model_fn(frame, views) for models registered with views
+ModelFn = Callable[..., FakeResult]
+
+# "inline" runs models on the calling stream thread, "batched" routes frames
+# from all streams through the cross-stream InferenceScheduler and "process"
+# runs them in a pool of worker processes fed through shared memory
+INFERENCE_CONFIG = {
+    "mode": os.getenv("VMS_INFERENCE_MODE", "inline"),
+    "max_batch_size": int(os.getenv("VMS_BATCH_MAX_SIZE", "8")),
+    "max_wait": float(os.getenv("VMS_BATCH_MAX_WAIT", "0.01")),
+    # Longest a stream waits for a batched result before failing the frame
+    "result_timeout": float(os.getenv("VMS_BATCH_RESULT_TIMEOUT", "30")),
+    "process_workers": int(os.getenv("VMS_PROCESS_WORKERS", str(os.cpu_count() or 2))),
+    "shm_slots": int(os.getenv("VMS_SHM_SLOTS", "0")),  # 0 = two per worker
+    "shm_slot_bytes": int(os.getenv("VMS_SHM_SLOT_BYTES", str(1920 * 1080 * 3))),
+    # Threads used to run a frame's models concurrently in inline mode; 0 = sequential
+    "fanout_workers": int(os.getenv("VMS_FANOUT_WORKERS", "4")),
+}
 
 class ModelManager:
-    def __init__(self) -> None:
-        self.model_registry: Dict[str, Callable[[np.ndarray], FakeResult]] = {}
-        self._register_default_models()
+    """Model registry and inference dispatch.
+
+    Construction is cheap: models are registered and the batching scheduler or
+    process pool started by load(), which runs at application startup or on
+    first use.
+    """
+
+    def __init__(self, mode: Optional[str] = None) -> None:
+        self.model_registry: Dict[str, ModelFn] = {}
+        self.batch_registry: Dict[str, BatchModelFn] = {}
+        self.model_views: Dict[str, List[str]] = {}
+        self._view_lock = threading.Lock()
+        self.view_usage: Dict[str, Dict[str, int]] = {}
+        self.views_computed = 0
+        self.view_hits = 0
+        self.mode = mode or INFERENCE_CONFIG["mode"]
+        self.fanout: Optional[ThreadPoolExecutor] = None
+        self.scheduler: Optional[InferenceScheduler] = None
+        self.executor: Optional[ProcessModelExecutor] = None
+        self.loaded = False
+        self._load_lock = threading.Lock()
+
+    def load(self) -> None:
+        """Register the models and start the configured inference backend (idempotent)"""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if self.loaded:
+                return
+            self._register_default_models()
+            if INFERENCE_CONFIG["fanout_workers"] > 0:
+                self.fanout = ThreadPoolExecutor(max_workers=INFERENCE_CONFIG["fanout_workers"], thread_name_prefix="model-fanout")
+            if self.mode == "process":
+                workers = INFERENCE_CONFIG["process_workers"]
+                self.executor = ProcessModelExecutor(
+                    workers,
+                    INFERENCE_CONFIG["shm_slots"] or workers * 2,
+                    INFERENCE_CONFIG["shm_slot_bytes"],
+                )
+            elif self.mode == "batched":
+                self.scheduler = InferenceScheduler(
+                    self.batch_registry,
+                    max_batch_size=INFERENCE_CONFIG["max_batch_size"],
+                    max_wait=INFERENCE_CONFIG["max_wait"],
+                    result_timeout=INFERENCE_CONFIG["result_timeout"],
+                )
+            self.loaded = True
+
+    def register_model(self, name: str, model_fn: ModelFn, batch_fn: Optional[BatchModelFn] = None,
+                       views: Optional[List[str]] = None) -> None:
+        """Register a model.
+
+        batch_fn takes a stacked (N, H, W, C) array and returns N results. A model
+        that declares views is called as model_fn(frame, views) with those entries
+        of the frame's FrameViews, computed once per frame and shared by all models.
+        """
+        self.model_registry[name] = model_fn
+        self.model_views[name] = list(views or [])
+        self.view_usage[name] = {view: 0 for view in self.model_views[name]}
+        self.batch_registry[name] = batch_fn or self._per_frame(name)
+
+    def _per_frame(self, model_name: str) -> BatchModelFn:
+        """Batched adapter for models that only have a single-frame implementation"""
+        def run_batch(frames: np.ndarray) -> List[FakeResult]:
+            return [self._call_model(model_name, frame, FrameViews(frame)) for frame in frames]
+        return run_batch
+
+    def _call_model(self, model_name: str, frame: np.ndarray, views: FrameViews) -> FakeResult:
+        model_fn = self.model_registry[model_name]
+        view_names = self.model_views[model_name]
+        if not view_names:
+            return model_fn(frame)
+        result = model_fn(frame, views.for_model(view_names))
+        with self._view_lock:
+            usage = self.view_usage[model_name]
+            for view in view_names:
+                usage[view] += 1
+        return result
 
     def _register_default_models(self) -> None:
         # Enhanced AI models for VMS
@@ -37,8 +137,7 @@ class ModelManager:
                 "processing_time": round(random.uniform(0.05, 0.15), 3)
             }
 
-        def defect_analysis(frame: np.ndarray) -> FakeResult:
-            mean_val = float(frame.mean())
+        def defect_summary(mean_val: float) -> FakeResult:
             base_score = abs(mean_val - 127.5) / 127.5
             
             # Add noise to simulate real analysis
@@ -62,6 +161,14 @@ class ModelManager:
                 "processing_time": round(random.uniform(0.08, 0.20), 3)
             }
 
+        def defect_analysis(frame: np.ndarray, views: Dict[str, Any]) -> FakeResult:
+            return defect_summary(views["mean"])
+
+        def defect_analysis_batch(frames: np.ndarray) -> List[FakeResult]:
+            # One vectorized reduction for the whole batch
+            means = frames.reshape(len(frames), -1).mean(axis=1)
+            return [defect_summary(float(m)) for m in means]
+
         def road_condition(frame: np.ndarray) -> FakeResult:
             """Analyze road surface conditions"""
             import random
@@ -106,19 +213,85 @@ class ModelManager:
             }
 
         # Register all models
-        self.model_registry["asset_detection"] = asset_detection
-        self.model_registry["defect_analysis"] = defect_analysis
-        self.model_registry["road_condition"] = road_condition
-        self.model_registry["traffic_analysis"] = traffic_analysis
+        self.register_model("asset_detection", asset_detection)
+        self.register_model("defect_analysis", defect_analysis, defect_analysis_batch, views=["mean"])
+        self.register_model("road_condition", road_condition)
+        self.register_model("traffic_analysis", traffic_analysis)
 
     def available_models(self) -> List[str]:
+        self.load()
         return list(self.model_registry.keys())
 
     def run_models(self, frame: np.ndarray, models: List[str]) -> Dict[str, FakeResult]:
-        results: Dict[str, FakeResult] = {}
-        for model_name in models:
-            model_fn = self.model_registry.get(model_name)
-            if model_fn is None:
-                continue
-            results[model_name] = model_fn(frame)
+        self.load()
+        if self.scheduler is not None:
+            # The scheduler records each frame's share of the batch time
+            return self.scheduler.run(frame, models)
+        if self.executor is not None and self.executor.fits(frame):
+            results, timings = self.executor.run(frame, models)
+        else:
+            if self.executor is not None:
+                self.executor.frames_oversized += 1
+            results, timings = self.run_models_timed(frame, models)
+        # Observed here rather than where the model ran, which may be a worker process
+        for name, seconds in timings.items():
+            MODEL_INFERENCE_SECONDS.observe(seconds, name)
         return results
+
+    def run_models_timed(self, frame: np.ndarray, models: List[str]) -> Tuple[Dict[str, FakeResult], Dict[str, float]]:
+        """Run models in this process; returns the results and each model's wall time"""
+        self.load()
+        names = [m for m in models if m in self.model_registry]
+        views = FrameViews(frame)
+        if self.fanout is not None and len(names) > 1:
+            # Independent models run concurrently; shared views are still built once
+            futures = {name: self.fanout.submit(self._timed_call, name, frame, views) for name in names}
+            timed = {name: future.result() for name, future in futures.items()}
+        else:
+            timed = {name: self._timed_call(name, frame, views) for name in names}
+        with self._view_lock:
+            self.views_computed += len(views.computed)
+            self.view_hits += views.hits
+        return ({name: result for name, (result, _) in timed.items()},
+                {name: seconds for name, (_, seconds) in timed.items()})
+
+    def _timed_call(self, model_name: str, frame: np.ndarray, views: FrameViews) -> Tuple[FakeResult, float]:
+        start_time = time.perf_counter()
+        result = self._call_model(model_name, frame, views)
+        return result, time.perf_counter() - start_time
+
+    def model_info(self) -> List[dict]:
+        """Registered models with the cached views each one declared and how often it used them"""
+        self.load()
+        with self._view_lock:
+            return [{
+                "name": name,
+                "views": list(self.model_views[name]),
+                "view_usage": dict(self.view_usage[name]),
+            } for name in self.model_registry]
+
+    def view_stats(self) -> Dict[str, int]:
+        with self._view_lock:
+            return {"computed": self.views_computed, "hits": self.view_hits}
+
+    def scheduler_stats(self) -> Optional[Dict[str, Dict[str, float]]]:
+        if self.scheduler is None:
+            return None
+        return self.scheduler.stats()
+
+    def cpu_time(self) -> float:
+        """CPU seconds of this process plus its inference worker processes"""
+        return time.process_time() + (self.executor.cpu_time() if self.executor is not None else 0.0)
+
+    def executor_stats(self) -> Optional[Dict[str, Any]]:
+        if self.executor is None:
+            return None
+        return self.executor.stats()
+
+    def shutdown(self) -> None:
+        if self.fanout is not None:
+            self.fanout.shutdown(wait=False)
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+        if self.executor is not None:
+            self.executor.shutdown()
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+class MotionGate:
+    """Cheap change detector that decides whether a frame needs fresh inference.
+
+    Frames are reduced to a small grayscale thumbnail and compared with the
+    thumbnail of the last frame that was actually inferred, so slow drift
+    still adds up to a refresh. Inference is also forced every
+    refresh_interval seconds no matter how static the scene is.
+    """
+
+    SIGNATURE_SIZE = (64, 36)
+
+    def __init__(self, threshold: float, refresh_interval: float = 5.0) -> None:
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.frames_checked = 0
+        self.frames_gated = 0
+        self.forced_refreshes = 0
+        self.last_score = 0.0
+        self._reference = None
+        self._last_refresh = 0.0
+
+    def _signature(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_infer(self, frame: np.ndarray, now: float) -> bool:
+        self.frames_checked += 1
+        signature = self._signature(frame)
+        if self._reference is None or self._reference.shape != signature.shape:
+            self._accept(signature, now)
+            return True
+        # Mean absolute difference normalised to 0..1
+        self.last_score = float(cv2.absdiff(signature, self._reference).mean()) / 255.0
+        if self.last_score >= self.threshold:
+            self._accept(signature, now)
+            return True
+        if now - self._last_refresh >= self.refresh_interval:
+            self.forced_refreshes += 1
+            self._accept(signature, now)
+            return True
+        self.frames_gated += 1
+        return False
+
+    def _accept(self, signature: np.ndarray, now: float) -> None:
+        self._reference = signature
+        self._last_refresh = now
+
+    def stats(self) -> dict:
+        return {
+            "motion_threshold": self.threshold,
+            "motion_score": round(self.last_score, 4),
+            "frames_gated": self.frames_gated,
+            "forced_refreshes": self.forced_refreshes,
+        }
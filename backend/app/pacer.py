@@ -0,0 +1,71 @@
+import time
+import threading
+from collections import deque
+from typing import Deque
+
+class FramePacer:
+    """Releases frames against absolute deadlines at a target rate.
+
+    Deadlines advance by exactly one period per frame, so time spent processing
+    is absorbed into the wait instead of being added to it. A frame that starts
+    more than one period late is an over-run; the missed slots are skipped
+    rather than replayed in a burst.
+    """
+
+    def __init__(self, fps: float) -> None:
+        self.period = 1.0 / fps
+        self.overruns = 0
+        self.skipped_slots = 0
+        self._next_deadline = None
+        self._starts: Deque[float] = deque(maxlen=30)
+
+    @property
+    def fps(self) -> float:
+        return 1.0 / self.period
+
+    def set_fps(self, fps: float) -> None:
+        self.period = 1.0 / fps
+
+    @property
+    def next_deadline(self) -> float:
+        """time.monotonic() at which the next frame is due"""
+        if self._next_deadline is None:
+            self._next_deadline = time.monotonic()
+        return self._next_deadline
+
+    def advance(self) -> None:
+        """Start the frame that is due now and move to the next deadline"""
+        now = time.monotonic()
+        late = now - self.next_deadline
+        if late > self.period:
+            missed = int(late // self.period)
+            self.overruns += 1
+            self.skipped_slots += missed
+            self._next_deadline += missed * self.period
+        self._next_deadline += self.period
+
+    def frame_started(self) -> None:
+        """Count a frame that is actually processed; empty slots do not add to achieved_fps"""
+        self._starts.append(time.monotonic())
+
+    def wait(self, stop_event: threading.Event) -> bool:
+        """Sleep until the next deadline; returns False if stop_event fired first"""
+        delay = self.next_deadline - time.monotonic()
+        if delay > 0 and stop_event.wait(delay):
+            return False
+        self.advance()
+        return True
+
+    def achieved_fps(self) -> float:
+        if len(self._starts) < 2:
+            return 0.0
+        span = self._starts[-1] - self._starts[0]
+        return (len(self._starts) - 1) / span if span > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "target_fps": round(self.fps, 2),
+            "achieved_fps": round(self.achieved_fps(), 2),
+            "overruns": self.overruns,
+            "skipped_slots": self.skipped_slots,
+        }
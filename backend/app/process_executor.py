@@ -0,0 +1,126 @@
+import os
+import queue
+import threading
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+FakeResult = Dict[str, Any]
+
+class SharedFrameRing:
+    """Fixed-size frame slots in one shared memory block.
+
+    A frame is copied into a free slot and worker processes read it in place,
+    so only the slot index, shape and dtype cross the process boundary.
+    """
+
+    def __init__(self, slots: int, slot_bytes: int) -> None:
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.shm = SharedMemory(create=True, size=slots * slot_bytes)
+        self._free: "queue.Queue[int]" = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        return self._free.get(timeout=timeout)
+
+    def release(self, slot: int) -> None:
+        self._free.put(slot)
+
+    def write(self, slot: int, frame: np.ndarray) -> None:
+        dst = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+        dst[...] = frame
+
+    def in_use(self) -> int:
+        return self.slots - self._free.qsize()
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+# State of each pool process, set up once by _init_worker
+_worker_shm: Optional[SharedMemory] = None
+_worker_slot_bytes = 0
+_worker_models = None
+
+def _init_worker(shm_name: str, slot_bytes: int) -> None:
+    global _worker_shm, _worker_slot_bytes, _worker_models
+    from .model_manager import ModelManager
+    _worker_shm = SharedMemory(name=shm_name)
+    _worker_slot_bytes = slot_bytes
+    _worker_models = ModelManager(mode="inline")
+
+def _run_in_worker(slot: int, shape: tuple, dtype: str, models: List[str]) -> Tuple[Dict[str, FakeResult], Dict[str, float], int, float]:
+    frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_worker_shm.buf, offset=slot * _worker_slot_bytes)
+    # Timings go back with the results: metrics recorded here would stay in this process
+    results, timings = _worker_models.run_models_timed(frame, models)
+    # So is the worker's CPU time, which the parent's process_time() does not include
+    return results, timings, os.getpid(), time.process_time()
+
+class ProcessModelExecutor:
+    """Runs inference in a pool of worker processes fed through a SharedFrameRing.
+
+    The calling StreamWorker blocks on its own Future, so results come straight
+    back to the stream that submitted the frame. Worker processes build their
+    own ModelManager, so only the built-in models are available in this mode.
+    """
+
+    def __init__(self, workers: int, slots: int, slot_bytes: int) -> None:
+        self.ring = SharedFrameRing(slots, slot_bytes)
+        # spawn: forking a process that already runs stream threads is unsafe
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.ring.name, slot_bytes),
+        )
+        self.workers = workers
+        self.frames_submitted = 0
+        self.frames_oversized = 0
+        # Latest CPU time reported by each worker process, by pid
+        self._worker_cpu: Dict[int, float] = {}
+        self._cpu_lock = threading.Lock()
+
+    def fits(self, frame: np.ndarray) -> bool:
+        return frame.nbytes <= self.ring.slot_bytes
+
+    def run(self, frame: np.ndarray, models: List[str]) -> Tuple[Dict[str, FakeResult], Dict[str, float]]:
+        """Results of the models on one frame and how long each took in the worker"""
+        slot = self.ring.acquire()
+        try:
+            self.ring.write(slot, frame)
+            future = self.pool.submit(_run_in_worker, slot, frame.shape, frame.dtype.str, models)
+            self.frames_submitted += 1
+            results, timings, pid, cpu = future.result()
+        finally:
+            self.ring.release(slot)
+        with self._cpu_lock:
+            self._worker_cpu[pid] = cpu
+        return results, timings
+
+    def cpu_time(self) -> float:
+        """CPU seconds used by the worker processes, as of each one's last frame"""
+        with self._cpu_lock:
+            return sum(self._worker_cpu.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "slots": self.ring.slots,
+            "slots_in_use": self.ring.in_use(),
+            "slot_bytes": self.ring.slot_bytes,
+            "frames_submitted": self.frames_submitted,
+            "frames_oversized": self.frames_oversized,
+        }
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.ring.close()
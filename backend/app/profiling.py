@@ -0,0 +1,142 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Any, Optional
+
+# Per-stage frame timings and the on-demand sampling profiler behind /admin/profile
+PROFILING_CONFIG = {
+    "stage_window": int(os.getenv("VMS_STAGE_WINDOW", "300")),
+    "profiler_enabled": os.getenv("VMS_PROFILER", "1") == "1",
+    "profiler_max_seconds": float(os.getenv("VMS_PROFILER_MAX_SECONDS", "60")),
+    "profiler_min_interval": 0.001,
+}
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class StageWindows:
+    """Rolling window of recent durations for each named pipeline stage"""
+
+    def __init__(self, size: Optional[int] = None) -> None:
+        self.size = size or PROFILING_CONFIG["stage_window"]
+        self._windows: Dict[str, Deque[float]] = {}
+        self._totals: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            window = self._windows.get(stage)
+            if window is None:
+                window = self._windows[stage] = deque(maxlen=self.size)
+            window.append(seconds)
+            self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+
+    def mean(self, stage: str) -> float:
+        """Average duration of a stage over the window, 0.0 before any sample"""
+        with self._lock:
+            window = self._windows.get(stage)
+            return sum(window) / len(window) if window else 0.0
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start_time)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per stage, in milliseconds over the window; total_s is since the stream started"""
+        with self._lock:
+            windows = {stage: sorted(window) for stage, window in self._windows.items()}
+            totals = dict(self._totals)
+        return {
+            stage: {
+                "count": len(values),
+                "avg_ms": round(sum(values) / len(values) * 1000, 3),
+                "p50_ms": round(_percentile(values, 0.50) * 1000, 3),
+                "p95_ms": round(_percentile(values, 0.95) * 1000, 3),
+                "max_ms": round(values[-1] * 1000, 3),
+                "total_s": round(totals[stage], 3),
+            } for stage, values in windows.items() if values
+        }
+
+class SamplingProfiler:
+    """Samples the Python stacks of selected threads at a fixed interval.
+
+    Stacks are aggregated in the collapsed format used by flamegraph.pl and
+    speedscope ("thread;outer;...;inner count"). Sampling reads
+    sys._current_frames() from one background thread, so the sampled threads
+    run unmodified and pay only for the GIL hand-offs.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_prefixes: Optional[List[str]] = None) -> None:
+        self.interval = max(interval, PROFILING_CONFIG["profiler_min_interval"])
+        self.thread_prefixes = thread_prefixes or []
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self.profile()
+
+    def _selected(self) -> Dict[int, str]:
+        names = {}
+        for thread in threading.enumerate():
+            if thread is self._thread or thread.ident is None:
+                continue
+            if self.thread_prefixes and not thread.name.startswith(tuple(self.thread_prefixes)):
+                continue
+            names[thread.ident] = thread.name
+        return names
+
+    def _run(self) -> None:
+        names = self._selected()
+        refreshed = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            if time.perf_counter() - refreshed > 1.0:
+                # Pick up streams started while profiling
+                names = self._selected()
+                refreshed = time.perf_counter()
+            frames = sys._current_frames()
+            for ident, name in names.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            del frames
+
+    def profile(self) -> Dict[str, Any]:
+        return {
+            "duration": round(self.duration, 3),
+            "interval": self.interval,
+            "samples": self.samples,
+            "threads": sorted({stack.split(";", 1)[0] for stack in self.stacks}),
+            "stacks": dict(self.stacks.most_common()),
+        }
+
+    def collapsed(self) -> str:
+        """Profile as collapsed-stack text, one "stack count" line per unique stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
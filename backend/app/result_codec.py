@@ -0,0 +1,181 @@
+import json
+import struct
+from typing import Dict, List, Any, Optional, Tuple
+
+# Compact binary encoding of model summaries for stream_results.result_blob.
+#
+# A blob starts with one tag byte. Tag 0 means the rest is the UTF-8 JSON of
+# the summary (used for unknown models and for any summary that would not
+# round-trip exactly). Any other tag selects a fixed per-model schema whose
+# fields are packed little-endian in declaration order. Floats the models
+# round to N decimals are stored as scaled integers, so decoding returns the
+# exact same values; enums are stored as a one-byte index. A summary the
+# motion gate reused ends with "reused": true; that flag is the tag's high bit.
+
+JSON_TAG = 0
+REUSED_FLAG = 0x80
+
+class Field:
+    """One summary field: struct code plus either a decimal scale or an enum vocabulary"""
+
+    __slots__ = ("name", "code", "scale", "decimals", "choices", "index")
+
+    def __init__(self, name: str, code: str, decimals: Optional[int] = None,
+                 choices: Optional[List[str]] = None) -> None:
+        self.name = name
+        self.code = code
+        self.decimals = decimals
+        self.scale = 10 ** decimals if decimals is not None else None
+        self.choices = choices
+        self.index = {c: i for i, c in enumerate(choices)} if choices else None
+
+    def pack_value(self, value: Any) -> int:
+        """Integer to store for value; raises ValueError if it would not round-trip"""
+        if self.choices is not None:
+            if value not in self.index:
+                raise ValueError(f"{self.name}: unknown value {value!r}")
+            return self.index[value]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{self.name}: not a number")
+        if self.scale is None:
+            if not isinstance(value, int):
+                raise ValueError(f"{self.name}: not an integer")
+            return value
+        scaled = round(value * self.scale)
+        if round(scaled / self.scale, self.decimals) != value:
+            raise ValueError(f"{self.name}: more than {self.decimals} decimals")
+        return scaled
+
+    def unpack_value(self, raw: int) -> Any:
+        if self.choices is not None:
+            return self.choices[raw]
+        if self.scale is None:
+            return raw
+        return round(raw / self.scale, self.decimals)
+
+class RecordSchema:
+    """Fixed layout for a flat record of Fields"""
+
+    def __init__(self, fields: List[Field]) -> None:
+        self.fields = fields
+        self.names = [f.name for f in fields]
+        self.struct = struct.Struct("<" + "".join(f.code for f in fields))
+
+    def pack(self, record: Dict[str, Any]) -> bytes:
+        if list(record) != self.names:
+            raise ValueError("fields do not match schema")
+        try:
+            return self.struct.pack(*(f.pack_value(record[f.name]) for f in self.fields))
+        except struct.error as e:
+            raise ValueError(str(e))
+
+    def unpack_from(self, data: bytes, offset: int) -> Tuple[Dict[str, Any], int]:
+        raw = self.struct.unpack_from(data, offset)
+        record = {f.name: f.unpack_value(v) for f, v in zip(self.fields, raw)}
+        return record, offset + self.struct.size
+
+class ModelSchema:
+    """Scalar fields of one model's summary plus an optional list of fixed records"""
+
+    def __init__(self, tag: int, fields: List[Field], list_field: Optional[str] = None,
+                 list_schema: Optional[RecordSchema] = None, list_position: int = 0) -> None:
+        self.tag = tag
+        self.scalars = RecordSchema(fields)
+        self.list_field = list_field
+        self.list_schema = list_schema
+        # Index of the list field among the summary keys, to restore key order
+        self.list_position = list_position
+        self.names = list(self.scalars.names)
+        if list_field is not None:
+            self.names.insert(list_position, list_field)
+
+    def encode(self, summary: Dict[str, Any]) -> bytes:
+        if list(summary) != self.names:
+            raise ValueError("fields do not match schema")
+        scalars = {name: summary[name] for name in self.scalars.names}
+        parts = [bytes((self.tag,)), self.scalars.pack(scalars)]
+        if self.list_field is not None:
+            items = summary[self.list_field]
+            if not isinstance(items, list) or len(items) > 255:
+                raise ValueError(f"{self.list_field}: not a short list")
+            parts.append(bytes((len(items),)))
+            parts.extend(self.list_schema.pack(item) for item in items)
+        return b"".join(parts)
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        scalars, offset = self.scalars.unpack_from(data, 1)
+        if self.list_field is None:
+            return scalars
+        count = data[offset]
+        offset += 1
+        items = []
+        for _ in range(count):
+            item, offset = self.list_schema.unpack_from(data, offset)
+            items.append(item)
+        keys = list(scalars.items())
+        keys.insert(self.list_position, (self.list_field, items))
+        return dict(keys)
+
+DETECTION_SCHEMA = RecordSchema([
+    Field("x", "H"), Field("y", "H"), Field("width", "H"), Field("height", "H"),
+    Field("confidence", "B", decimals=2),
+    Field("class", "B", choices=["vehicle", "person", "sign", "barrier"]),
+])
+
+MODEL_SCHEMAS: Dict[str, ModelSchema] = {
+    "asset_detection": ModelSchema(1, [
+        Field("objects", "H"),
+        Field("processing_time", "H", decimals=3),
+    ], list_field="detections", list_schema=DETECTION_SCHEMA, list_position=1),
+    "defect_analysis": ModelSchema(2, [
+        Field("defect_score", "H", decimals=3),
+        Field("defect_type", "B", choices=["none", "minor", "major", "critical"]),
+        Field("confidence", "B", decimals=2),
+        Field("processing_time", "H", decimals=3),
+    ]),
+    "road_condition": ModelSchema(3, [
+        Field("condition", "B", choices=["excellent", "good", "fair", "poor", "critical"]),
+        Field("score", "H", decimals=3),
+        Field("surface_type", "B", choices=["asphalt", "concrete", "gravel", "dirt"]),
+        Field("weather_impact", "B", choices=["dry", "wet", "icy", "snowy"]),
+        Field("processing_time", "H", decimals=3),
+    ]),
+    "traffic_analysis": ModelSchema(4, [
+        Field("vehicle_count", "H"),
+        Field("density", "B", choices=["low", "medium", "high"]),
+        Field("flow_rate", "H", decimals=3),
+        Field("congestion_level", "H", decimals=3),
+        Field("average_speed", "H", decimals=1),
+        Field("processing_time", "H", decimals=3),
+    ]),
+}
+
+SCHEMAS_BY_TAG: Dict[int, ModelSchema] = {s.tag: s for s in MODEL_SCHEMAS.values()}
+
+def encode_summary(model_name: str, summary: Dict[str, Any]) -> bytes:
+    """Binary encoding of a model summary, falling back to tagged JSON"""
+    schema = MODEL_SCHEMAS.get(model_name)
+    if schema is not None:
+        fields, flag = summary, 0
+        if list(summary)[-1:] == ["reused"] and summary["reused"] is True:
+            fields, flag = {k: v for k, v in summary.items() if k != "reused"}, REUSED_FLAG
+        try:
+            encoded = schema.encode(fields)
+            return bytes((encoded[0] | flag,)) + encoded[1:]
+        except (ValueError, TypeError, KeyError):
+            pass
+    return bytes((JSON_TAG,)) + json.dumps(summary, separators=(",", ":")).encode("utf-8")
+
+def decode_summary(data: bytes) -> Dict[str, Any]:
+    if data[0] == JSON_TAG:
+        return json.loads(data[1:].decode("utf-8"))
+    summary = SCHEMAS_BY_TAG[data[0] & ~REUSED_FLAG].decode(data)
+    if data[0] & REUSED_FLAG:
+        summary["reused"] = True
+    return summary
+
+def decode_row(result_data: Optional[str], result_blob: Optional[bytes]) -> Dict[str, Any]:
+    """Summary of a stream_results row in either storage format"""
+    if result_blob:
+        return decode_summary(result_blob)
+    return json.loads(result_data) if result_data else {}
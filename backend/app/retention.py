@@ -0,0 +1,210 @@
+import gzip
+import json
+import os
+import time
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+from sqlalchemy import select, delete, text
+from .database import (
+    get_write_session, get_engine, StreamResult, Alert,
+    ensure_result_partitions, expired_result_partitions, drop_result_partition,
+)
+from .logger import vms_logger
+from .result_codec import decode_row
+from .columnar_archive import ColumnarArchive
+
+# Time-to-live enforcement for result and alert history; 0 days keeps rows
+# forever, which is the default, so deleting history is always an opt-in
+RETENTION_CONFIG = {
+    "enabled": os.getenv("VMS_RETENTION", "1") == "1",
+    "results_days": float(os.getenv("VMS_RETENTION_RESULTS_DAYS", "0")),
+    "alerts_days": float(os.getenv("VMS_RETENTION_ALERTS_DAYS", "0")),
+    "chunk_size": int(os.getenv("VMS_RETENTION_CHUNK_SIZE", "5000")),
+    "interval": float(os.getenv("VMS_RETENTION_INTERVAL", "3600")),
+    "archive_dir": os.getenv("VMS_RETENTION_ARCHIVE_DIR", ""),
+}
+
+class JsonlArchiver:
+    """Writes expired stream_results rows to gzipped JSON-lines files, one per partition/chunk"""
+
+    def __init__(self, root: str) -> None:
+        self.root = Path(root)
+
+    def archive(self, name: str, rows: List[Dict[str, Any]]) -> Optional[Path]:
+        if not rows:
+            return None
+        directory = self.root / "stream_results"
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{name}.jsonl.gz"
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+        return path
+
+def _archive_record(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "stream_id": row.stream_id,
+        "model": row.model_name,
+        "timestamp": row.timestamp,
+        "summary": decode_row(row.result_data, row.result_blob),
+    }
+
+class RetentionPruner:
+    """Background TTL enforcement for stream_results and alerts.
+
+    Expired rows are deleted in bounded chunks, each in its own short
+    transaction with a pause in between, so the pruner never holds long locks
+    against the write path. When stream_results is time-partitioned (MySQL),
+    whole expired partitions are archived and dropped instead, and upcoming
+    daily partitions are created ahead of time.
+    """
+
+    def __init__(self, results_days: float, alerts_days: float, chunk_size: int = 5000,
+                 interval: float = 3600.0, chunk_pause: float = 0.05,
+                 archiver: Optional[JsonlArchiver] = None,
+                 columnar: Optional[ColumnarArchive] = None) -> None:
+        self.results_days = results_days
+        self.alerts_days = alerts_days
+        self.chunk_size = chunk_size
+        self.interval = interval
+        self.chunk_pause = chunk_pause
+        self.archiver = archiver
+        self.columnar = columnar
+        self.deleted: Dict[str, int] = {"stream_results": 0, "alerts": 0}
+        self.archived_rows = 0
+        self.partitions_dropped: List[str] = []
+        self.last_run: Optional[float] = None
+        self.last_duration = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="retention-pruner", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def run_once(self) -> Dict[str, int]:
+        start_time = time.time()
+        now = time.time()
+        pruned = {"stream_results": 0, "alerts": 0}
+        if self.columnar is not None:
+            # Complete days are rolled into column files before they can expire
+            self.columnar.export_pending()
+        if self.results_days > 0:
+            cutoff = now - self.results_days * 86400
+            pruned["stream_results"] += self._drop_partitions(cutoff)
+            pruned["stream_results"] += self._prune_results(cutoff)
+        if self.alerts_days > 0:
+            cutoff_dt = datetime.fromtimestamp(now - self.alerts_days * 86400, tz=timezone.utc)
+            pruned["alerts"] += self._prune_chunks(Alert, Alert.created_at < cutoff_dt.replace(tzinfo=None))
+        for table, count in pruned.items():
+            self.deleted[table] += count
+        self.last_run = now
+        self.last_duration = time.time() - start_time
+        return pruned
+
+    def _drop_partitions(self, cutoff: float) -> int:
+        try:
+            ensure_result_partitions()
+            expired = expired_result_partitions(cutoff)
+        except Exception as e:
+            vms_logger.log_database_error("partition_maintenance", str(e), "stream_results")
+            return 0
+        dropped = 0
+        for name in expired:
+            if self._stop_event.is_set():
+                break
+            if self.archiver is not None:
+                # Streamed chunk_size rows at a time; a day's partition can hold millions
+                with get_engine().connect() as conn:
+                    result = conn.execution_options(stream_results=True).execute(text(
+                        "SELECT id, stream_id, model_name, timestamp, result_data, result_blob "
+                        f"FROM stream_results PARTITION ({name})"
+                    ))
+                    for rows in result.partitions(self.chunk_size):
+                        self.archiver.archive(name, [_archive_record(r) for r in rows])
+                        self.archived_rows += len(rows)
+            drop_result_partition(name)
+            self.partitions_dropped.append(name)
+            vms_logger.log_database_operation("drop_partition", "stream_results", 1)
+            dropped += 1
+        return dropped
+
+    def _prune_results(self, cutoff: float) -> int:
+        if self.archiver is None:
+            return self._prune_chunks(StreamResult, StreamResult.timestamp < cutoff)
+        total = 0
+        while not self._stop_event.is_set():
+            with get_write_session() as db:
+                rows = db.execute(
+                    select(StreamResult.id, StreamResult.stream_id, StreamResult.model_name,
+                           StreamResult.timestamp, StreamResult.result_data, StreamResult.result_blob)
+                    .where(StreamResult.timestamp < cutoff).order_by(StreamResult.id).limit(self.chunk_size)
+                ).fetchall()
+                if not rows:
+                    break
+                day = datetime.fromtimestamp(rows[0].timestamp, tz=timezone.utc)
+                self.archiver.archive(f"{day:%Y%m%d}", [_archive_record(r) for r in rows])
+                self.archived_rows += len(rows)
+                db.execute(delete(StreamResult).where(StreamResult.id.in_([r.id for r in rows])))
+            total += len(rows)
+            if len(rows) < self.chunk_size:
+                break
+            time.sleep(self.chunk_pause)
+        return total
+
+    def _prune_chunks(self, model, condition) -> int:
+        """Delete matching rows chunk_size at a time, one short transaction per chunk"""
+        total = 0
+        while not self._stop_event.is_set():
+            start_time = time.time()
+            with get_write_session() as db:
+                # Select ids first: MySQL does not allow LIMIT inside IN (subquery)
+                ids = db.execute(select(model.id).where(condition).order_by(model.id).limit(self.chunk_size)).scalars().all()
+                if not ids:
+                    break
+                db.execute(delete(model).where(model.id.in_(ids)))
+            total += len(ids)
+            vms_logger.log_database_operation("prune", model.__tablename__, len(ids), time.time() - start_time)
+            if len(ids) < self.chunk_size:
+                break
+            time.sleep(self.chunk_pause)
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "results_days": self.results_days,
+            "alerts_days": self.alerts_days,
+            "deleted": dict(self.deleted),
+            "archived_rows": self.archived_rows,
+            "partitions_dropped": list(self.partitions_dropped),
+            "last_run": self.last_run,
+            "last_duration": round(self.last_duration, 3),
+        }
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                vms_logger.log_database_error("retention", str(e))
+            self._stop_event.wait(self.interval)
+
+def create_pruner(columnar: Optional[ColumnarArchive] = None) -> Optional[RetentionPruner]:
+    """Build a pruner from RETENTION_CONFIG, or None when retention is disabled"""
+    if not RETENTION_CONFIG["enabled"]:
+        return None
+    archive_dir = RETENTION_CONFIG["archive_dir"]
+    return RetentionPruner(
+        RETENTION_CONFIG["results_days"], RETENTION_CONFIG["alerts_days"],
+        chunk_size=RETENTION_CONFIG["chunk_size"], interval=RETENTION_CONFIG["interval"],
+        archiver=JsonlArchiver(archive_dir) if archive_dir else None,
+        columnar=columnar,
+    )
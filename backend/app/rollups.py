@@ -0,0 +1,276 @@
+import json
+import math
+import time
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from sqlalchemy import select
+from .database import get_db_session, get_write_session, MetricRollup
+from .logger import vms_logger
+
+RESOLUTIONS = {"minute": 60, "hour": 3600}
+
+class QuantileSketch:
+    """Mergeable log-bucketed quantile sketch with bounded relative error.
+
+    Positive values land in bucket ceil(log_gamma(x)), negatives in a mirrored
+    set of buckets and zeros in their own counter, so any quantile estimate is
+    within `relative_accuracy` of the true value.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value > 1e-12:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.positive[key] = self.positive.get(key, 0) + 1
+        elif value < -1e-12:
+            key = math.ceil(math.log(-value) / self._log_gamma)
+            self.negative[key] = self.negative.get(key, 0) + 1
+        else:
+            self.zero += 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for key, n in other.positive.items():
+            self.positive[key] = self.positive.get(key, 0) + n
+        for key, n in other.negative.items():
+            self.negative[key] = self.negative.get(key, 0) + n
+        self.zero += other.zero
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def to_json(self) -> str:
+        return json.dumps({"a": self.relative_accuracy, "p": self.positive, "n": self.negative, "z": self.zero})
+
+    @classmethod
+    def from_json(cls, data: str) -> "QuantileSketch":
+        raw = json.loads(data)
+        sketch = cls(raw.get("a", 0.01))
+        sketch.positive = {int(k): v for k, v in raw.get("p", {}).items()}
+        sketch.negative = {int(k): v for k, v in raw.get("n", {}).items()}
+        sketch.zero = raw.get("z", 0)
+        sketch.count = sketch.zero + sum(sketch.positive.values()) + sum(sketch.negative.values())
+        return sketch
+
+class _Bucket:
+    __slots__ = ("count", "min", "max", "sum", "sketch")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+        self.sketch = QuantileSketch()
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sum += value
+        self.sketch.add(value)
+
+    def merge(self, other: "_Bucket") -> None:
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+        self.sketch.merge(other.sketch)
+
+    @classmethod
+    def from_row(cls, row: MetricRollup) -> "_Bucket":
+        bucket = cls()
+        bucket.count = row.count
+        bucket.min = row.min_value
+        bucket.max = row.max_value
+        bucket.sum = row.sum_value
+        bucket.sketch = QuantileSketch.from_json(row.sketch)
+        return bucket
+
+    def summary(self, bucket_start: float, quantiles: List[float]) -> Dict[str, Any]:
+        return {
+            "bucket_start": bucket_start,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "quantiles": {str(q): self.sketch.quantile(q) for q in quantiles},
+        }
+
+# (stream_id, model_name, field, resolution, bucket_start)
+BucketKey = Tuple[str, str, str, str, float]
+
+def numeric_fields(summary: Dict[str, Any]) -> Dict[str, float]:
+    """Top-level numeric fields of a model summary (booleans excluded)"""
+    return {k: float(v) for k, v in summary.items()
+            if isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)}
+
+class RollupAggregator:
+    """Maintains per-minute and per-hour rollups of numeric model outputs.
+
+    Results are folded into in-memory buckets as they arrive; a background
+    thread periodically merges the pending buckets into metric_rollups with one
+    read and one write pass per flush. Range queries read the rollup table and
+    overlay buckets that are not flushed yet. Results the motion gate reused
+    are skipped, so a static scene does not weight the buckets with copies of
+    one inference.
+    """
+
+    def __init__(self, flush_interval: float = 10.0) -> None:
+        self.flush_interval = flush_interval
+        self._pending: Dict[BucketKey, _Bucket] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self.flushes = 0
+        self.buckets_written = 0
+        self._thread = threading.Thread(target=self._run, name="rollup-flusher", daemon=True)
+        self._thread.start()
+
+    def add(self, stream_id: str, model_name: str, timestamp: float, summary: Dict[str, Any]) -> None:
+        if summary.get("reused"):
+            return
+        values = numeric_fields(summary)
+        if not values:
+            return
+        with self._lock:
+            for resolution, size in RESOLUTIONS.items():
+                bucket_start = math.floor(timestamp / size) * size
+                for field, value in values.items():
+                    key = (stream_id, model_name, field, resolution, float(bucket_start))
+                    bucket = self._pending.get(key)
+                    if bucket is None:
+                        bucket = self._pending[key] = _Bucket()
+                    bucket.add(value)
+
+    def flush(self) -> int:
+        """Merge pending buckets into metric_rollups; returns the number of buckets written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            start_time = time.time()
+            try:
+                self._write(pending)
+            except Exception as e:
+                # Put the buckets back so the next flush retries them
+                with self._lock:
+                    for key, bucket in pending.items():
+                        current = self._pending.get(key)
+                        if current is not None:
+                            bucket.merge(current)
+                        self._pending[key] = bucket
+                vms_logger.log_database_error("rollup_flush", str(e), "metric_rollups")
+                return 0
+            self.flushes += 1
+            self.buckets_written += len(pending)
+            vms_logger.log_database_operation("upsert", "metric_rollups", len(pending), time.time() - start_time)
+            return len(pending)
+
+    def _write(self, pending: Dict[BucketKey, _Bucket]) -> None:
+        stream_ids = {key[0] for key in pending}
+        bucket_starts = {key[4] for key in pending}
+        with get_write_session() as db:
+            existing = {
+                (r.stream_id, r.model_name, r.field, r.resolution, r.bucket_start): r
+                for r in db.execute(
+                    select(MetricRollup).where(
+                        MetricRollup.stream_id.in_(stream_ids),
+                        MetricRollup.bucket_start.in_(bucket_starts),
+                    )
+                ).scalars()
+            }
+            for key, bucket in pending.items():
+                row = existing.get(key)
+                if row is None:
+                    stream_id, model_name, field, resolution, bucket_start = key
+                    db.add(MetricRollup(
+                        stream_id=stream_id, model_name=model_name, field=field,
+                        resolution=resolution, bucket_start=bucket_start,
+                        count=bucket.count, min_value=bucket.min, max_value=bucket.max,
+                        sum_value=bucket.sum, sketch=bucket.sketch.to_json(),
+                    ))
+                    continue
+                merged = _Bucket.from_row(row)
+                merged.merge(bucket)
+                row.count = merged.count
+                row.min_value = merged.min
+                row.max_value = merged.max
+                row.sum_value = merged.sum
+                row.sketch = merged.sketch.to_json()
+
+    def query(self, stream_id: str, model_name: str, resolution: str, start: float, end: float,
+              field: Optional[str] = None, quantiles: Optional[List[float]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Rollup buckets in [start, end) per field, oldest first"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        quantiles = quantiles or [0.5, 0.9, 0.99]
+        buckets: Dict[Tuple[str, float], _Bucket] = {}
+        with get_db_session() as db:
+            query = select(MetricRollup).where(
+                MetricRollup.stream_id == stream_id,
+                MetricRollup.model_name == model_name,
+                MetricRollup.resolution == resolution,
+                MetricRollup.bucket_start >= start,
+                MetricRollup.bucket_start < end,
+            )
+            if field is not None:
+                query = query.where(MetricRollup.field == field)
+            for row in db.execute(query).scalars():
+                buckets[(row.field, row.bucket_start)] = _Bucket.from_row(row)
+        with self._lock:
+            unflushed = [(key, bucket) for key, bucket in self._pending.items()
+                         if key[0] == stream_id and key[1] == model_name and key[3] == resolution
+                         and start <= key[4] < end and (field is None or key[2] == field)]
+            for key, bucket in unflushed:
+                merged = _Bucket()
+                merged.merge(bucket)
+                existing = buckets.get((key[2], key[4]))
+                if existing is not None:
+                    merged.merge(existing)
+                buckets[(key[2], key[4])] = merged
+        series: Dict[str, List[Dict[str, Any]]] = {}
+        for (field_name, bucket_start) in sorted(buckets):
+            series.setdefault(field_name, []).append(buckets[(field_name, bucket_start)].summary(bucket_start, quantiles))
+        return series
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending_buckets": pending, "flushes": self.flushes, "buckets_written": self.buckets_written}
+
+    def close(self) -> None:
+        self._stop_event.set()
+        self._thread.join(timeout=2.0)
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
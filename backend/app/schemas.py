@@ -1,11 +1,18 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Literal
 
 class StreamConfig(BaseModel):
     stream_id: str
     source: str  # path or rtsp/http
     models: List[str] = []
     enabled: bool = True
+    queue_size: int = Field(2, ge=1, le=64)  # frames buffered between capture and processing
+    drop_policy: Literal["drop_oldest", "drop_newest"] = "drop_oldest"
+    motion_threshold: Optional[float] = Field(None, ge=0.0, le=1.0)  # None disables motion gating
+    motion_refresh_interval: float = Field(5.0, gt=0.0)  # seconds between forced inferences
+    fps: float = Field(5.0, gt=0.0, le=60.0)  # requested rate, the most the governor allows
+    min_fps: Optional[float] = Field(None, gt=0.0)  # floor under CPU pressure; default min(1, fps)
+    priority: int = 0  # higher-priority streams are slowed down last
 
 class StartStreamRequest(BaseModel):
     config: StreamConfig
@@ -31,3 +38,27 @@ class StreamStatus(BaseModel):
     running: bool
     models: List[str]
     last_timestamp: Optional[float] = None
+    frames_captured: int = 0
+    frames_processed: int = 0
+    frame_errors: int = 0
+    frames_dropped: int = 0
+    frames_skipped: int = 0
+    source_subscribers: int = 0
+    queue_depth: int = 0
+    drop_policy: str = "drop_oldest"
+    capture_lag: float = 0.0
+    avg_capture_lag: float = 0.0
+    target_fps: float = 5.0
+    effective_fps: float = 5.0
+    min_fps: float = 1.0
+    max_fps: float = 5.0
+    priority: int = 0
+    queued: bool = False
+    achieved_fps: float = 0.0
+    overruns: int = 0
+    skipped_slots: int = 0
+    motion_threshold: Optional[float] = None
+    motion_score: Optional[float] = None
+    frames_gated: int = 0
+    forced_refreshes: int = 0
+    inferences_saved: int = 0
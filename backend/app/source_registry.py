@@ -0,0 +1,56 @@
+import threading
+from typing import Dict, List
+from .capture import FrameQueue, SourceReader, is_live_source
+
+class SourceRegistry:
+    """Opens each unique live source once and fans its frames out to every stream using it.
+
+    Readers are reference counted by subscriber: the decoder is stopped and the
+    capture handle released when the last stream unsubscribes. Files are read
+    per stream, since each stream samples and loops its own copy.
+    """
+
+    def __init__(self) -> None:
+        self._readers: Dict[str, SourceReader] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def source_key(stream_id: str, source: str) -> str:
+        if is_live_source(source):
+            return source.strip()
+        return f"{source}#{stream_id}"
+
+    def acquire(self, stream_id: str, source: str, frames: FrameQueue, models: list, sample_fps: float = 5.0) -> SourceReader:
+        key = self.source_key(stream_id, source)
+        with self._lock:
+            reader = self._readers.get(key)
+            if reader is None or not reader.is_alive() and reader.ident is not None:
+                reader = SourceReader(key, source, sample_fps)
+                self._readers[key] = reader
+                reader.subscribe(stream_id, frames, models, sample_fps)
+                reader.start()
+            else:
+                reader.subscribe(stream_id, frames, models, sample_fps)
+        return reader
+
+    def release(self, stream_id: str, reader: SourceReader) -> None:
+        with self._lock:
+            remaining = reader.unsubscribe(stream_id)
+            if remaining == 0:
+                reader.stop()
+                if self._readers.get(reader.key) is reader:
+                    del self._readers[reader.key]
+        if remaining == 0:
+            reader.join(timeout=2.0)
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            readers = list(self._readers.values())
+        return [{
+            "source": r.source,
+            "live": r.live,
+            "synthetic": r.synthetic,
+            "subscribers": r.subscriber_ids(),
+            "frames_captured": r.frames_captured,
+            "frames_skipped": r.frames_skipped,
+        } for r in readers]
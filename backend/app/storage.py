@@ -1,28 +1,85 @@
-from typing import Dict, List, Any
+from collections import deque
+from typing import Deque, Dict, List, Any, Optional, Tuple
 from threading import Lock
 
 class InMemoryStorage:
-    def __init__(self) -> None:
-        self._results: Dict[str, List[dict]] = {}
-        self._alerts: List[dict] = []
+    """Bounded per-stream, per-model ring buffers of the most recent results.
+
+    Used by DatabaseStorage as a read-through cache for recent-result reads:
+    a read is served from the buffers only when they are known to hold every
+    row the query would return, otherwise the caller falls back to the database.
+    """
+
+    def __init__(self, per_model_capacity: int = 200, alert_capacity: int = 1000) -> None:
+        self.per_model_capacity = per_model_capacity
+        self._results: Dict[str, Dict[str, Deque[dict]]] = {}
+        # Models whose buffer has evicted rows, i.e. no longer holds full history
+        self._evicted: Dict[str, Dict[str, bool]] = {}
+        self._alerts: Deque[dict] = deque(maxlen=alert_capacity)
         self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
 
     def add_result(self, stream_id: str, result: dict) -> None:
+        model = result.get("model", "unknown")
+        with self._lock:
+            buffers = self._results.setdefault(stream_id, {})
+            ring = buffers.get(model)
+            if ring is None:
+                ring = buffers[model] = deque(maxlen=self.per_model_capacity)
+            if len(ring) == ring.maxlen:
+                self._evicted.setdefault(stream_id, {})[model] = True
+            ring.append(result)
+
+    def recent_results(self, stream_id: str, limit: int) -> Tuple[List[dict], bool]:
+        """Newest-first results for a stream and whether they are the complete answer"""
+        with self._lock:
+            buffers = self._results.get(stream_id, {})
+            rows = [r for ring in buffers.values() for r in ring]
+            oldest = {model: ring[0]["timestamp"] for model, ring in buffers.items()
+                      if ring and self._evicted.get(stream_id, {}).get(model)}
+        rows.sort(key=lambda r: r["timestamp"], reverse=True)
+        rows = rows[:limit]
+        # Buffers are dropped whenever the stream stops here, so they only hold
+        # this node's current run; anything older came from earlier runs (here
+        # or on another node) and is older still. A full page is therefore
+        # complete unless a buffer has evicted rows newer than its cut-off
+        complete = len(rows) == limit and (not rows or all(ts <= rows[-1]["timestamp"] for ts in oldest.values()))
         with self._lock:
-            self._results.setdefault(stream_id, []).append(result)
-            if len(self._results[stream_id]) > 5000:
-                self._results[stream_id] = self._results[stream_id][-2000:]
+            if complete:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return rows, complete
 
-    def get_results(self, stream_id: str) -> List[dict]:
+    def drop_stream(self, stream_id: str) -> None:
+        """Forget a stream's buffers once it stops running on this node"""
         with self._lock:
-            return list(self._results.get(stream_id, []))
+            self._results.pop(stream_id, None)
+            self._evicted.pop(stream_id, None)
+
+    def get_results(self, stream_id: str, limit: Optional[int] = None) -> List[dict]:
+        with self._lock:
+            rows = [r for ring in self._results.get(stream_id, {}).values() for r in ring]
+        rows.sort(key=lambda r: r["timestamp"], reverse=True)
+        return rows if limit is None else rows[:limit]
 
     def add_alert(self, alert: dict) -> None:
         with self._lock:
             self._alerts.append(alert)
-            if len(self._alerts) > 2000:
-                self._alerts = self._alerts[-1000:]
 
     def get_alerts(self) -> List[dict]:
         with self._lock:
             return list(self._alerts)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "streams": len(self._results),
+                "buffered_results": sum(len(ring) for buffers in self._results.values() for ring in buffers.values()),
+                "per_model_capacity": self.per_model_capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -1,98 +1,155 @@
 import time
 import threading
-from typing import Dict, Optional, List
-import cv2
-import numpy as np
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, List, Tuple, Union
+from .capture import FrameQueue, SourceReader, PolledSource, DROP_OLDEST, is_live_source
+from .source_registry import SourceRegistry
+from .event_bus import EventBus
+from .pacer import FramePacer
+from .motion_gate import MotionGate
 from .model_manager import ModelManager
-from .db_storage import DatabaseStorage
+from .db_storage import DatabaseStorage, WRITE_BEHIND_CONFIG
 from .logger import vms_logger
+from .profiling import StageWindows
+from .governor import FpsGovernor, GOVERNOR_CONFIG
+from .stream_pool import StreamPool, STREAM_POOL_CONFIG
+from .metrics import metrics, Sample, FRAME_LATENCY_SECONDS, FRAME_PROCESSING_SECONDS, ALERTS_TOTAL
 
-class StreamWorker(threading.Thread):
-    def __init__(self, stream_id: str, source: str, models: List[str], model_mgr: ModelManager, storage: DatabaseStorage, fps: float = 5.0) -> None:
-        super().__init__(daemon=True)
+class StreamPipeline:
+    """Per-frame processing of one stream, shared by StreamWorker and PooledStream"""
+
+    def __init__(self, stream_id: str, source: str, models: List[str], model_mgr: ModelManager, storage: DatabaseStorage, fps: float = 5.0,
+                 queue_size: int = 2, drop_policy: str = DROP_OLDEST,
+                 motion_threshold: Optional[float] = None, motion_refresh_interval: float = 5.0,
+                 sources: Optional[SourceRegistry] = None, events: Optional[EventBus] = None,
+                 min_fps: Optional[float] = None, priority: int = 0) -> None:
         self.stream_id = stream_id
         self.source = source
         self.models = models
         self.model_mgr = model_mgr
         self.storage = storage
         self.fps = fps
+        # The governor moves fps between min_fps and the requested rate; higher priority slows down last
+        self.max_fps = fps
+        self.min_fps = min(min_fps, fps) if min_fps is not None else min(1.0, fps)
+        self.priority = priority
+        self.frames = FrameQueue(queue_size, drop_policy)
+        self.sources = sources or SourceRegistry()
+        self.reader: Optional[Union[SourceReader, PolledSource]] = None
+        self.events = events
+        self.pacer = FramePacer(fps)
+        # Skips inference on near-static scenes and reuses the last results
+        self.motion_gate: Optional[MotionGate] = None
+        if motion_threshold is not None:
+            self.motion_gate = MotionGate(motion_threshold, motion_refresh_interval)
+        self._last_results: Dict[str, dict] = {}
+        self.inferences_saved = 0
+        # Per model: (inferences, summed processing_time) on this stream
+        self.model_times: Dict[str, Tuple[int, float]] = {}
+        self.frames_processed = 0
+        # Frames whose processing raised (e.g. a batched inference timeout); the stream goes on
+        self.frame_errors = 0
+        self.capture_lag = 0.0
+        self._lag_total = 0.0
+        # Rolling per-stage timings of the processing loop
+        self.stages = StageWindows()
         self._stop_event = threading.Event()
 
     def stop(self) -> None:
         self._stop_event.set()
+        self.frames.close()
 
-    def run(self) -> None:
-        # Handle different source types
-        if self.source.isdigit():
-            # Webcam source (0, 1, 2, etc.)
-            source_int = int(self.source)
-            cap = cv2.VideoCapture(source_int)
-            # Set webcam properties for better compatibility on macOS
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            cap.set(cv2.CAP_PROP_FPS, 30)
-        else:
-            # File or RTSP source
-            cap = cv2.VideoCapture(self.source)
+    def set_fps(self, fps: float) -> None:
+        self.fps = fps
+        self.pacer.set_fps(fps)
+        # Files skip frames by the sample rate, so it has to follow the pacer
+        reader = self.reader
+        if reader is not None:
+            reader.set_sample_rate(self.stream_id, fps)
+
+    @property
+    def frames_captured(self) -> int:
+        return self.frames.frames_offered
+
+    def stats(self) -> dict:
+        """Capture/processing pipeline counters for the stream status"""
+        reader = self.reader
+        return {
+            "frames_captured": self.frames_captured,
+            "frames_processed": self.frames_processed,
+            "frame_errors": self.frame_errors,
+            "frames_dropped": self.frames.frames_dropped,
+            "frames_skipped": reader.frames_skipped if reader else 0,
+            "source_subscribers": len(reader.subscriber_ids()) if reader else 0,
+            "queue_depth": self.frames.qsize(),
+            "drop_policy": self.frames.policy,
+            "effective_fps": round(self.fps, 2),
+            "min_fps": self.min_fps,
+            "max_fps": self.max_fps,
+            "priority": self.priority,
+            "capture_lag": round(self.capture_lag, 4),
+            "avg_capture_lag": round(self._lag_total / self.frames_processed, 4) if self.frames_processed else 0.0,
+            **self.pacer.stats(),
+            **(self.motion_gate.stats() if self.motion_gate else {}),
+            "inferences_saved": self.inferences_saved,
+            "stages": {**(reader.stages.stats() if reader else {}), **self.stages.stats()},
+        }
+
+    def _handle_frame(self, frame, captured_at: float) -> None:
+        # Process frame and measure time
+        frame_start = time.time()
+        self.pacer.frame_started()
+        self.capture_lag = frame_start - captured_at
+        self._lag_total += self.capture_lag
+        self._process_frame(frame)
+        frame_end = time.time()
+        frame_time = frame_end - frame_start
+        self.frames_processed += 1
+        self.stages.record("frame", frame_time)
+        FRAME_PROCESSING_SECONDS.observe(frame_time, self.stream_id)
+        FRAME_LATENCY_SECONDS.observe(frame_end - captured_at, self.stream_id)
         
-        if not cap.isOpened():
-            vms_logger.log_stream_error(self.stream_id, f"Failed to open video source: {self.source}", self.source)
-            # Fallback to synthetic frames for demo
-            vms_logger.log_stream_start(self.stream_id, "synthetic_fallback", self.models)
-            while not self._stop_event.is_set():
-                frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-                self._process_frame(frame)
-                time.sleep(1.0 / self.fps)
-            return
-
-        vms_logger.log_stream_success(self.stream_id, self.source)
-        try:
-            frame_count = 0
-            start_time = time.time()
-            while not self._stop_event.is_set():
-                ret, frame = cap.read()
-                if not ret:
-                    if self.source.isdigit():
-                        # For webcam, continue trying
-                        vms_logger.log_stream_error(self.stream_id, f"Failed to read from webcam, retrying...", self.source)
-                        time.sleep(0.1)
-                        continue
-                    else:
-                        # For video files, loop back to start
-                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                        continue
-                
-                frame_count += 1
-                
-                # Process frame and measure time
-                frame_start = time.time()
-                self._process_frame(frame)
-                frame_time = time.time() - frame_start
-                
-                # Log frame processing metrics every 30 frames
-                if frame_count % 30 == 0:
-                    vms_logger.log_frame_processing(self.stream_id, frame_count, self.models, frame_time)
-                    
-                    # Log concurrent processing status
-                    active_threads = threading.active_count()
-                    vms_logger.log_concurrent_processing(self.stream_id, active_threads)
-                
-                time.sleep(1.0 / self.fps)
-        except Exception as e:
-            vms_logger.log_stream_error(self.stream_id, f"Runtime error: {str(e)}", self.source)
-        finally:
-            cap.release()
-            runtime = time.time() - start_time
-            vms_logger.log_stream_stop(self.stream_id, f"completed_after_{runtime:.1f}s")
+        # Log frame processing metrics every 30 frames
+        if self.frames_processed % 30 == 0:
+            vms_logger.log_frame_processing(self.stream_id, self.frames_processed, self.models, frame_time)
+            
+            # Log concurrent processing status
+            active_threads = threading.active_count()
+            vms_logger.log_concurrent_processing(self.stream_id, active_threads, self.frames.qsize())
+
+    def _frame_failed(self, error: Exception) -> None:
+        # The frame is skipped; only a stop ends the stream
+        self.frame_errors += 1
+        vms_logger.log_stream_error(self.stream_id, f"Frame processing error: {str(error)}", self.source)
 
     def _process_frame(self, frame):
         ts = time.time()
-        results = self.model_mgr.run_models(frame, self.models)
+        clock = time.perf_counter
+        start = clock()
+        reused = (self.motion_gate is not None and bool(self._last_results)
+                  and not self.motion_gate.should_infer(frame, ts))
+        if self.motion_gate is not None:
+            self.stages.record("motion_gate", clock() - start)
+        if reused:
+            results = {name: {**summary, "reused": True} for name, summary in self._last_results.items()}
+            self.inferences_saved += len(results)
+        else:
+            start = clock()
+            results = self.model_mgr.run_models(frame, self.models)
+            self.stages.record("inference", clock() - start)
+            self._last_results = results
         
+        # Per-model work is summed into one sample per stage per frame
+        logging_time = storage_time = publish_time = alerts_time = 0.0
         for model_name, summary in results.items():
             # Log model inference
+            start = clock()
             processing_time = summary.get('processing_time', 0)
             vms_logger.log_model_inference(self.stream_id, model_name, processing_time, summary)
+            if not reused:
+                count, total = self.model_times.get(model_name, (0, 0.0))
+                self.model_times[model_name] = (count + 1, total + processing_time)
+            logging_time += clock() - start
             
             result_data = {
                 "stream_id": self.stream_id,
@@ -100,11 +157,32 @@ class StreamWorker(threading.Thread):
                 "timestamp": ts,
                 "summary": summary,
             }
+            start = clock()
             self.storage.add_result(self.stream_id, result_data)
+            storage_time += clock() - start
+            if self.events is not None:
+                start = clock()
+                self.events.publish({"type": "result", **result_data})
+                publish_time += clock() - start
             
-            # Generate alerts based on results
-            self._check_for_alerts(model_name, summary, ts)
+            # Generate alerts based on results; a reused result was already checked
+            if not reused:
+                start = clock()
+                self._check_for_alerts(model_name, summary, ts)
+                alerts_time += clock() - start
+        self.stages.record("logging", logging_time)
+        self.stages.record("storage", storage_time)
+        if self.events is not None:
+            self.stages.record("publish", publish_time)
+        if not reused:
+            self.stages.record("alerts", alerts_time)
     
+    def _emit_alert(self, model_name: str, alert: dict) -> None:
+        ALERTS_TOTAL.inc(self.stream_id, alert["type"], alert["severity"])
+        self.storage.add_alert(alert)
+        if self.events is not None:
+            self.events.publish({"type": "alert", "model": model_name, "timestamp": time.time(), **alert})
+
     def _check_for_alerts(self, model_name: str, summary: dict, timestamp: float):
         """Check model results and generate alerts if needed"""
         try:
@@ -117,7 +195,7 @@ class StreamWorker(threading.Thread):
                         "message": f"High defect score detected: {defect_score}",
                         "severity": "high"
                     }
-                    self.storage.add_alert(alert)
+                    self._emit_alert(model_name, alert)
                     vms_logger.log_alert_generated(self.stream_id, "high_defect", "high", f"Defect score: {defect_score}")
             
             elif model_name == "asset_detection":
@@ -129,7 +207,7 @@ class StreamWorker(threading.Thread):
                         "message": f"High number of objects detected: {objects}",
                         "severity": "medium"
                     }
-                    self.storage.add_alert(alert)
+                    self._emit_alert(model_name, alert)
                     vms_logger.log_alert_generated(self.stream_id, "high_object_count", "medium", f"Object count: {objects}")
             
             elif model_name == "road_condition":
@@ -141,7 +219,7 @@ class StreamWorker(threading.Thread):
                         "message": f"Poor road condition detected: {condition}",
                         "severity": "high" if condition == "critical" else "medium"
                     }
-                    self.storage.add_alert(alert)
+                    self._emit_alert(model_name, alert)
                     vms_logger.log_alert_generated(self.stream_id, "poor_road_condition", alert["severity"], f"Condition: {condition}")
             
             elif model_name == "traffic_analysis":
@@ -153,41 +231,297 @@ class StreamWorker(threading.Thread):
                         "message": f"High traffic congestion detected: {congestion:.2f}",
                         "severity": "medium"
                     }
-                    self.storage.add_alert(alert)
+                    self._emit_alert(model_name, alert)
                     vms_logger.log_alert_generated(self.stream_id, "high_traffic_congestion", "medium", f"Congestion level: {congestion:.2f}")
                     
         except Exception as e:
             vms_logger.log_stream_error(self.stream_id, f"Alert generation error: {str(e)}")
 
+class StreamWorker(StreamPipeline, threading.Thread):
+    """Runs one stream on its own thread"""
+
+    def __init__(self, stream_id: str, *args, **kwargs) -> None:
+        threading.Thread.__init__(self, name=f"stream-{stream_id}", daemon=True)
+        StreamPipeline.__init__(self, stream_id, *args, **kwargs)
+
+    def run(self) -> None:
+        # Capture runs in a (possibly shared) reader thread; this loop is the
+        # processing stage, released by the pacer at the target frame rate
+        self.reader = self.sources.acquire(self.stream_id, self.source, self.frames, self.models, sample_fps=self.fps)
+        start_time = time.time()
+        try:
+            while self.pacer.wait(self._stop_event):
+                item = self.frames.get(timeout=0.5)
+                if item is None:
+                    continue
+                try:
+                    self._handle_frame(*item)
+                except Exception as e:
+                    self._frame_failed(e)
+        except Exception as e:
+            vms_logger.log_stream_error(self.stream_id, f"Runtime error: {str(e)}", self.source)
+        finally:
+            self.sources.release(self.stream_id, self.reader)
+            runtime = time.time() - start_time
+            vms_logger.log_stream_stop(self.stream_id, f"completed_after_{runtime:.1f}s")
+
+class PooledStream(StreamPipeline):
+    """Runs one stream as a task of the shared StreamPool instead of its own thread.
+
+    Each time the pacer's deadline comes round a pool worker reads the next
+    frame, processes it and reschedules the stream. Files and synthetic
+    sources are decoded inline, only when due. Live sources keep their shared
+    capture thread and the stream takes the newest frame from its queue.
+    stop() only marks the stream; its heap entry is dropped when it comes due.
+    """
+
+    # How soon to look again when a live source has no frame yet
+    RETRY_DELAY = 0.02
+
+    def __init__(self, stream_id: str, *args, pool: StreamPool, **kwargs) -> None:
+        super().__init__(stream_id, *args, **kwargs)
+        self.pool = pool
+        self.started_at: Optional[float] = None
+        # Guards the hand-over between stop() and a pool worker inside run_once()
+        self._state_lock = threading.Lock()
+        self._in_step = False
+        self._finished = False
+        self._done = threading.Event()
+
+    @property
+    def frames_captured(self) -> int:
+        # Polled sources hand frames straight to processing, bypassing the frame queue
+        if isinstance(self.reader, PolledSource):
+            return self.reader.frames_captured
+        return self.frames.frames_offered
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self.pool.schedule(self, time.monotonic())
+
+    def is_alive(self) -> bool:
+        return self.started_at is not None and not self._done.is_set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._done.wait(timeout)
+
+    def stop(self) -> None:
+        with self._state_lock:
+            super().stop()
+            if self._in_step:
+                # The worker running it finishes the stream when the step ends
+                return
+        self._finish()
+
+    def run_once(self) -> Optional[float]:
+        """One frame if one is available; returns the next deadline, or None once stopped.
+
+        Errors skip the frame rather than ending the stream: only stop() finishes it.
+        """
+        with self._state_lock:
+            if self._stop_event.is_set():
+                return None
+            self._in_step = True
+        next_at: Optional[float] = None
+        try:
+            next_at = self._step()
+        except Exception as e:
+            # Keep the stream scheduled; a deadline still in the past is pushed
+            # out a little so a persistent error cannot spin a pool worker
+            vms_logger.log_stream_error(self.stream_id, f"Runtime error: {str(e)}", self.source)
+            next_at = max(self.pacer.next_deadline, time.monotonic() + self.RETRY_DELAY)
+        with self._state_lock:
+            self._in_step = False
+            if self._stop_event.is_set():
+                next_at = None
+        if next_at is None:
+            self._finish()
+        return next_at
+
+    def _step(self) -> float:
+        if self.reader is None:
+            if is_live_source(self.source):
+                self.reader = self.sources.acquire(self.stream_id, self.source, self.frames, self.models, sample_fps=self.fps)
+            else:
+                self.reader = PolledSource(self.stream_id, self.source, self.models, sample_fps=self.fps)
+        if isinstance(self.reader, PolledSource):
+            item = self.reader.read()
+        else:
+            item = self.frames.get(timeout=0)
+        if item is None:
+            return time.monotonic() + min(self.pacer.period, self.RETRY_DELAY)
+        self.pacer.advance()
+        try:
+            self._handle_frame(*item)
+        except Exception as e:
+            self._frame_failed(e)
+        return self.pacer.next_deadline
+
+    def _finish(self) -> None:
+        with self._state_lock:
+            if self._finished:
+                return
+            self._finished = True
+        if isinstance(self.reader, PolledSource):
+            self.reader.close()
+        elif self.reader is not None:
+            self.sources.release(self.stream_id, self.reader)
+        runtime = time.time() - (self.started_at or time.time())
+        vms_logger.log_stream_stop(self.stream_id, f"completed_after_{runtime:.1f}s")
+        self._done.set()
+
 class StreamManager:
     def __init__(self, model_mgr: ModelManager, storage: DatabaseStorage) -> None:
         self.model_mgr = model_mgr
         self.storage = storage
-        self.workers: Dict[str, StreamWorker] = {}
+        self.sources = SourceRegistry()
+        self.events = EventBus()
+        self.workers: Dict[str, StreamPipeline] = {}
+        # Streams waiting for capacity, started in order by the governor
+        self.pending: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.governor: Optional[FpsGovernor] = None
+        self._stop_event = threading.Event()
+        self._governor_thread: Optional[threading.Thread] = None
+        if GOVERNOR_CONFIG["enabled"]:
+            self.governor = FpsGovernor(
+                GOVERNOR_CONFIG["cpu_high"], GOVERNOR_CONFIG["cpu_low"],
+                GOVERNOR_CONFIG["decrease"], GOVERNOR_CONFIG["increase"],
+                max_streams=GOVERNOR_CONFIG["max_streams"],
+                # Counts the process-mode inference workers too
+                cpu_clock=model_mgr.cpu_time,
+            )
+            self._governor_thread = threading.Thread(target=self._govern, name="fps-governor", daemon=True)
+            self._governor_thread.start()
+        # With VMS_STREAM_EXECUTION=pool, streams share a fixed set of threads
+        self.pool: Optional[StreamPool] = None
+        if STREAM_POOL_CONFIG["execution"] == "pool":
+            self.pool = StreamPool(STREAM_POOL_CONFIG["workers"])
+            self.pool.start()
+        metrics.add_collector(self.collect_metrics)
 
-    def start_stream(self, stream_id: str, source: str, models: List[str]) -> bool:
-        if stream_id in self.workers:
-            return False
-        worker = StreamWorker(stream_id, source, models, self.model_mgr, self.storage)
-        self.workers[stream_id] = worker
-        worker.start()
-        return True
+    def start_stream(self, stream_id: str, source: str, models: List[str],
+                     queue_size: int = 2, drop_policy: str = DROP_OLDEST,
+                     motion_threshold: Optional[float] = None, motion_refresh_interval: float = 5.0,
+                     fps: float = 5.0, min_fps: Optional[float] = None, priority: int = 0) -> bool:
+        with self._lock:
+            if stream_id in self.workers or stream_id in self.pending:
+                return False
+            options = dict(fps=fps, queue_size=queue_size, drop_policy=drop_policy,
+                           motion_threshold=motion_threshold, motion_refresh_interval=motion_refresh_interval,
+                           sources=self.sources, events=self.events, min_fps=min_fps, priority=priority)
+            if self.pool is not None:
+                worker = PooledStream(stream_id, source, models, self.model_mgr, self.storage, pool=self.pool, **options)
+            else:
+                worker = StreamWorker(stream_id, source, models, self.model_mgr, self.storage, **options)
+            self.workers[stream_id] = worker
+            worker.start()
+            return True
 
-    def stop_stream(self, stream_id: str) -> bool:
-        worker = self.workers.get(stream_id)
-        if not worker:
+    def at_capacity(self) -> bool:
+        """Whether a new stream should wait: the governor has no rate left to take, or the stream cap is hit"""
+        if self.governor is None:
             return False
-        worker.stop()
-        worker.join(timeout=2.0)
-        self.workers.pop(stream_id, None)
+        return bool(self.pending) or self.governor.at_capacity(len(self.workers))
+
+    def queue_stream(self, stream_id: str, source: str, models: List[str], **options) -> bool:
+        """Hold a stream until the governor sees headroom; False if it is already running or queued"""
+        with self._lock:
+            if stream_id in self.workers or stream_id in self.pending:
+                return False
+            self.pending[stream_id] = {"source": source, "models": models, **options}
+            return True
+
+    def _govern(self) -> None:
+        while not self._stop_event.wait(GOVERNOR_CONFIG["interval"]):
+            try:
+                workers = [w for w in list(self.workers.values()) if w.is_alive()]
+                self.governor.adjust(workers)
+                # One queued stream per tick, so the next tick sees its load
+                with self._lock:
+                    if self.pending and self.governor.has_headroom(len(self.workers)):
+                        stream_id, options = self.pending.popitem(last=False)
+                        self.start_stream(stream_id, **options)
+                        vms_logger.log_stream_start(stream_id, options["source"], options["models"])
+            except Exception as e:
+                vms_logger.main_logger.error(f"❌ FPS governor error: {str(e)}")
+
+    def stop_stream(self, stream_id: str, flush_timeout: Optional[float] = None) -> bool:
+        """Stop a running or queued stream; False if there is no such stream.
+
+        Waits up to flush_timeout (VMS_WRITE_BEHIND_STOP_FLUSH_TIMEOUT by default)
+        for the stream's buffered results and logs an error if they are not all
+        written by then.
+        """
+        with self._lock:
+            if self.pending.pop(stream_id, None) is not None:
+                return True
+            worker = self.workers.get(stream_id)
+            if not worker:
+                return False
+            worker.stop()
+            worker.join(timeout=2.0)
+            self.workers.pop(stream_id, None)
+        # Make the stream's last results durable before reporting it stopped
+        if flush_timeout is None:
+            flush_timeout = WRITE_BEHIND_CONFIG["stop_flush_timeout"]
+        if not self.storage.flush_results(flush_timeout):
+            vms_logger.log_stream_error(stream_id, "Stopped before all of its results were written; "
+                                        "they are still queued for retry or were dropped")
+        # The buffers now only describe a past run; reads go to the database
+        # until the stream runs here again
+        if self.storage.recent is not None:
+            self.storage.recent.drop_stream(stream_id)
         return True
 
+    def stop_all(self) -> None:
+        self._stop_event.set()
+        if self._governor_thread is not None:
+            self._governor_thread.join(timeout=5.0)
+        with self._lock:
+            self.pending.clear()
+        for stream_id in list(self.workers.keys()):
+            self.stop_stream(stream_id)
+        if self.pool is not None:
+            self.pool.stop()
+        metrics.remove_collector(self.collect_metrics)
+
+    def collect_metrics(self) -> Iterator[Sample]:
+        """Per-stream gauges and counters, read when /metrics is scraped"""
+        workers = list(self.workers.items())
+        yield "vms_active_streams", {}, sum(1 for _, w in workers if w.is_alive())
+        for stream_id, w in workers:
+            labels = {"stream_id": stream_id}
+            yield "vms_stream_up", labels, 1 if w.is_alive() else 0
+            yield "vms_capture_fps", labels, w.pacer.achieved_fps()
+            yield "vms_stream_target_fps", labels, w.fps
+            yield "vms_frames_captured_total", labels, w.frames_captured
+            yield "vms_frames_processed_total", labels, w.frames_processed
+            yield "vms_frame_errors_total", labels, w.frame_errors
+            yield "vms_frames_dropped_total", labels, w.frames.frames_dropped
+            yield "vms_frame_queue_depth", labels, w.frames.qsize()
+
+        yield "vms_streams_queued", {}, len(self.pending)
+        if self.pool is not None:
+            yield "vms_stream_pool_scheduled", {}, self.pool.scheduled()
+
     def status(self) -> List[dict]:
-        return [
+        running = [
             {
                 "stream_id": wid,
                 "source": w.source,
-                "running": True,
+                "running": w.is_alive(),
                 "models": w.models,
-            } for wid, w in self.workers.items()
+                **w.stats(),
+            } for wid, w in list(self.workers.items())
+        ]
+        queued = [
+            {
+                "stream_id": sid,
+                "source": options["source"],
+                "running": False,
+                "queued": True,
+                "models": options["models"],
+            } for sid, options in list(self.pending.items())
         ]
+        return running + queued
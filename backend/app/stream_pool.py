@@ -0,0 +1,114 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import List, Any, Optional, Tuple
+from .logger import vms_logger
+from .metrics import STREAM_POOL_LAG_SECONDS
+
+# How streams are executed: "threads" gives each stream its own thread,
+# "pool" multiplexes every stream over a fixed set of worker threads
+STREAM_POOL_CONFIG = {
+    "execution": os.getenv("VMS_STREAM_EXECUTION", "threads"),
+    # 0 = two per core, at least 4, since workers also block on inference and storage
+    "workers": int(os.getenv("VMS_STREAM_POOL_WORKERS", "0")) or max(4, 2 * (os.cpu_count() or 1)),
+}
+
+class StreamPool:
+    """Runs scheduled tasks on a fixed set of threads in deadline order.
+
+    Tasks sit in a heap keyed by the time.monotonic() at which they are next
+    due. A free worker takes the earliest entry, sleeps until it is due, and
+    calls its run_once(), which returns the task's next deadline or None when
+    it is finished. A task is in the heap at most once, so it never runs on
+    two workers at the same time. There is no removal: a stopped task's entry
+    stays in the heap and is discarded by run_once() when it comes due, so
+    stopping costs nothing however many tasks are scheduled. When tasks fall
+    behind they simply start late, which their pacers count as over-runs.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._heap: List[Tuple[float, int, Any]] = []
+        # Tie-breaker so tasks with equal deadlines are never compared
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._threads: List[threading.Thread] = []
+        self.runs = 0
+        self.lag_total = 0.0
+        self.max_lag = 0.0
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"stream-pool-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        self._threads.clear()
+
+    def schedule(self, task: Any, at: float) -> None:
+        with self._cond:
+            if self._stopped:
+                return
+            heapq.heappush(self._heap, (at, next(self._seq), task))
+            # Only a new earliest deadline changes what an idle worker waits for
+            if self._heap[0][2] is task:
+                self._cond.notify()
+
+    def _next_due(self) -> Optional[Any]:
+        with self._cond:
+            while not self._stopped:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                at = self._heap[0][0]
+                delay = at - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                _, _, task = heapq.heappop(self._heap)
+                self.runs += 1
+                self.lag_total -= delay
+                self.max_lag = max(self.max_lag, -delay)
+                STREAM_POOL_LAG_SECONDS.observe(-delay)
+                if self._heap and self._heap[0][0] <= time.monotonic():
+                    # More work is due: hand it to another idle worker
+                    self._cond.notify()
+                return task
+            return None
+
+    def _run(self) -> None:
+        while True:
+            task = self._next_due()
+            if task is None:
+                return
+            try:
+                next_at = task.run_once()
+            except Exception as e:
+                vms_logger.main_logger.error(f"❌ Stream pool task error: {str(e)}")
+                continue
+            if next_at is not None:
+                self.schedule(task, next_at)
+
+    def scheduled(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def stats(self) -> dict:
+        scheduled = self.scheduled()
+        return {
+            "workers": self.workers,
+            "scheduled": scheduled,
+            "runs": self.runs,
+            "avg_lag_ms": round(self.lag_total / self.runs * 1000, 3) if self.runs else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+        }
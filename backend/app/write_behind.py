@@ -0,0 +1,200 @@
+import time
+import queue
+import threading
+from typing import Callable, Dict, Iterator, List, Any, Optional
+from .logger import vms_logger
+from .metrics import metrics, Sample, DB_WRITE_SECONDS, DB_ROWS_WRITTEN, DB_WRITE_ERRORS, RESULT_PERSIST_SECONDS
+
+class WriteBehindBuffer:
+    """Bounded in-process queue flushed to the database in bulk by a background thread.
+
+    A batch that fails to insert is held at the head of the queue and retried
+    with exponential backoff (retry_backoff, doubling up to max_backoff), so a
+    brief database outage delays rows instead of losing them. It is dropped,
+    and logged, only after max_retries failed retries.
+    """
+
+    def __init__(self, write_fn: Callable[[List[dict]], None], table: str,
+                 max_queue: int = 10000, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_retries: int = 5, retry_backoff: float = 0.5, max_backoff: float = 30.0) -> None:
+        self.write_fn = write_fn
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        # A failed batch waiting for its next attempt; always written before the queue
+        self._retry_batch: Optional[List[dict]] = None
+        self._retry_attempts = 0
+        self._retry_at = 0.0
+        # Held for the whole drain+write so that when flush() reports success,
+        # every row enqueued before the call is in the database
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._retries = 0
+        self._flushes = 0
+        self._flush_time_total = 0.0
+        self._flush_time_max = 0.0
+        self._last_flush_latency = 0.0
+        self._thread = threading.Thread(target=self._run, name=f"write-behind-{table}", daemon=True)
+        self._thread.start()
+        metrics.add_collector(self.collect_metrics)
+
+    def put(self, row: dict) -> bool:
+        """Queue a row for insertion; returns False if the buffer is full and the row was dropped"""
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += 1
+            return False
+        with self._stats_lock:
+            self._enqueued += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self, timeout: float = 0.0) -> bool:
+        """Write every queued row now; returns True once all of them are in the database.
+
+        A failed batch that is backing off is waited for if its retry falls
+        within timeout seconds; otherwise flush() returns False and leaves it
+        to the flusher thread. Rows dropped after max_retries also return False.
+        """
+        deadline = time.monotonic() + timeout
+        complete = True
+        with self._flush_lock:
+            while True:
+                if self._retry_batch is not None:
+                    wait = self._retry_at - time.monotonic()
+                    if wait > 0:
+                        if self._retry_at > deadline:
+                            return False
+                        time.sleep(wait)
+                    batch, self._retry_batch = self._retry_batch, None
+                else:
+                    batch = self._drain(self.batch_size)
+                    if not batch:
+                        return complete
+                    self._retry_attempts = 0
+                if self._write_batch(batch) is None and not self._hold_for_retry(batch):
+                    complete = False
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the flusher thread and write whatever is still queued.
+
+        Backoffs still apply; a batch that cannot be written within timeout is dropped.
+        """
+        deadline = time.monotonic() + timeout
+        self._stop_event.set()
+        self._wakeup.set()
+        self._thread.join(timeout=timeout)
+        self.flush(max(0.0, deadline - time.monotonic()))
+        with self._flush_lock:
+            if self._retry_batch is not None:
+                self._drop(self._retry_batch, "shutdown")
+                self._retry_batch = None
+        metrics.remove_collector(self.collect_metrics)
+
+    def collect_metrics(self) -> Iterator[Sample]:
+        labels = {"table": self.table}
+        yield "vms_write_queue_depth", labels, self._queue.qsize()
+        yield "vms_write_queue_dropped_total", labels, self._dropped
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "table": self.table,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "enqueued_rows": self._enqueued,
+                "written_rows": self._written,
+                "dropped_rows": self._dropped,
+                "failed_rows": self._failed,
+                "retries": self._retries,
+                "retry_pending_rows": len(self._retry_batch or []),
+                "flushes": self._flushes,
+                "last_flush_latency": round(self._last_flush_latency, 4),
+                "avg_flush_latency": round(self._flush_time_total / self._flushes, 4) if self._flushes else 0.0,
+                "max_flush_latency": round(self._flush_time_max, 4),
+            }
+
+    def _drain(self, max_items: int) -> List[dict]:
+        batch: List[dict] = []
+        while len(batch) < max_items:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _hold_for_retry(self, batch: List[dict]) -> bool:
+        """Keep a failed batch at the head of the queue; False once it was dropped instead"""
+        if self._retry_attempts >= self.max_retries:
+            self._drop(batch, f"{self._retry_attempts} retries failed")
+            self._retry_attempts = 0
+            return False
+        self._retry_attempts += 1
+        self._retry_batch = batch
+        self._retry_at = time.monotonic() + min(self.max_backoff, self.retry_backoff * 2 ** (self._retry_attempts - 1))
+        with self._stats_lock:
+            self._retries += 1
+        # Let the flusher thread re-time its wait for the retry
+        self._wakeup.set()
+        return True
+
+    def _drop(self, batch: List[dict], reason: str) -> None:
+        with self._stats_lock:
+            self._failed += len(batch)
+        DB_WRITE_ERRORS.inc(self.table, amount=len(batch))
+        streams = sorted({str(row.get("stream_id")) for row in batch})
+        timestamps = [row["timestamp"] for row in batch if "timestamp" in row]
+        span = f", timestamps {min(timestamps):.3f}-{max(timestamps):.3f}" if timestamps else ""
+        vms_logger.log_database_error(
+            "bulk_insert",
+            f"dropped {len(batch)} rows after {reason}: streams {', '.join(streams)}{span}",
+            self.table,
+        )
+
+    def _write_batch(self, batch: List[dict]) -> Optional[int]:
+        """Insert one batch; returns the rows written, or None if the insert failed"""
+        start_time = time.time()
+        try:
+            self.write_fn(batch)
+        except Exception as e:
+            vms_logger.log_database_error("bulk_insert", str(e), self.table)
+            return None
+        committed = time.time()
+        latency = committed - start_time
+        DB_WRITE_SECONDS.observe(latency, self.table)
+        DB_ROWS_WRITTEN.inc(self.table, amount=len(batch))
+        for row in batch:
+            if "timestamp" in row:
+                RESULT_PERSIST_SECONDS.observe(committed - row["timestamp"], self.table)
+        with self._stats_lock:
+            self._written += len(batch)
+            self._flushes += 1
+            self._last_flush_latency = latency
+            self._flush_time_total += latency
+            self._flush_time_max = max(self._flush_time_max, latency)
+        vms_logger.log_database_operation("bulk_insert", self.table, len(batch), latency)
+        return len(batch)
+
+    def _run(self) -> None:
+        # Flush when the size threshold wakes us up or the time threshold expires
+        while not self._stop_event.is_set():
+            # Wake up in time for a pending retry
+            wait = self.flush_interval
+            if self._retry_batch is not None:
+                wait = min(wait, max(0.0, self._retry_at - time.monotonic()))
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+            self.flush()
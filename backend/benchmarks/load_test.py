@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+API load test for VMS
+Drives concurrent dashboard-style polling of the read endpoints while probing
+/health, and reports throughput and latency percentiles.
+
+Usage:
+  python benchmarks/load_test.py --url http://localhost:8000 [--concurrency 200 --duration 20]
+  python benchmarks/load_test.py --compare [--db-latency 0.02]
+
+--compare runs the same load against the threadpool and the async read path on
+a seeded local SQLite database. --db-latency adds a delay to every statement to
+stand in for the network round trip to a remote MySQL server.
+"""
+
+import sys
+import os
+import time
+import json
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Any
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+STREAMS = [f"load_{i}" for i in range(20)]
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+        "max_ms": round(max(values, default=0.0) * 1000, 1),
+    }
+
+def poll_paths() -> List[str]:
+    stream = random.choice(STREAMS)
+    return [
+        f"/results/{stream}?limit=50",
+        f"/results?stream_ids={','.join(random.sample(STREAMS, 5))}&limit=10",
+        "/alerts",
+        "/alerts/all",
+        "/streams",
+    ]
+
+async def run_load(url: str, concurrency: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    health: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency + 10, max_keepalive_connections=concurrency + 10)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+
+        async def poller() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                for path in poll_paths():
+                    start = time.perf_counter()
+                    try:
+                        response = await client.get(path)
+                        response.raise_for_status()
+                        latencies.append(time.perf_counter() - start)
+                    except httpx.HTTPError:
+                        errors += 1
+
+        async def health_probe() -> None:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    (await client.get("/health")).raise_for_status()
+                    health.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.1)
+
+        started = time.perf_counter()
+        await asyncio.gather(health_probe(), *(poller() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "latency": latency_summary(latencies),
+        "health_latency": latency_summary(health),
+    }
+
+def seed_database(results_per_stream: int = 2000, alerts: int = 500) -> None:
+    """Fill the configured database with synthetic results and alerts"""
+    from app.database import create_tables, get_write_session, StreamResult, Alert
+    from app.db_storage import DatabaseStorage
+    from sqlalchemy import insert
+    create_tables()
+    storage = DatabaseStorage(write_behind=False)
+    now = time.time()
+    for stream_id in STREAMS:
+        rows = [storage._result_row(stream_id, {
+            "model": "traffic_analysis",
+            "timestamp": now - i,
+            "summary": {"vehicle_count": i % 25, "density": "low", "flow_rate": 0.5,
+                        "congestion_level": 0.25, "average_speed": 40.0, "processing_time": 0.1},
+        }) for i in range(results_per_stream)]
+        with get_write_session() as db:
+            db.execute(insert(StreamResult), rows)
+    with get_write_session() as db:
+        db.execute(insert(Alert), [{"stream_id": random.choice(STREAMS), "alert_type": "high_defect",
+                                    "message": "seeded", "severity": "high"} for _ in range(alerts)])
+    storage.close()
+
+def add_statement_latency(delay: float) -> None:
+    """Sleep on the connection's own thread around every statement, like a remote round trip"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    import aiosqlite.core
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        # Async engines run this hook on the event loop; they are delayed below instead
+        if not conn.dialect.is_async:
+            time.sleep(delay)
+
+    event.listen(Engine, "before_cursor_execute", before_execute)
+    queue_call = aiosqlite.core.Connection._execute
+
+    async def delayed_execute(self, fn, *args, **kwargs):
+        if getattr(fn, "__name__", "") in ("execute", "executemany"):
+            inner = fn
+            def fn(*a, **kw):
+                time.sleep(delay)
+                return inner(*a, **kw)
+        return await queue_call(self, fn, *args, **kwargs)
+
+    aiosqlite.core.Connection._execute = delayed_execute
+
+def serve(port: int, delay: float) -> None:
+    import uvicorn
+    if delay > 0:
+        add_statement_latency(delay)
+    uvicorn.run("app.main:app", port=port, log_level="warning")
+
+def start_server(env: Dict[str, str], port: int, delay: float) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port), "--db-latency", str(delay)],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start")
+
+def compare(concurrency: int, duration: float, port: int, delay: float) -> Dict[str, Any]:
+    """Run the same load against the threadpool and the asyncio read path"""
+    workdir = tempfile.mkdtemp(prefix="vms-load-")
+    env = dict(os.environ)
+    env.update({
+        "VMS_DB_ENGINE": "sqlite",
+        "VMS_SQLITE_PATH": os.path.join(workdir, "load.db"),
+        # Make every read reach the database
+        "VMS_RESULT_CACHE": "0",
+        "VMS_RETENTION": "0",
+        "VMS_COLUMNAR_ARCHIVE": "0",
+    })
+    os.environ.update(env)
+    seed_database()
+    report = {}
+    for mode, flag in (("threadpool", "0"), ("async", "1")):
+        server = start_server(dict(env, VMS_ASYNC_DB=flag), port, delay)
+        try:
+            report[mode] = asyncio.run(run_load(f"http://127.0.0.1:{port}", concurrency, duration))
+        finally:
+            server.terminate()
+            server.wait()
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the VMS read endpoints")
+    parser.add_argument("--url", help="running server to test")
+    parser.add_argument("--compare", action="store_true", help="compare sync and async read paths locally")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db-latency", type=float, default=0.0, help="seconds added to each statement")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        os.chdir(BACKEND_DIR)
+        serve(args.port, args.db_latency)
+        sys.exit(0)
+    if args.compare:
+        result = compare(args.concurrency, args.duration, args.port, args.db_latency)
+    elif args.url:
+        result = asyncio.run(run_load(args.url, args.concurrency, args.duration))
+    else:
+        parser.error("pass --url or --compare")
+    print(json.dumps(result, indent=2))
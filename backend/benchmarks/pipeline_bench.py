@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark for VMS
+Starts the backend on a scratch SQLite database, runs N streams from synthetic
+frames or a generated video file, polls /results concurrently and writes one
+JSON report with:
+
+  - sustained fps per stream
+  - capture-to-processed and processing-to-DB-commit latency percentiles
+  - DB rows/s
+  - /results latency under polling
+  - resident memory per stream and server thread count
+
+Usage:
+  python benchmarks/pipeline_bench.py [--streams 10 --source synthetic|video --duration 30]
+  python benchmarks/pipeline_bench.py --streams 200 --fps 1 --execution pool
+  python benchmarks/pipeline_bench.py --output run.json --baseline previous.json [--tolerance 0.1]
+
+With --baseline the report is compared metric by metric and the exit status is
+1 if any metric regressed by more than the tolerance.
+"""
+
+import sys
+import os
+import time
+import json
+import math
+import random
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from typing import Dict, List, Any, Optional, Tuple
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from load_test import BACKEND_DIR, latency_summary, start_server
+
+MODELS = ["asset_detection", "defect_analysis", "road_condition", "traffic_analysis"]
+
+# (labels, value) samples per metric name
+Metrics = Dict[str, List[Tuple[Dict[str, str], float]]]
+
+# Report paths compared against a baseline, and whether higher is better
+COMPARED = {
+    "pipeline.fps_per_stream.mean": True,
+    "pipeline.frame_latency.p95_ms": False,
+    "pipeline.persist_latency.p95_ms": False,
+    "database.rows_per_sec": True,
+    "api.requests_per_sec": True,
+    "api.latency.p95_ms": False,
+    "memory.per_stream_mb": False,
+}
+
+def parse_metrics(text: str) -> Metrics:
+    """Minimal parser for the Prometheus text format served by /metrics"""
+    parsed: Metrics = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        series, value = line.rsplit(" ", 1)
+        name, _, label_text = series.partition("{")
+        labels = {}
+        for pair in filter(None, label_text.rstrip("}").split('",')):
+            key, _, raw = pair.partition("=")
+            labels[key] = raw.strip('"')
+        parsed.setdefault(name, []).append((labels, float(value)))
+    return parsed
+
+def metric_total(metrics: Metrics, name: str) -> float:
+    return sum(value for _, value in metrics.get(name, []))
+
+def histogram_buckets(before: Metrics, after: Metrics, name: str) -> List[Tuple[float, float]]:
+    """Cumulative bucket counts observed between two scrapes, summed over all label sets"""
+    totals: Dict[float, float] = {}
+    for sign, metrics in ((-1, before), (1, after)):
+        for labels, value in metrics.get(f"{name}_bucket", []):
+            bound = math.inf if labels["le"] == "+Inf" else float(labels["le"])
+            totals[bound] = totals.get(bound, 0.0) + sign * value
+    return sorted(totals.items())
+
+def histogram_quantile(q: float, buckets: List[Tuple[float, float]]) -> Optional[float]:
+    """Linear interpolation within the bucket holding the quantile, like PromQL histogram_quantile"""
+    if not buckets or buckets[-1][1] <= 0:
+        return None
+    rank = q * buckets[-1][1]
+    lower_bound, lower_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if math.isinf(bound):
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
+
+def histogram_summary(before: Metrics, after: Metrics, name: str) -> Dict[str, Any]:
+    buckets = histogram_buckets(before, after, name)
+    count = buckets[-1][1] if buckets else 0
+    total = metric_total(after, f"{name}_sum") - metric_total(before, f"{name}_sum")
+    summary: Dict[str, Any] = {"count": int(count), "avg_ms": round(total / count * 1000, 2) if count else None}
+    for label, q in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+        value = histogram_quantile(q, buckets)
+        summary[label] = round(value * 1000, 2) if value is not None else None
+    return summary
+
+def proc_status(pid: int, field: str) -> Optional[int]:
+    """First number of a /proc/<pid>/status field (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process"""
+    rss_kb = proc_status(pid, "VmRSS")
+    return rss_kb / 1024 if rss_kb is not None else None
+
+def make_video(path: str, seconds: float = 10.0, fps: float = 30.0, size: Tuple[int, int] = (640, 480)) -> str:
+    """Write a moving-gradient test clip so file decoding is part of the measurement"""
+    import cv2
+    import numpy as np
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    if not writer.isOpened():
+        raise RuntimeError("OpenCV cannot write mp4v video here; use --source synthetic")
+    ramp = np.tile(np.arange(width, dtype=np.uint16), (height, 1))
+    for i in range(int(seconds * fps)):
+        channel = ((ramp + i * 4) % 256).astype(np.uint8)
+        writer.write(np.dstack([channel, channel[::-1], np.roll(channel, i, axis=0)]))
+    writer.release()
+    return path
+
+def stream_frames(client: httpx.Client) -> Dict[str, int]:
+    return {s["stream_id"]: s["frames_processed"] for s in client.get("/streams").json()["streams"]}
+
+async def poll_results(url: str, stream_ids: List[str], concurrency: int, duration: float) -> Dict[str, Any]:
+    """Dashboard-style /results polling for `duration` seconds"""
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+
+        async def poller() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                path = random.choice([
+                    f"/results/{random.choice(stream_ids)}?limit=50",
+                    f"/results?stream_ids={','.join(stream_ids)}&limit=10",
+                ])
+                start = time.perf_counter()
+                try:
+                    (await client.get(path)).raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(poller() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "latency": latency_summary(latencies),
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(streams: int, source: str, duration: float, warmup: float,
+                  poll_concurrency: int, port: int, fps: float = 5.0, execution: str = "threads") -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="vms-bench-")
+    env = dict(os.environ)
+    env.update({
+        "VMS_DB_ENGINE": "sqlite",
+        "VMS_SQLITE_PATH": os.path.join(workdir, "bench.db"),
+        "VMS_LOG_DIR": os.path.join(workdir, "logs"),
+        # Time-based background jobs would only add noise
+        "VMS_RETENTION": "0",
+        "VMS_COLUMNAR_ARCHIVE": "0",
+        "VMS_STREAM_EXECUTION": execution,
+    })
+    video = make_video(os.path.join(workdir, "bench.mp4")) if source == "video" else None
+    url = f"http://127.0.0.1:{port}"
+    stream_ids = [f"bench_{i}" for i in range(streams)]
+    server = start_server(env, port, 0.0)
+    try:
+        with httpx.Client(base_url=url, timeout=30.0) as client:
+            rss_idle = rss_mb(server.pid)
+            threads_idle = proc_status(server.pid, "Threads")
+            for stream_id in stream_ids:
+                client.post("/streams/start", json={"config": {
+                    "stream_id": stream_id,
+                    # A source that cannot be opened runs on synthetic frames
+                    "source": video or f"synthetic_{stream_id}",
+                    "models": MODELS,
+                    "fps": fps,
+                }}).raise_for_status()
+            time.sleep(warmup)
+            metrics_before = parse_metrics(client.get("/metrics").text)
+            frames_before = stream_frames(client)
+            started = time.perf_counter()
+            if poll_concurrency > 0:
+                api = asyncio.run(poll_results(url, stream_ids, poll_concurrency, duration))
+            else:
+                time.sleep(duration)
+                api = None
+            elapsed = time.perf_counter() - started
+            metrics_after = parse_metrics(client.get("/metrics").text)
+            frames_after = stream_frames(client)
+            rss_loaded = rss_mb(server.pid)
+            threads_loaded = proc_status(server.pid, "Threads")
+            for stream_id in stream_ids:
+                client.post("/streams/stop", json={"stream_id": stream_id})
+    finally:
+        server.terminate()
+        server.wait()
+
+    fps = {s: round((frames_after.get(s, 0) - frames_before.get(s, 0)) / elapsed, 2) for s in stream_ids}
+    rows = metric_total(metrics_after, "vms_db_rows_written_total") - metric_total(metrics_before, "vms_db_rows_written_total")
+    per_stream_mb = None
+    if rss_idle is not None and rss_loaded is not None:
+        per_stream_mb = round((rss_loaded - rss_idle) / streams, 2)
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            "streams": streams,
+            "source": source,
+            "fps": fps,
+            "execution": execution,
+            "models": MODELS,
+            "duration": duration,
+            "warmup": warmup,
+            "poll_concurrency": poll_concurrency,
+        },
+        "pipeline": {
+            "fps_per_stream": {
+                "mean": round(sum(fps.values()) / len(fps), 2),
+                "min": min(fps.values()),
+                "max": max(fps.values()),
+                "streams": fps,
+            },
+            "frame_latency": histogram_summary(metrics_before, metrics_after, "vms_frame_latency_seconds"),
+            "persist_latency": histogram_summary(metrics_before, metrics_after, "vms_result_persist_seconds"),
+            "inference": histogram_summary(metrics_before, metrics_after, "vms_model_inference_seconds"),
+            "frames_dropped": metric_total(metrics_after, "vms_frames_dropped_total") - metric_total(metrics_before, "vms_frames_dropped_total"),
+        },
+        "database": {
+            "rows_written": int(rows),
+            "rows_per_sec": round(rows / elapsed, 1),
+            "write": histogram_summary(metrics_before, metrics_after, "vms_db_write_seconds"),
+        },
+        "api": api,
+        "memory": {
+            "idle_mb": round(rss_idle, 1) if rss_idle is not None else None,
+            "loaded_mb": round(rss_loaded, 1) if rss_loaded is not None else None,
+            "per_stream_mb": per_stream_mb,
+        },
+        "threads": {
+            "idle": threads_idle,
+            "loaded": threads_loaded,
+        },
+    }
+
+def lookup(report: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = report
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value if isinstance(value, (int, float)) else None
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print metric deltas against a baseline report; returns the metrics that regressed"""
+    regressions = []
+    print(f"{'metric':<36}{'baseline':>12}{'current':>12}{'change':>10}", file=sys.stderr)
+    for path, higher_is_better in COMPARED.items():
+        old, new = lookup(baseline, path), lookup(report, path)
+        if old is None or new is None or old == 0:
+            continue
+        change = (new - old) / abs(old)
+        regressed = (-change if higher_is_better else change) > tolerance
+        if regressed:
+            regressions.append(path)
+        print(f"{path:<36}{old:>12.2f}{new:>12.2f}{change:>+9.1%}{' ✗' if regressed else ''}", file=sys.stderr)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the VMS frame pipeline end to end")
+    parser.add_argument("--streams", type=int, default=10)
+    parser.add_argument("--source", choices=["synthetic", "video"], default="synthetic")
+    parser.add_argument("--fps", type=float, default=5.0, help="requested frame rate of every stream")
+    parser.add_argument("--execution", choices=["threads", "pool"], default="threads",
+                        help="a thread per stream or the shared stream pool (VMS_STREAM_EXECUTION)")
+    parser.add_argument("--duration", type=float, default=30.0, help="measurement window in seconds")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--poll-concurrency", type=int, default=20, help="concurrent /results pollers (0 = none)")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression")
+    args = parser.parse_args()
+    report = run_benchmark(args.streams, args.source, args.duration, args.warmup, args.poll_concurrency, args.port,
+                           fps=args.fps, execution=args.execution)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Cluster mode check for VMS
+Runs several backend nodes as local processes sharing one SQLite database,
+submits streams through one node, then kills a node and adds a new one.
+After each step it verifies that every stream is leased to exactly one live
+node and that no node holds more than its fair share.
+
+Usage: python check_cluster.py [--nodes 3 --streams 12 --lease-ttl 6]
+"""
+
+import sys
+import os
+import math
+import time
+import signal
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def start_node(node_id: str, port: int, env: Dict[str, str]) -> subprocess.Popen:
+    node = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=dict(env, VMS_NODE_ID=node_id),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).raise_for_status()
+            return node
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    node.terminate()
+    raise RuntimeError(f"Node {node_id} did not start")
+
+def placement(port: int) -> Dict[str, List[str]]:
+    """node -> stream ids, with unplaced streams under None"""
+    streams = httpx.get(f"http://127.0.0.1:{port}/streams", timeout=10.0).json()["streams"]
+    nodes: Dict[str, List[str]] = {}
+    for s in streams:
+        nodes.setdefault(s["node"], []).append(s["stream_id"])
+    return nodes
+
+def wait_balanced(port: int, live: List[str], streams: int, timeout: float) -> Dict[str, List[str]]:
+    share = math.ceil(streams / len(live))
+    deadline = time.time() + timeout
+    while True:
+        nodes = placement(port)
+        placed = sum(len(v) for k, v in nodes.items() if k in live)
+        if placed == streams and all(len(nodes.get(n, [])) <= share for n in live):
+            return nodes
+        if time.time() > deadline:
+            raise AssertionError(f"not balanced after {timeout:.0f}s: {nodes}")
+        time.sleep(0.5)
+
+def report(step: str, nodes: Dict[str, List[str]]) -> None:
+    print(f"{step}: " + ", ".join(f"{node}={len(ids)}" for node, ids in sorted(nodes.items(), key=str)))
+
+def check_cluster(node_count: int, streams: int, lease_ttl: float) -> bool:
+    workdir = tempfile.mkdtemp(prefix="vms-cluster-")
+    env = dict(os.environ)
+    env.update({
+        "VMS_CLUSTER": "1",
+        "VMS_DB_ENGINE": "sqlite",
+        "VMS_SQLITE_PATH": os.path.join(workdir, "cluster.db"),
+        "VMS_LOG_DIR": os.path.join(workdir, "logs"),
+        "VMS_LEASE_TTL": str(lease_ttl),
+        "VMS_HEARTBEAT_INTERVAL": str(lease_ttl / 3),
+        "VMS_NODE_CAPACITY": str(streams),
+        "VMS_RETENTION": "0",
+        "VMS_COLUMNAR_ARCHIVE": "0",
+    })
+    ports = {f"node-{i}": 8800 + i for i in range(node_count + 1)}
+    running: Dict[str, subprocess.Popen] = {}
+    settle = lease_ttl * 4
+    try:
+        for node_id in list(ports)[:node_count]:
+            running[node_id] = start_node(node_id, ports[node_id], env)
+        first = ports["node-0"]
+        for i in range(streams):
+            httpx.post(f"http://127.0.0.1:{first}/streams/start", json={"config": {
+                "stream_id": f"cluster_{i}", "source": f"synthetic_{i}", "models": ["defect_analysis"],
+            }}, timeout=10.0).raise_for_status()
+        report("placed", wait_balanced(first, list(running), streams, settle))
+
+        # A crash: leases of the killed node expire and survivors take its streams
+        victim = list(running)[-1]
+        running.pop(victim).send_signal(signal.SIGKILL)
+        report(f"after killing {victim}", wait_balanced(first, list(running), streams, settle))
+
+        # A join: existing nodes give back streams above the new fair share
+        joiner = list(ports)[-1]
+        running[joiner] = start_node(joiner, ports[joiner], env)
+        report(f"after adding {joiner}", wait_balanced(first, list(running), streams, settle))
+
+        httpx.post(f"http://127.0.0.1:{first}/streams/stop", json={"stream_id": "cluster_0"}, timeout=10.0).raise_for_status()
+        time.sleep(lease_ttl)
+        remaining = sum(len(v) for v in placement(first).values())
+        if remaining != streams - 1:
+            raise AssertionError(f"{remaining} streams placed after stopping one of {streams}")
+        print("✓ Every stream leased to exactly one live node")
+        return True
+    except AssertionError as e:
+        print(f"✗ {e}")
+        return False
+    finally:
+        for node in running.values():
+            node.terminate()
+            node.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check lease-based stream placement across local nodes")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--streams", type=int, default=12)
+    parser.add_argument("--lease-ttl", type=float, default=6.0)
+    args = parser.parse_args()
+    sys.exit(0 if check_cluster(args.nodes, args.streams, args.lease_ttl) else 1)
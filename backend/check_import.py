@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for VMS
+Imports app.main in a fresh interpreter and fails if it is slower than the budget
+or has side effects (database engine, background threads, logging handlers).
+
+Usage: python check_import.py [--budget SECONDS]
+"""
+
+import sys
+import os
+import json
+import argparse
+import subprocess
+
+PROBE = """
+import json, threading, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+from app import database
+from app.logger import vms_logger
+print(json.dumps({
+    "import_time": elapsed,
+    "engine_created": database._engine is not None,
+    "threads": [t.name for t in threading.enumerate() if t is not threading.main_thread()],
+    "logging_configured": vms_logger.configured,
+}))
+"""
+
+def check_import(budget: float) -> bool:
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=backend_dir, capture_output=True, text=True, check=True
+    ).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    problems = []
+    if report["import_time"] > budget:
+        problems.append(f"import took {report['import_time']:.3f}s, budget is {budget:.3f}s")
+    if report["engine_created"]:
+        problems.append("database engine created at import")
+    if report["threads"]:
+        problems.append(f"threads started at import: {', '.join(report['threads'])}")
+    if report["logging_configured"]:
+        problems.append("logging handlers configured at import")
+    print(f"app.main imported in {report['import_time']:.3f}s (budget {budget:.3f}s)")
+    for problem in problems:
+        print(f"✗ {problem}")
+    if not problems:
+        print("✓ Import is within budget and side-effect free")
+    return not problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check app.main import time and side effects")
+    parser.add_argument("--budget", type=float, default=float(os.getenv("VMS_IMPORT_BUDGET", "2.0")))
+    args = parser.parse_args()
+    sys.exit(0 if check_import(args.budget) else 1)
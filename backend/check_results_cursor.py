@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Results cursor check for VMS
+Polls /results against a temporary SQLite database, then has a second stream
+commit a row older than the first stream's newest row. The next poll with the
+returned cursor must still include that row, both when reads are served from the
+ring buffers and when they go to the database.
+
+Usage: python check_results_cursor.py
+"""
+
+import sys
+import os
+import json
+import tempfile
+import subprocess
+
+PROBE = """
+import json
+from fastapi.testclient import TestClient
+from app import main
+
+def poll(client, since=None):
+    params = {"stream_ids": "cam_a,cam_b", "limit": 50}
+    if since is not None:
+        params["since"] = json.dumps(since)
+    response = client.get("/results", params=params)
+    response.raise_for_status()
+    return response.json()
+
+def add(stream_id, timestamp):
+    main.storage.add_result(stream_id, {"model": "defect_analysis", "timestamp": timestamp, "summary": {
+        "defect_score": 0.1, "defect_type": "none", "confidence": 0.9, "processing_time": 0.01,
+    }})
+    main.storage.flush_results(5.0)
+
+with TestClient(main.app) as client:
+    add("cam_b", 1000.0)
+    add("cam_a", 1010.0)
+    first = poll(client)
+    # cam_b was behind cam_a and commits a row from before cam_a's newest
+    add("cam_b", 1005.0)
+    second = poll(client, first["cursor"])
+print(json.dumps({"first": first["cursor"], "second": second["cursor"],
+                  "late": [r["timestamp"] for r in second["results"]["cam_b"]],
+                  "repeated": [r["timestamp"] for r in second["results"]["cam_a"]]}))
+"""
+
+def run_probe(result_cache: bool) -> dict:
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix="vms-cursor-")
+    env = dict(os.environ)
+    env.update({
+        "VMS_DB_ENGINE": "sqlite",
+        "VMS_SQLITE_PATH": os.path.join(workdir, "cursor.db"),
+        "VMS_LOG_DIR": os.path.join(workdir, "logs"),
+        "VMS_RESULT_CACHE": "1" if result_cache else "0",
+        "VMS_RETENTION": "0",
+        "VMS_COLUMNAR_ARCHIVE": "0",
+    })
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=backend_dir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def check_results_cursor() -> bool:
+    ok = True
+    for result_cache in (True, False):
+        source = "ring buffer" if result_cache else "database"
+        report = run_probe(result_cache)
+        print(f"{source}: first cursor {report['first']}, second cursor {report['second']}")
+        if report["late"] != [1005.0]:
+            print(f"✗ {source}: late cam_b row not returned (got {report['late']})")
+            ok = False
+        if report["repeated"]:
+            print(f"✗ {source}: cam_a rows returned again: {report['repeated']}")
+            ok = False
+    if ok:
+        print("✓ Late rows of a slower stream are returned by the next poll")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check_results_cursor() else 1)
@@ -8,7 +8,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.database import create_tables, get_db_session, Stream
+from app.database import create_tables, get_db_session, Stream, partition_stream_results
 import json
 
 def init_database():
@@ -49,3 +49,7 @@ def init_database():
 
 if __name__ == "__main__":
     init_database()
+    if "--partition" in sys.argv[1:]:
+        print("Partitioning stream_results by day...")
+        partition_stream_results()
+        print("✓ stream_results partitioned")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Result storage migration for VMS
+Re-encodes JSON result_data rows in stream_results into the compact result_blob
+format and reports the storage saved. Safe to re-run; rows already migrated are skipped.
+
+Usage: python migrate_results.py [--dry-run] [--chunk-size N]
+"""
+
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select, update
+from app.database import create_tables, get_write_session, StreamResult
+from app.result_codec import encode_summary, decode_summary
+import json
+
+def migrate_results(chunk_size: int = 2000, dry_run: bool = False) -> dict:
+    """Convert JSON rows chunk by chunk; returns row and byte counts per model"""
+    create_tables()  # adds the result_blob column to existing tables
+    sizes = {}
+    last_id = 0
+    while True:
+        with get_write_session() as db:
+            rows = db.execute(
+                select(StreamResult.id, StreamResult.model_name, StreamResult.result_data)
+                .where(StreamResult.id > last_id, StreamResult.result_blob.is_(None))
+                .order_by(StreamResult.id).limit(chunk_size)
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for r in rows:
+                summary = json.loads(r.result_data)
+                blob = encode_summary(r.model_name, summary)
+                if decode_summary(blob) != summary:
+                    raise RuntimeError(f"Row {r.id} does not round-trip, aborting")
+                stats = sizes.setdefault(r.model_name, {"rows": 0, "json_bytes": 0, "binary_bytes": 0})
+                stats["rows"] += 1
+                stats["json_bytes"] += len(r.result_data.encode("utf-8"))
+                stats["binary_bytes"] += len(blob)
+                updates.append({"id": r.id, "result_data": "", "result_blob": blob})
+            if not dry_run:
+                db.execute(update(StreamResult), updates)
+            last_id = rows[-1].id
+        print(f"  {'checked' if dry_run else 'migrated'} rows up to id {last_id}")
+    return sizes
+
+def print_size_report(sizes: dict) -> None:
+    print(f"{'model':<20}{'rows':>10}{'json bytes':>14}{'binary bytes':>14}{'ratio':>8}")
+    totals = {"rows": 0, "json_bytes": 0, "binary_bytes": 0}
+    for model, stats in sorted(sizes.items()) + [("TOTAL", totals)]:
+        if model != "TOTAL":
+            for key in totals:
+                totals[key] += stats[key]
+        ratio = stats["binary_bytes"] / stats["json_bytes"] if stats["json_bytes"] else 0.0
+        print(f"{model:<20}{stats['rows']:>10}{stats['json_bytes']:>14}{stats['binary_bytes']:>14}{ratio:>8.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate stream_results to the compact result format")
+    parser.add_argument("--dry-run", action="store_true", help="only report the size comparison")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+    print("Migrating stream_results..." if not args.dry_run else "Measuring stream_results...")
+    print_size_report(migrate_results(args.chunk_size, args.dry_run))
+    print("Migration complete!" if not args.dry_run else "Dry run complete, nothing written")
@@ -11,10 +11,22 @@ CREATE TABLE IF NOT EXISTS streams (
     source VARCHAR(500) NOT NULL,
     models TEXT NOT NULL COMMENT 'JSON array of model names',
     status VARCHAR(50) DEFAULT 'active',
+    options TEXT NULL COMMENT 'JSON of pipeline options from the start request',
+    owner_node VARCHAR(255) NULL COMMENT 'Cluster node holding the lease',
+    lease_expires DOUBLE NULL COMMENT 'Lease expiry, epoch seconds',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_stream_id (stream_id),
-    INDEX idx_status (status)
+    INDEX idx_status (status),
+    INDEX ix_streams_owner_node (owner_node)
+);
+
+-- Cluster members and their heartbeats (cluster mode only)
+CREATE TABLE IF NOT EXISTS cluster_nodes (
+    node_id VARCHAR(255) PRIMARY KEY,
+    capacity INT NOT NULL,
+    heartbeat_at DOUBLE NOT NULL,
+    started_at DOUBLE NOT NULL
 );
 
 -- Stream results table to store AI model inference results
@@ -23,9 +35,10 @@ CREATE TABLE IF NOT EXISTS stream_results (
     stream_id VARCHAR(255) NOT NULL,
     model_name VARCHAR(255) NOT NULL,
     timestamp DOUBLE NOT NULL,
-    result_data TEXT NOT NULL COMMENT 'JSON string of model results',
+    result_data TEXT NOT NULL COMMENT 'JSON string of model results; empty when result_blob is set',
+    result_blob BLOB NULL COMMENT 'Compact app.result_codec encoding of model results',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_stream_id (stream_id),
+    INDEX idx_stream_ts (stream_id, timestamp),
     INDEX idx_model_name (model_name),
     INDEX idx_timestamp (timestamp),
     INDEX idx_created_at (created_at)
@@ -48,6 +61,35 @@ CREATE TABLE IF NOT EXISTS alerts (
     INDEX idx_created_at (created_at)
 );
 
+-- Optional time-partitioned layout for stream_results (what
+-- app.database.partition_stream_results() applies; run via `python init_db.py --partition`).
+-- Daily RANGE partitions on created_at let the retention pruner archive and drop
+-- a whole day at once instead of deleting rows:
+--
+-- ALTER TABLE stream_results MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP;
+-- ALTER TABLE stream_results DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at);
+-- ALTER TABLE stream_results PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+--     PARTITION p20250901 VALUES LESS THAN (UNIX_TIMESTAMP('2025-09-02 00:00:00')),
+--     PARTITION pmax VALUES LESS THAN MAXVALUE
+-- );
+
+-- Per-minute/per-hour rollups of numeric model result fields
+CREATE TABLE IF NOT EXISTS metric_rollups (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    stream_id VARCHAR(255) NOT NULL,
+    model_name VARCHAR(255) NOT NULL,
+    field VARCHAR(100) NOT NULL,
+    resolution VARCHAR(10) NOT NULL COMMENT 'minute or hour',
+    bucket_start DOUBLE NOT NULL COMMENT 'bucket start, epoch seconds',
+    count INT NOT NULL DEFAULT 0,
+    min_value DOUBLE NOT NULL,
+    max_value DOUBLE NOT NULL,
+    sum_value DOUBLE NOT NULL,
+    sketch TEXT NOT NULL COMMENT 'JSON quantile sketch',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_metric_rollup_bucket (stream_id, model_name, field, resolution, bucket_start)
+);
+
 -- Insert sample data for testing
 INSERT IGNORE INTO streams (stream_id, source, models, status) VALUES
 ('demo_stream_1', '0', '["asset_detection", "defect_analysis"]', 'active'),
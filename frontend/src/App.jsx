@@ -1,5 +1,5 @@
 import { useEffect, useMemo, useState } from 'react'
-import { getHealth, getStreams, startStream, stopStream, getResults } from './api'
+import { getHealth, getStreams, startStream, stopStream, getResults, getResultsBatch, subscribeEvents } from './api'
 import './App.css'
 
 function useInterval(callback, delay) {
@@ -83,8 +83,7 @@ function ResultCard({ result }) {
   return null
 }
 
-function StreamRow({ s }) {
-  const [results, setResults] = useState([])
+function StreamRow({ s, live, onFetched }) {
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState(null)
   
@@ -93,7 +92,7 @@ function StreamRow({ s }) {
     setError(null)
     try {
       const data = await getResults(s.stream_id)
-      setResults(data.results.slice(-8))
+      onFetched(s.stream_id, data.results)
       console.log(`Updated results for ${s.stream_id}:`, data.results.length)
     } catch (err) {
       setError(err.message)
@@ -103,7 +102,8 @@ function StreamRow({ s }) {
     }
   }
   
-  useInterval(fetchResults, 10000) // Auto-refresh every 10 seconds
+  // Batch load, push stream and refreshes all merge into the dashboard's live results
+  const results = live || []
 
   // Group results by model to show latest from each
   const latestResults = {}
@@ -151,6 +151,34 @@ function App() {
   const [health, setHealth] = useState(null)
   const [streams, setStreams] = useState([])
   const [form, setForm] = useState({ id: '', source: '0', models: 'asset_detection,defect_analysis' })
+  const [liveResults, setLiveResults] = useState({})
+
+  const appendResults = (prev, batch) => {
+    const next = { ...prev }
+    Object.entries(batch).forEach(([streamId, rows]) => {
+      // A refresh can return rows the push stream already delivered
+      const byKey = new Map()
+      for (const row of [...(next[streamId] || []), ...rows]) {
+        byKey.set(`${row.model}@${row.timestamp}`, row)
+      }
+      next[streamId] = [...byKey.values()]
+        .sort((a, b) => a.timestamp - b.timestamp)
+        .slice(-8)
+    })
+    return next
+  }
+
+  const mergeFetched = (streamId, rows) => setLiveResults(prev => appendResults(prev, { [streamId]: rows }))
+
+  // Seed every row with one batch request instead of one request per stream
+  useEffect(() => {
+    getResultsBatch('active', 8).then(data => setLiveResults(prev => appendResults(prev, data.results || {})))
+  }, [])
+
+  // One push connection for all streams instead of polling each one
+  useEffect(() => subscribeEvents({
+    onResult: (result) => setLiveResults(prev => appendResults(prev, { [result.stream_id]: [result] })),
+  }), [])
 
   useEffect(() => {
     getHealth().then(setHealth)
@@ -208,7 +236,7 @@ function App() {
           </tr>
         </thead>
         <tbody>
-          {streams.map(s => <StreamRow key={s.stream_id} s={s} />)}
+          {streams.map(s => <StreamRow key={s.stream_id} s={s} live={liveResults[s.stream_id]} onFetched={mergeFetched} />)}
         </tbody>
       </table>
     </div>
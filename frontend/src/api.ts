@@ -43,3 +43,30 @@ export async function getResults(stream_id: string) {
     return { results: [] };
   }
 }
+
+export type PushHandlers = {
+  onResult?: (result: any) => void;
+  onAlert?: (alert: any) => void;
+};
+
+// Server-Sent Events push of results and alerts; returns a function that closes the connection
+export function subscribeEvents(handlers: PushHandlers, streams?: string[], models?: string[]) {
+  const params = new URLSearchParams();
+  if (streams?.length) params.set('streams', streams.join(','));
+  if (models?.length) params.set('models', models.join(','));
+  const source = new EventSource(`${API_BASE}/events?${params.toString()}`);
+  source.addEventListener('result', (e) => handlers.onResult?.(JSON.parse((e as MessageEvent).data)));
+  source.addEventListener('alert', (e) => handlers.onAlert?.(JSON.parse((e as MessageEvent).data)));
+  return () => source.close();
+}
+
+// Latest results for many streams in one request; pass the returned per-stream cursor as `since` to get only newer ones
+export async function getResultsBatch(streamIds: string[] | 'active' = 'active', limit = 10, since?: Record<string, number>) {
+  const params = new URLSearchParams({
+    stream_ids: streamIds === 'active' ? 'active' : streamIds.join(','),
+    limit: String(limit),
+  });
+  if (since !== undefined && since !== null) params.set('since', JSON.stringify(since));
+  const res = await fetch(`${API_BASE}/results?${params.toString()}`);
+  return res.json();
+}